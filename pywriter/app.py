@@ -1,4 +1,5 @@
 import sys
+import weakref
 from pathlib import Path
 
 import gi
@@ -14,8 +15,22 @@ from .panels.file_tree import FileTree
 from .panels.problems import ProblemsPanel
 from .panels.outline import OutlinePanel
 from .panels.output import OutputPanel
+from .panels.profiler import ProfilerPanel
+from .panels.memory import MemoryPanel
+from .panels.sampler import SamplerPanel
+from .panels.import_profile import ImportProfilePanel
+from .panels.tests import TestsPanel
+from .panels.debug import DebugPanel
+from .panels.coverage import CoveragePanel
+from .panels.log_viewer import LogViewerPanel
 from .language.python_provider import PythonProvider
 from .tools.runner import ToolRunner
+from .tools.interpreter import InterpreterResolver
+from .tools.testing import TestRunner
+from .tools.watch import RunWatcher
+from .tools.forkserver import ForkServer
+from .tools.kernel import ReplKernel
+from .language.precompile import Precompiler
 
 
 CSS = b"""
@@ -87,6 +102,12 @@ notebook tab label {
     font-weight: bold;
     font-size: 9px;
 }
+#breadcrumbs {
+    background-color: #1e1e1e;
+    color: #a0a0a0;
+    padding: 2px 8px;
+    font-size: 10px;
+}
 #output-text {
     font-family: Monospace;
     font-size: 10px;
@@ -222,13 +243,28 @@ class PyWriterApp:
         self.problems_panel = None
         self.outline_panel = None
         self.output_panel = None
+        self.profiler_panel = None
+        self.memory_panel = None
+        self.sampler_panel = None
+        self.import_profile_panel = None
+        self.tests_panel = None
+        self.debug_panel = None
+        self.coverage_panel = None
+        self.log_viewer = None
         self.python_provider = None
         self.runner = None
+        self.test_runner = None
+        self.watcher = None
+        self.fork_server = None
+        self.kernel = None
+        self.precompiler = None
+        self.interpreters = None
         self.workspace = None
         self.commands = None
 
         self._status_label = None
         self._cursor_label = None
+        self._cursor_tracked = weakref.WeakSet()
         self._open_path = open_path
 
     def run(self):
@@ -270,8 +306,17 @@ class PyWriterApp:
         self.window = Gtk.Window(title="PyWriter")
         self.window.set_default_size(1920, 1080)
         self.window.connect("delete-event", self._on_quit)
+        self.window.connect("key-press-event", self._on_window_key_press)
         self.window.set_icon_name("accessories-text-editor")
 
+    def _on_window_key_press(self, window, event):
+        # A program on a terminal gets its keys before the window's shortcuts
+        focus = window.get_focus()
+        panel = focus.get_ancestor(OutputPanel) if focus else None
+        if panel is None or focus is not panel.textview:
+            return False
+        return panel.forward_key(event)
+
     def _build_ui(self):
         main_vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
 
@@ -313,6 +358,9 @@ class PyWriterApp:
         self.output_panel = OutputPanel(self)
         self.bottom_notebook.append_page(self.output_panel, Gtk.Label(label="Output"))
 
+        self.tests_panel = TestsPanel(self)
+        self.bottom_notebook.append_page(self.tests_panel, Gtk.Label(label="Tests"))
+
         right_vpaned.pack2(self.bottom_notebook, resize=False, shrink=True)
         right_vpaned.set_position(700)
 
@@ -335,6 +383,9 @@ class PyWriterApp:
         self._encoding_label = Gtk.Label(label="UTF-8")
         status_bar.pack_end(self._encoding_label, False, False, 0)
 
+        self._interpreter_label = Gtk.Label(label="")
+        status_bar.pack_end(self._interpreter_label, False, False, 0)
+
         main_vbox.pack_end(status_bar, False, False, 0)
 
         self.window.add(main_vbox)
@@ -421,10 +472,99 @@ class PyWriterApp:
         run_file_item.connect("activate", lambda w: self.commands.get("run_file").callback())
         run_menu.append(run_file_item)
 
+        run_term_item = Gtk.MenuItem(label="Run File in Terminal  Ctrl+Shift+T")
+        run_term_item.connect("activate",
+                              lambda w: self.commands.get("run_file_terminal").callback())
+        run_menu.append(run_term_item)
+
+        run_profile_item = Gtk.MenuItem(label="Run with Profiler")
+        run_profile_item.connect("activate",
+                                 lambda w: self.commands.get("run_file_profile").callback())
+        run_menu.append(run_profile_item)
+
+        run_memory_item = Gtk.MenuItem(label="Run with Memory Profiler")
+        run_memory_item.connect("activate",
+                                lambda w: self.commands.get("run_file_memory").callback())
+        run_menu.append(run_memory_item)
+
+        run_coverage_item = Gtk.MenuItem(label="Run with Coverage")
+        run_coverage_item.connect("activate",
+                                  lambda w: self.commands.get("run_file_coverage").callback())
+        run_menu.append(run_coverage_item)
+
+        run_imports_item = Gtk.MenuItem(label="Run Import Profile")
+        run_imports_item.connect("activate",
+                                 lambda w: self.commands.get("run_file_imports").callback())
+        run_menu.append(run_imports_item)
+
+        run_sampling_item = Gtk.MenuItem(label="Run with Sampling Profiler")
+        run_sampling_item.connect("activate",
+                                  lambda w: self.commands.get("run_file_sampling").callback())
+        run_menu.append(run_sampling_item)
+
+        log_item = Gtk.MenuItem(label="Open Run Log")
+        log_item.connect("activate", lambda w: self.commands.get("open_run_log").callback())
+        run_menu.append(log_item)
+
+        history_item = Gtk.MenuItem(label="Run History")
+        history_item.connect("activate",
+                             lambda w: self.commands.get("show_run_history").callback())
+        run_menu.append(history_item)
+
+        run_tests_item = Gtk.MenuItem(label="Run All Tests")
+        run_tests_item.connect("activate", lambda w: self.commands.get("run_tests").callback())
+        run_menu.append(run_tests_item)
+
+        run_tests_cov_item = Gtk.MenuItem(label="Run All Tests with Coverage")
+        run_tests_cov_item.connect("activate",
+                                   lambda w: self.commands.get("run_tests_coverage").callback())
+        run_menu.append(run_tests_cov_item)
+
+        run_affected_item = Gtk.MenuItem(label="Run Affected Tests")
+        run_affected_item.connect("activate",
+                                  lambda w: self.commands.get("run_affected_tests").callback())
+        run_menu.append(run_affected_item)
+
+        run_failed_item = Gtk.MenuItem(label="Re-run Failed Tests")
+        run_failed_item.connect("activate",
+                                lambda w: self.commands.get("run_failed_tests").callback())
+        run_menu.append(run_failed_item)
+
+        run_menu.append(Gtk.SeparatorMenuItem())
+
+        for label, cmd_id in (("Run Selection/Line in Console  Ctrl+Enter", "run_selection"),
+                              ("Run Cell in Console  Ctrl+Shift+Enter", "run_cell"),
+                              ("Interrupt Console", "interrupt_kernel"),
+                              ("Restart Console", "restart_kernel")):
+            item = Gtk.MenuItem(label=label)
+            item.connect("activate", lambda w, c=cmd_id: self.commands.get(c).callback())
+            run_menu.append(item)
+
+        run_menu.append(Gtk.SeparatorMenuItem())
+
+        for label, cmd_id in (("Debug File / Continue  F5", "debug_file"),
+                              ("Step Over  F10", "step_over"),
+                              ("Step Into  F11", "step_into"),
+                              ("Step Out  Shift+F11", "step_out"),
+                              ("Toggle Breakpoint  F9", "toggle_breakpoint")):
+            item = Gtk.MenuItem(label=label)
+            item.connect("activate", lambda w, c=cmd_id: self.commands.get(c).callback())
+            run_menu.append(item)
+
+        run_menu.append(Gtk.SeparatorMenuItem())
+
+        self._watch_item = Gtk.CheckMenuItem(label="Watch: Re-run on Save")
+        self._watch_item.connect("toggled", self._on_watch_toggled)
+        run_menu.append(self._watch_item)
+
         stop_item = Gtk.MenuItem(label="Stop")
-        stop_item.connect("activate", lambda w: self.runner.stop() if self.runner else None)
+        stop_item.connect("activate", lambda w: self._stop_current_run())
         run_menu.append(stop_item)
 
+        stop_all_item = Gtk.MenuItem(label="Stop All")
+        stop_all_item.connect("activate", lambda w: self.runner.stop() if self.runner else None)
+        run_menu.append(stop_all_item)
+
         menu_bar.append(run_item)
 
         # Tools menu
@@ -437,6 +577,11 @@ class PyWriterApp:
                             lambda w: self.commands.get("format_document").callback())
         tools_menu.append(format_item)
 
+        format_ws_item = Gtk.MenuItem(label="Format Workspace")
+        format_ws_item.connect("activate",
+                               lambda w: self.commands.get("format_workspace").callback())
+        tools_menu.append(format_ws_item)
+
         menu_bar.append(tools_item)
 
         # Help menu
@@ -458,9 +603,162 @@ class PyWriterApp:
     def _setup_services(self):
         self.workspace = WorkspaceManager(self)
         self.python_provider = PythonProvider(self)
+        self.interpreters = InterpreterResolver(self)
+        self.interpreters.on_changed.append(self._update_interpreter_label)
         self.runner = ToolRunner(self)
+        self.test_runner = TestRunner(self)
+        self.watcher = RunWatcher(self)
+        self.fork_server = ForkServer(self)
+        self.kernel = ReplKernel(self)
+        self.precompiler = Precompiler(self)
+        self.interpreters.on_changed.append(self._warm_up_fork_server)
+
+    def open_run_tab(self, session):
+        """Add an output tab for a script run and return its panel."""
+        panel = OutputPanel(self, session)
+        box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=4)
+        box.pack_start(Gtk.Label(label=session.title), True, True, 0)
+        close_btn = Gtk.Button()
+        close_btn.set_image(Gtk.Image.new_from_icon_name("window-close-symbolic",
+                                                          Gtk.IconSize.MENU))
+        close_btn.set_relief(Gtk.ReliefStyle.NONE)
+        close_btn.connect("clicked", lambda b: self.close_run_tab(panel))
+        box.pack_end(close_btn, False, False, 0)
+        box.show_all()
+        self.bottom_notebook.append_page(panel, box)
+        panel.show_all()
+        return panel
+
+    def show_run_tab(self, panel):
+        self.bottom_notebook.set_current_page(self.bottom_notebook.page_num(panel))
+
+    def close_run_tab(self, panel):
+        if panel.session and self.runner:
+            self.runner.close_session(panel.session)
+        page = self.bottom_notebook.page_num(panel)
+        if page >= 0:
+            self.bottom_notebook.remove_page(page)
+
+    def show_profile(self, stats_path, title):
+        """Load cProfile stats into the Profile tab, adding it on first use."""
+        if self.profiler_panel is None:
+            self.profiler_panel = ProfilerPanel(self)
+            self.bottom_notebook.append_page(self.profiler_panel, Gtk.Label(label="Profile"))
+            self.profiler_panel.show_all()
+        self.profiler_panel.load(stats_path, title)
+        self.show_run_tab(self.profiler_panel)
+
+    def show_memory(self, session, snapshot_dir):
+        """Show the Memory tab and collect session's tracemalloc snapshots."""
+        if self.memory_panel is None:
+            self.memory_panel = MemoryPanel(self)
+            self.bottom_notebook.append_page(self.memory_panel, Gtk.Label(label="Memory"))
+            self.memory_panel.show_all()
+        self.memory_panel.watch(session, snapshot_dir)
+
+    def show_samples(self, session, read_fd):
+        """Show the Samples tab, fed live from session's sampler pipe."""
+        if self.sampler_panel is None:
+            self.sampler_panel = SamplerPanel(self)
+            self.bottom_notebook.append_page(self.sampler_panel, Gtk.Label(label="Samples"))
+            self.sampler_panel.show_all()
+        self.sampler_panel.watch(session, read_fd)
+
+    def show_import_profile(self, profile, title, script_dir):
+        """Show an -X importtime run in the Imports tab, adding it on first use."""
+        if self.import_profile_panel is None:
+            self.import_profile_panel = ImportProfilePanel(self)
+            self.bottom_notebook.append_page(self.import_profile_panel,
+                                             Gtk.Label(label="Imports"))
+            self.import_profile_panel.show_all()
+        self.import_profile_panel.show_profile(profile, title, script_dir)
+        self.show_run_tab(self.import_profile_panel)
+
+    def show_run_log(self, session=None):
+        """Open the log of session, or of the run in the current tab, in the Log tab."""
+        if session is None:
+            page = self.bottom_notebook.get_nth_page(self.bottom_notebook.get_current_page())
+            session = getattr(page, "session", None)
+        if not session or not session.log:
+            self._status_label.set_text("No run log: select a run's output tab first")
+            return
+        if self.log_viewer is None:
+            self.log_viewer = LogViewerPanel(self)
+            self.bottom_notebook.append_page(self.log_viewer, Gtk.Label(label="Log"))
+            self.log_viewer.show_all()
+        self.log_viewer.open(session.log.path, session.title, session)
+        self.show_run_tab(self.log_viewer)
+
+    def show_coverage(self, data, title):
+        """Show a coverage run in the Coverage tab, adding it on first use."""
+        if self.coverage_panel is None:
+            self.coverage_panel = CoveragePanel(self)
+            self.bottom_notebook.append_page(self.coverage_panel, Gtk.Label(label="Coverage"))
+            self.coverage_panel.show_all()
+        self.coverage_panel.show_data(data, title)
+        self.show_run_tab(self.coverage_panel)
+
+    def show_debugger(self, session, cmd_fd, event_fd):
+        """Show the Debug tab and drive session through its debugger pipes."""
+        if self.debug_panel is None:
+            self.debug_panel = DebugPanel(self)
+            self.bottom_notebook.append_page(self.debug_panel, Gtk.Label(label="Debug"))
+            self.debug_panel.show_all()
+        self.debug_panel.attach(session, cmd_fd, event_fd)
+
+    def show_debugger_tab(self):
+        self.show_run_tab(self.debug_panel)
+
+    def on_breakpoints_changed(self):
+        if self.debug_panel and self.debug_panel.running:
+            self.debug_panel.send_breakpoints()
+
+    def _stop_current_run(self):
+        if not self.runner:
+            return
+        page = self.bottom_notebook.get_nth_page(self.bottom_notebook.get_current_page())
+        session = getattr(page, "session", None)
+        self.runner.stop(session if session and session.running else None)
+
+    def toggle_watch(self):
+        self._watch_item.set_active(not self._watch_item.get_active())
+
+    def _on_watch_toggled(self, item):
+        if not item.get_active():
+            self.watcher.stop()
+            self._status_label.set_text("Watch mode off")
+            return
+        doc = self.editor_manager.active_document if self.editor_manager else None
+        if not doc or not doc.path:
+            item.set_active(False)
+            return
+        if doc.dirty:
+            doc.save()
+        self.watcher.start(doc.path)
+        self._status_label.set_text(f"Watching {doc.path.name}: saves re-run it")
+
+    def on_document_closed(self, doc):
+        self.on_breakpoints_changed()  # its breakpoints are gone with it
+        if doc.path and self.precompiler:
+            self.precompiler.forget(doc.path)
+        if self.outline_panel:
+            self.outline_panel.forget_document(doc)
+
+    def on_document_saved(self, doc):
+        if not doc.path:
+            return
+        if self.precompiler:
+            self.precompiler.on_saved(doc.path)
+        if self.watcher:
+            self.watcher.on_saved(doc.path)
+
+    def show_tests(self):
+        self.bottom_notebook.set_current_page(self.bottom_notebook.page_num(self.tests_panel))
 
     def on_workspace_changed(self, root):
+        self.interpreters.set_workspace(root)
+        self.kernel.shutdown()
+        self.tests_panel.clear()
         if root:
             self.file_tree.set_root(root)
             self.window.set_title(f"PyWriter — {root.name}")
@@ -476,9 +774,15 @@ class PyWriterApp:
             self.outline_panel.update_for_document(doc)
 
             # Update cursor tracking
-            doc.buffer.connect("notify::cursor-position", self._on_cursor_moved)
+            if doc not in self._cursor_tracked:
+                doc.buffer.connect("notify::cursor-position", self._on_cursor_moved)
+                self._cursor_tracked.add(doc)
             self._update_cursor_label(doc.buffer)
 
+            # Coverage highlighting is applied when a document is first shown
+            if self.coverage_panel:
+                self.coverage_panel.decorate(doc)
+
             # Trigger lint
             if doc.path and str(doc.path).endswith(".py"):
                 self.python_provider.schedule_lint(doc, immediate=True)
@@ -486,14 +790,27 @@ class PyWriterApp:
             # Update status
             name = doc.path.name if doc.path else "Untitled"
             self._status_label.set_text(name)
+            self._update_interpreter_label()
         else:
             self.outline_panel.update_for_document(None)
             self._cursor_label.set_text("")
             self._status_label.set_text("Ready")
-            self.problems_panel.clear()
+            self.problems_panel.clear("lint")
+
+    def _warm_up_fork_server(self):
+        # Replaces the helper if the venv or the preload list changed
+        self.fork_server.warm_up(self.interpreters.resolve())
+
+    def _update_interpreter_label(self):
+        doc = self.editor_manager.active_document if self.editor_manager else None
+        info = self.interpreters.resolve(doc.path if doc else None)
+        self._interpreter_label.set_text(info.label)
+        self._interpreter_label.set_tooltip_text(info.path)
 
     def _on_cursor_moved(self, buf, pspec):
-        self._update_cursor_label(buf)
+        doc = self.editor_manager.active_document if self.editor_manager else None
+        if doc and doc.buffer == buf:
+            self._update_cursor_label(buf)
 
     def _update_cursor_label(self, buf):
         mark = buf.get_insert()
@@ -501,6 +818,7 @@ class PyWriterApp:
         line = it.get_line() + 1
         col = it.get_line_offset() + 1
         self._cursor_label.set_text(f"Ln {line}, Col {col}")
+        self.outline_panel.follow_cursor(line)
 
     def _undo(self):
         doc = self.editor_manager.active_document if self.editor_manager else None
@@ -563,6 +881,14 @@ hello()
 
         if self.runner:
             self.runner.stop()
+        if self.watcher:
+            self.watcher.stop()
+        if self.test_runner:
+            self.test_runner.stop()
+        if self.fork_server:
+            self.fork_server.stop()
+        if self.python_provider:
+            self.python_provider.shutdown()
         self.config.save()
         Gtk.main_quit()
         return False
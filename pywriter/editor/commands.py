@@ -1,7 +1,20 @@
+import os
+import tempfile
+from pathlib import Path
+
 import gi
 gi.require_version("Gtk", "3.0")
 from gi.repository import Gtk, Gdk
 
+from ..panels.coverage import CoverageData
+from ..panels.import_profile import IMPORT_TIME_PREFIX, ImportProfile
+from ..tools.kernel import find_cell
+
+COVERAGE_BOOTSTRAP = Path(__file__).parent.parent / "tools" / "coverage_bootstrap.py"
+DEBUG_BOOTSTRAP = Path(__file__).parent.parent / "tools" / "debug_bootstrap.py"
+MEMORY_BOOTSTRAP = Path(__file__).parent.parent / "tools" / "memory_bootstrap.py"
+SAMPLER_BOOTSTRAP = Path(__file__).parent.parent / "tools" / "sampler_bootstrap.py"
+
 
 class Command:
     def __init__(self, cmd_id, name, shortcut, callback):
@@ -42,8 +55,54 @@ class EditorCommands:
                               "<Ctrl>w", self._close_tab))
         self.register(Command("run_file", "Run File",
                               "<Ctrl><Shift>b", self._run_file))
+        self.register(Command("run_file_terminal", "Run File in Terminal",
+                              "<Ctrl><Shift>t", self._run_file_terminal))
+        self.register(Command("run_file_profile", "Run with Profiler",
+                              None, self._run_file_profile))
+        self.register(Command("run_file_memory", "Run with Memory Profiler",
+                              None, self._run_file_memory))
+        self.register(Command("run_file_sampling", "Run with Sampling Profiler",
+                              None, self._run_file_sampling))
+        self.register(Command("run_file_coverage", "Run with Coverage",
+                              None, self._run_file_coverage))
+        self.register(Command("run_file_imports", "Run Import Profile",
+                              None, self._run_file_imports))
+        self.register(Command("debug_file", "Debug File / Continue",
+                              "F5", self._debug_file))
+        self.register(Command("step_over", "Step Over",
+                              "F10", lambda: self._debug_resume("next")))
+        self.register(Command("step_into", "Step Into",
+                              "F11", lambda: self._debug_resume("step")))
+        self.register(Command("step_out", "Step Out",
+                              "<Shift>F11", lambda: self._debug_resume("return")))
+        self.register(Command("toggle_breakpoint", "Toggle Breakpoint",
+                              "F9", self._toggle_breakpoint))
+        self.register(Command("run_selection", "Run Selection/Line in Console",
+                              "<Ctrl>Return", self._run_selection))
+        self.register(Command("run_cell", "Run Cell in Console",
+                              "<Ctrl><Shift>Return", self._run_cell))
+        self.register(Command("interrupt_kernel", "Interrupt Console",
+                              None, self._interrupt_kernel))
+        self.register(Command("restart_kernel", "Restart Console",
+                              None, self._restart_kernel))
+        self.register(Command("toggle_watch", "Watch: Re-run on Save",
+                              "<Ctrl><Shift>w", self._toggle_watch))
+        self.register(Command("open_run_log", "Open Run Log",
+                              None, lambda: self.app.show_run_log()))
+        self.register(Command("show_run_history", "Run History",
+                              None, self._show_run_history))
+        self.register(Command("run_tests", "Run All Tests",
+                              None, self._run_tests))
+        self.register(Command("run_tests_coverage", "Run All Tests with Coverage",
+                              None, self._run_tests_coverage))
+        self.register(Command("run_affected_tests", "Run Affected Tests",
+                              None, self._run_affected_tests))
+        self.register(Command("run_failed_tests", "Re-run Failed Tests",
+                              None, self._run_failed_tests))
         self.register(Command("format_document", "Format Document",
                               "<Ctrl><Shift>i", self._format_document))
+        self.register(Command("format_workspace", "Format Workspace",
+                              None, self._format_workspace))
 
     def register(self, command):
         self._commands[command.id] = command
@@ -217,24 +276,230 @@ class EditorCommands:
         if self.app.editor_manager:
             self.app.editor_manager.close_current_tab()
 
-    def _run_file(self):
+    def _document_to_run(self):
+        """Return the active document saved to disk, or None."""
         if not self.app.runner or not self.app.editor_manager:
-            return
+            return None
         doc = self.app.editor_manager.active_document
         if not doc:
-            return
+            return None
         # Save first if dirty or untitled
         if not doc.path:
             self.app.editor_manager.save_current_as()
             if not doc.path:
-                return
+                return None
         elif doc.dirty:
             doc.save()
-        # Switch to Output tab and clear
-        if self.app.bottom_notebook:
-            self.app.bottom_notebook.set_current_page(1)
-        self.app.output_panel.clear()
-        self.app.runner.run(doc.path)
+        return doc
+
+    def _run_file(self, use_pty=False):
+        doc = self._document_to_run()
+        if not doc:
+            return
+        session = self.app.runner.run(doc.path, use_pty=use_pty)
+        if session and use_pty:
+            session.panel.textview.grab_focus()
+
+    def _run_file_terminal(self):
+        self._run_file(use_pty=True)
+
+    def _run_file_profile(self):
+        doc = self._document_to_run()
+        if not doc:
+            return
+        fd, stats_path = tempfile.mkstemp(prefix="pywriter-", suffix=".prof")
+        os.close(fd)
+        title = f"{Path(doc.path).name} (profile)"
+        session = self.app.runner.run(doc.path, ["-m", "cProfile", "-o", stats_path],
+                                      title=title)
+        if not session:
+            os.unlink(stats_path)
+            return
+
+        def on_exit(session):
+            # cProfile only writes the stats when the script ends by itself
+            if os.path.getsize(stats_path) == 0:
+                os.unlink(stats_path)
+                session.write("No profile data: the run was stopped before it finished\n",
+                              "error")
+                return
+            self.app.show_profile(stats_path, title)
+
+        session.on_exit.append(on_exit)
+
+    def _run_file_memory(self):
+        doc = self._document_to_run()
+        if not doc:
+            return
+        snapshot_dir = tempfile.mkdtemp(prefix="pywriter-mem-")
+        session = self.app.runner.run(doc.path, [str(MEMORY_BOOTSTRAP), snapshot_dir],
+                                      title=f"{Path(doc.path).name} (memory)")
+        if not session:
+            os.rmdir(snapshot_dir)
+            return
+        self.app.show_memory(session, snapshot_dir)
+
+    def _run_file_sampling(self):
+        doc = self._document_to_run()
+        if not doc:
+            return
+        read_fd, write_fd = os.pipe()
+        interval = self.app.config.get("sampler_interval_ms", 10)
+        session = self.app.runner.run(
+            doc.path, [str(SAMPLER_BOOTSTRAP), str(write_fd), str(interval)],
+            title=f"{Path(doc.path).name} (sampling)", pass_fds=(write_fd,))
+        if not session:
+            os.close(read_fd)
+            return
+        self.app.show_samples(session, read_fd)
+
+    def _debug_file(self):
+        """Start the active file under the debugger, or continue a stopped one."""
+        panel = self.app.debug_panel
+        if panel and panel.stopped:
+            panel.resume("continue")
+            return
+        doc = self._document_to_run()
+        if not doc:
+            return
+        cmd_r, cmd_w = os.pipe()
+        event_r, event_w = os.pipe()
+        session = self.app.runner.run(
+            doc.path, [str(DEBUG_BOOTSTRAP), str(cmd_r), str(event_w)],
+            title=f"{Path(doc.path).name} (debug)", pass_fds=(cmd_r, event_w))
+        if not session:
+            os.close(cmd_w)
+            os.close(event_r)
+            return
+        self.app.show_debugger(session, cmd_w, event_r)
+
+    def _debug_resume(self, command):
+        if self.app.debug_panel:
+            self.app.debug_panel.resume(command)
+
+    def _toggle_breakpoint(self):
+        doc = self.app.editor_manager.active_document if self.app.editor_manager else None
+        if doc:
+            line = doc.buffer.get_iter_at_mark(doc.buffer.get_insert()).get_line()
+            self.app.editor_manager.toggle_breakpoint(doc, line)
+
+    def _run_file_coverage(self):
+        doc = self._document_to_run()
+        if not doc:
+            return
+        fd, data_path = tempfile.mkstemp(prefix="pywriter-", suffix=".coverage.json")
+        os.close(fd)
+        title = f"{Path(doc.path).name} (coverage)"
+        session = self.app.runner.run(doc.path, [str(COVERAGE_BOOTSTRAP), data_path],
+                                      title=title)
+        if not session:
+            os.unlink(data_path)
+            return
+
+        def on_exit(session):
+            data = CoverageData.load([data_path])
+            os.unlink(data_path)
+            if data is None:
+                session.write("No coverage data: the run was stopped before it finished\n",
+                              "error")
+                return
+            self.app.show_coverage(data, title)
+
+        session.on_exit.append(on_exit)
+
+    def _run_file_imports(self):
+        doc = self._document_to_run()
+        if not doc:
+            return
+        title = f"{Path(doc.path).name} (imports)"
+        profile = ImportProfile()
+        session = self.app.runner.run(doc.path, ["-X", "importtime"], title=title,
+                                      divert=(IMPORT_TIME_PREFIX, profile.feed_line))
+        if session:
+            session.on_exit.append(lambda s: self.app.show_import_profile(
+                profile, title, Path(doc.path).parent))
+
+    def _run_selection(self):
+        """Run the selection, or the current line and move to the next one."""
+        doc = self.app.editor_manager.active_document if self.app.editor_manager else None
+        if not doc or not self.app.kernel:
+            return
+        buf = doc.buffer
+        if buf.get_has_selection():
+            start, end = buf.get_selection_bounds()
+            label = f"lines {start.get_line() + 1}-{end.get_line() + 1}"
+        else:
+            start = buf.get_iter_at_mark(buf.get_insert())
+            start.set_line_offset(0)
+            end = start.copy()
+            if not end.ends_line():
+                end.forward_to_line_end()
+            label = f"line {start.get_line() + 1}"
+            next_line = end.copy()
+            if next_line.forward_line():
+                buf.place_cursor(next_line)
+        code = buf.get_text(start, end, True)
+        self.app.kernel.execute(code, doc.path, start.get_line() + 1, label)
+
+    def _run_cell(self):
+        doc = self.app.editor_manager.active_document if self.app.editor_manager else None
+        if not doc or not self.app.kernel:
+            return
+        buf = doc.buffer
+        text = buf.get_text(buf.get_start_iter(), buf.get_end_iter(), True)
+        lines = text.split("\n")
+        start, end = find_cell(lines, buf.get_iter_at_mark(buf.get_insert()).get_line())
+        code = "\n".join(lines[start:end])
+        self.app.kernel.execute(code, doc.path, start + 1, f"cell at line {start + 1}")
+
+    def _interrupt_kernel(self):
+        if self.app.kernel:
+            self.app.kernel.interrupt()
+
+    def _restart_kernel(self):
+        doc = self.app.editor_manager.active_document if self.app.editor_manager else None
+        if self.app.kernel:
+            self.app.kernel.restart(doc.path if doc else None)
+
+    def _toggle_watch(self):
+        self.app.toggle_watch()
+
+    def _show_run_history(self):
+        doc = self.app.editor_manager.active_document if self.app.editor_manager else None
+        if not doc or not doc.path or not self.app.runner:
+            return
+        output = self.app.output_panel
+        table = self.app.runner.history.format_table(doc.path)
+        output.append(f"\nRecent runs of {Path(doc.path).name}:\n", "bold")
+        output.append((table or "No runs recorded yet") + "\n")
+        self.app.show_run_tab(output)
+
+    def _save_dirty_documents(self):
+        if not self.app.editor_manager:
+            return
+        for doc in self.app.editor_manager.documents:
+            if doc.path and doc.dirty:
+                doc.save()
+
+    def _run_tests(self):
+        self._save_dirty_documents()
+        self.app.show_tests()
+        self.app.tests_panel.run()
+
+    def _run_tests_coverage(self):
+        self._save_dirty_documents()
+        self.app.show_tests()
+        self.app.tests_panel.run(coverage=True)
+
+    def _run_affected_tests(self):
+        self._save_dirty_documents()
+        self.app.show_tests()
+        self.app.tests_panel.run_affected()
+
+    def _run_failed_tests(self):
+        self._save_dirty_documents()
+        self.app.show_tests()
+        self.app.tests_panel.run_failed()
 
     def _format_document(self):
         if self.app.python_provider:
@@ -243,6 +508,11 @@ class EditorCommands:
                 doc.save()
                 self.app.python_provider.format_file(doc.path, self._on_format_done)
 
+    def _format_workspace(self):
+        root = self.app.workspace.root if self.app.workspace else None
+        if root and self.app.python_provider:
+            self.app.python_provider.format_paths([root])
+
     def _on_format_done(self, path, success):
         if success and self.app.editor_manager:
             self.app.editor_manager.reload_document(path)
@@ -1,9 +1,14 @@
+import difflib
+import re
 from pathlib import Path
 
 import gi
 gi.require_version("GtkSource", "4")
 from gi.repository import GtkSource, GLib
 
+# A line and its terminator, as GtkTextBuffer splits lines
+_LINE_RE = re.compile(r"[^\r\n\u2029]*(?:\r\n|[\r\n\u2029])|[^\r\n\u2029]+$")
+
 
 class Document:
     def __init__(self, path=None, encoding="utf-8", eol_mode="unix"):
@@ -23,8 +28,12 @@ class Document:
 
         self.buffer.set_max_undo_levels(-1)
         self.buffer.connect("modified-changed", self._on_modified_changed)
+        self.buffer.connect("changed", self._on_changed)
 
         self._dirty = False
+        self.on_saved = []  # callables(doc), run after each successful save
+        # Bumped on every edit so background results can be matched to a snapshot
+        self.version = 0
 
         if self.path and self.path.exists():
             self._load_from_disk()
@@ -41,6 +50,9 @@ class Document:
     def _on_modified_changed(self, buf):
         self._dirty = buf.get_modified()
 
+    def _on_changed(self, buf):
+        self.version += 1
+
     def _load_from_disk(self):
         try:
             text = self.path.read_text(encoding=self.encoding)
@@ -52,6 +64,53 @@ class Document:
         except (OSError, UnicodeDecodeError) as e:
             print(f"Error loading {self.path}: {e}")
 
+    def reload_from_disk(self):
+        """Re-read the file, touching only the lines that changed on disk."""
+        try:
+            text = self.path.read_text(encoding=self.encoding)
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"Error loading {self.path}: {e}")
+            return False
+        self.apply_text(text)
+        self.buffer.set_modified(False)
+        return True
+
+    def apply_text(self, text):
+        """Replace the buffer content with text using minimal line edits.
+
+        Unchanged lines keep their marks, so the cursor, selection and scroll
+        position survive, and the change is a single undoable action.
+        """
+        old_lines = self._split_lines(self.get_text())
+        new_lines = self._split_lines(text)
+        matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+        opcodes = [op for op in matcher.get_opcodes() if op[0] != "equal"]
+        if not opcodes:
+            return
+        buf = self.buffer
+        buf.begin_user_action()
+        # Apply from the bottom up so earlier line numbers stay valid
+        for tag, i1, i2, j1, j2 in reversed(opcodes):
+            start = self._iter_at_line_start(i1, len(old_lines))
+            end = self._iter_at_line_start(i2, len(old_lines))
+            if tag != "insert":
+                buf.delete(start, end)
+                start = self._iter_at_line_start(i1, len(old_lines))
+            if tag != "delete":
+                buf.insert(start, "".join(new_lines[j1:j2]))
+        buf.end_user_action()
+
+    @staticmethod
+    def _split_lines(text):
+        # Split where GtkTextBuffer ends a line; splitlines() also splits on
+        # form feeds, "\x1c" or "\u2028" and would get out of step with it
+        return _LINE_RE.findall(text)
+
+    def _iter_at_line_start(self, line, line_count):
+        if line >= line_count:
+            return self.buffer.get_end_iter()
+        return self.buffer.get_iter_at_line(line)
+
     def save(self, path=None):
         if path:
             self.path = Path(path)
@@ -63,10 +122,12 @@ class Document:
             text = self.buffer.get_text(start, end, True)
             self.path.write_text(text, encoding=self.encoding)
             self.buffer.set_modified(False)
-            return True
         except OSError as e:
             print(f"Error saving {self.path}: {e}")
             return False
+        for callback in self.on_saved:
+            callback(self)
+        return True
 
     def get_text(self):
         start = self.buffer.get_start_iter()
@@ -1,11 +1,16 @@
 import gi
 gi.require_version("Gtk", "3.0")
 gi.require_version("GtkSource", "4")
-from gi.repository import Gtk, Gdk, GLib, GtkSource
+from gi.repository import Gtk, Gdk, GLib, GtkSource, Pango
 
 from pathlib import Path
 from .document import Document
 
+BREAKPOINT = "breakpoint"
+DEBUG_CURRENT = "debug-current"
+COVERAGE_HIT = "coverage-hit"
+COVERAGE_MISSED = "coverage-missed"
+
 
 class FindBar(Gtk.Revealer):
     """Inline find/replace bar for the editor."""
@@ -179,6 +184,12 @@ class EditorManager(Gtk.Box):
         self.find_bar = FindBar(self)
         self.pack_start(self.find_bar, False, False, 0)
 
+        self.breadcrumbs = Gtk.Label(label="")
+        self.breadcrumbs.set_name("breadcrumbs")
+        self.breadcrumbs.set_xalign(0)
+        self.breadcrumbs.set_ellipsize(Pango.EllipsizeMode.START)
+        self.pack_start(self.breadcrumbs, False, False, 0)
+
         self.notebook = Gtk.Notebook()
         self.notebook.set_scrollable(True)
         self.notebook.connect("switch-page", self._on_switch_page)
@@ -193,6 +204,7 @@ class EditorManager(Gtk.Box):
                     return doc
 
         doc = Document(path)
+        doc.on_saved.append(self.app.on_document_saved)
         self._documents.append(doc)
         view = self._create_view(doc)
         self._views[id(doc)] = view
@@ -243,11 +255,86 @@ class EditorManager(Gtk.Box):
         space_drawer = view.get_space_drawer()
         space_drawer.set_enable_matrix(False)
 
+        # Breakpoints and the debugger's current line live in the gutter
+        attrs = GtkSource.MarkAttributes()
+        attrs.set_icon_name("media-record-symbolic")
+        view.set_mark_attributes(BREAKPOINT, attrs, 10)
+        attrs = GtkSource.MarkAttributes()
+        attrs.set_icon_name("go-next-symbolic")
+        color = Gdk.RGBA()
+        color.parse("rgba(255, 204, 0, 0.25)")
+        attrs.set_background(color)
+        view.set_mark_attributes(DEBUG_CURRENT, attrs, 20)
+        for category, rgba in ((COVERAGE_HIT, "rgba(78, 201, 176, 0.10)"),
+                               (COVERAGE_MISSED, "rgba(244, 71, 71, 0.15)")):
+            attrs = GtkSource.MarkAttributes()
+            color = Gdk.RGBA()
+            color.parse(rgba)
+            attrs.set_background(color)
+            view.set_mark_attributes(category, attrs, 0)
+        view.connect("line-mark-activated",
+                     lambda v, it, event, d=doc: self.toggle_breakpoint(d, it.get_line()))
+
         # Connect for lint debounce
         doc.buffer.connect("changed", self._on_buffer_changed)
 
         return view
 
+    def toggle_breakpoint(self, doc, line):
+        """Add or remove the breakpoint on 0-based line of doc."""
+        buf = doc.buffer
+        it = buf.get_iter_at_line(line)
+        if buf.get_source_marks_at_line(line, BREAKPOINT):
+            end = it.copy()
+            if not end.ends_line():
+                end.forward_to_line_end()
+            buf.remove_source_marks(it, end, BREAKPOINT)
+        else:
+            buf.create_source_mark(None, BREAKPOINT, it)
+        self.app.on_breakpoints_changed()
+
+    def breakpoints(self):
+        """Return {absolute path: [1-based lines]} for the open documents.
+
+        The marks move with edits, so the lines match the text as it is now.
+        """
+        result = {}
+        for doc in self._documents:
+            if not doc.path:
+                continue
+            lines = []
+            it = doc.buffer.get_start_iter()
+            if doc.buffer.get_source_marks_at_iter(it, BREAKPOINT):
+                lines.append(1)
+            while doc.buffer.forward_iter_to_source_mark(it, BREAKPOINT):
+                lines.append(it.get_line() + 1)
+            if lines:
+                result[str(doc.path.resolve())] = sorted(set(lines))
+        return result
+
+    def set_debug_line(self, path, line):
+        """Show the debugger's current line; path None just clears it."""
+        for doc in self._documents:
+            buf = doc.buffer
+            buf.remove_source_marks(buf.get_start_iter(), buf.get_end_iter(), DEBUG_CURRENT)
+        if path:
+            self.goto_line(path, line)
+            doc = self.find_document(path)
+            if doc:
+                doc.buffer.create_source_mark(
+                    None, DEBUG_CURRENT, doc.buffer.get_iter_at_line(max(0, line - 1)))
+
+    def set_coverage_marks(self, doc, hits, missed):
+        """Highlight 1-based hit and missed lines of doc, replacing earlier ones."""
+        buf = doc.buffer
+        start, end = buf.get_start_iter(), buf.get_end_iter()
+        buf.remove_source_marks(start, end, COVERAGE_HIT)
+        buf.remove_source_marks(start, end, COVERAGE_MISSED)
+        for lines, category in ((hits, COVERAGE_HIT), (missed, COVERAGE_MISSED)):
+            for line in lines:
+                if line <= buf.get_line_count():
+                    buf.create_source_mark(None, category, buf.get_iter_at_line(line - 1))
+
     def _on_buffer_changed(self, buf):
         if self.app.python_provider and self.active_document:
             self.app.python_provider.schedule_lint(self.active_document)
@@ -280,6 +367,10 @@ class EditorManager(Gtk.Box):
             self.active_document = self._documents[page_num]
             self.app.on_active_document_changed(self.active_document)
 
+    def set_breadcrumbs(self, names):
+        """Show the enclosing class/function chain above the editor."""
+        self.breadcrumbs.set_text(" \u203a ".join(names))
+
     def get_active_view(self):
         if self.active_document:
             return self._views.get(id(self.active_document))
@@ -396,6 +487,7 @@ class EditorManager(Gtk.Box):
         self._documents.remove(doc)
         del self._views[id(doc)]
         self.notebook.remove_page(idx)
+        self.app.on_document_closed(doc)
 
         if self._documents:
             new_idx = min(idx, len(self._documents) - 1)
@@ -409,10 +501,21 @@ class EditorManager(Gtk.Box):
         path = Path(path)
         for doc in self._documents:
             if doc.path and doc.path.resolve() == path.resolve():
-                doc._load_from_disk()
+                doc.reload_from_disk()
                 self._update_tab_label(doc)
                 break
 
+    def find_document(self, path):
+        path = Path(path).resolve()
+        for doc in self._documents:
+            if doc.path and doc.path.resolve() == path:
+                return doc
+        return None
+
+    @property
+    def documents(self):
+        return list(self._documents)
+
     def goto_line(self, path, line):
         path = Path(path)
         doc = None
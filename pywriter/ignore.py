@@ -0,0 +1,8 @@
+"""Directories and file types the IDE skips when it walks a workspace.
+
+Kept free of GTK so background code (formatting, import scanning) can use it.
+"""
+
+IGNORE_DIRS = {".git", "__pycache__", ".venv", "venv", "node_modules", ".mypy_cache",
+               ".ruff_cache", ".pytest_cache", "*.egg-info", ".tox", "build", "dist"}
+IGNORE_FILES = {".pyc", ".pyo", ".so", ".o"}
@@ -1,16 +1,33 @@
+import hashlib
+import os
 import subprocess
 import threading
 import shutil
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 from gi.repository import GLib
 
+from .format_daemon import FormatDaemon
+from ..ignore import IGNORE_DIRS
+
+BATCH_MAX_FILES = 64
+
 
 class FormatRunner:
-    """Runs ruff format or black on a file asynchronously."""
+    """Runs ruff format or black on a file asynchronously.
+
+    ruff is preferred when installed. Otherwise black is used, through a
+    resident worker when enabled, with the per-call subprocess as fallback.
+    """
 
     def __init__(self, app):
         self.app = app
+        self.daemon = None
+        if app.config.get("format_daemon", True):
+            self.daemon = FormatDaemon(app.config.get("format_daemon_python"))
+        self._batch_running = False
+        self._formatted_hashes = {}  # path -> content hash after last format
 
     def run(self, filepath, callback):
         """Format filepath in background thread.
@@ -19,7 +36,66 @@ class FormatRunner:
         threading.Thread(target=self._run_format, args=(filepath, callback),
                          daemon=True).start()
 
+    def run_batch(self, paths, callback=None, exclude=()):
+        """Format every .py file under paths (files or folders) in the background.
+
+        Files are grouped into a few formatter invocations that run in parallel,
+        one process per batch and at most one batch per CPU core. Files whose
+        content is unchanged since they were last formatted are skipped.
+        Paths in exclude (e.g. open documents with unsaved edits) are left alone.
+        callback(formatted_paths) is called on the main thread.
+        """
+        if self._batch_running:
+            self._write_output("Format already in progress", "info")
+            return False
+        self._batch_running = True
+        exclude = {Path(p).resolve() for p in exclude}
+        threading.Thread(target=self._run_batch,
+                         args=([Path(p) for p in paths], callback, exclude),
+                         daemon=True).start()
+        return True
+
+    def shutdown(self):
+        if self.daemon:
+            self.daemon.stop()
+
     def _run_format(self, filepath, callback):
+        success = self._run_daemon(filepath)
+        if success is None:
+            success = self._run_subprocess(filepath)
+        if success:
+            self._remember([filepath.resolve()])
+        GLib.idle_add(callback, filepath, success)
+
+    def _run_daemon(self, filepath):
+        """Format through the resident worker. Returns None to request fallback."""
+        # The worker runs black: only use it where black would be picked anyway
+        if not self.daemon or shutil.which("ruff"):
+            return None
+        try:
+            source = filepath.read_text(encoding="utf-8")
+        except (OSError, UnicodeDecodeError):
+            return None
+        result = self.daemon.format(source, filepath.resolve())
+        if result is None:
+            return None
+        changed, text = result
+        if changed is None:
+            if self.app.output_panel:
+                GLib.idle_add(self.app.output_panel.write_line,
+                              f"black error: {text}", "error")
+            return False
+        if changed:
+            try:
+                filepath.write_text(text, encoding="utf-8")
+            except OSError as e:
+                if self.app.output_panel:
+                    GLib.idle_add(self.app.output_panel.write_line,
+                                  f"Format error: {e}", "error")
+                return False
+        return True
+
+    def _run_subprocess(self, filepath):
         success = False
         # Try ruff format first, then black
         if shutil.which("ruff"):
@@ -51,5 +127,98 @@ class FormatRunner:
             if self.app.output_panel:
                 GLib.idle_add(self.app.output_panel.write_line,
                               "No formatter found. Install ruff or black.", "error")
+        return success
 
-        GLib.idle_add(callback, filepath, success)
+    def _run_batch(self, paths, callback, exclude):
+        formatted = []
+        try:
+            before = {}  # path -> content hash before formatting
+            for f in self._collect_files(paths):
+                digest = self._hash_file(f) if f not in exclude else None
+                if digest is not None and self._formatted_hashes.get(f) != digest:
+                    before[f] = digest
+            files = list(before)
+            if not files:
+                self._write_output("Format: all files already formatted", "info")
+                return
+            cmd = self._batch_command()
+            if not cmd:
+                self._write_output("No formatter found. Install ruff or black.", "error")
+                return
+
+            workers = max(1, min(os.cpu_count() or 1, len(files)))
+            size = min(BATCH_MAX_FILES, -(-len(files) // workers))
+            batches = [files[i:i + size] for i in range(0, len(files), size)]
+            self._write_output(f"Formatting {len(files)} files in {len(batches)} "
+                               f"batches ({workers} workers)...", "info")
+
+            done = 0
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(self._format_batch, cmd, batch)
+                           for batch in batches]
+                for future in as_completed(futures):
+                    batch, ok, stderr = future.result()
+                    done += len(batch)
+                    if stderr.strip():
+                        self._write_output(stderr.rstrip(), None if ok else "error")
+                    # One bad file fails the whole batch, but the formatter
+                    # still rewrites the others: decide per file
+                    for f in batch:
+                        after = self._hash_file(f)
+                        if after is None:
+                            continue
+                        if after != before[f]:
+                            formatted.append(f)
+                            self._formatted_hashes[f] = after
+                        elif ok:
+                            self._formatted_hashes[f] = after
+                    self._write_output(f"Formatted {done}/{len(files)} files", "info")
+        finally:
+            self._batch_running = False
+            if callback:
+                GLib.idle_add(callback, formatted)
+
+    def _collect_files(self, paths):
+        files = []
+        for path in paths:
+            if path.is_file():
+                if path.suffix == ".py":
+                    files.append(path.resolve())
+                continue
+            for dirpath, dirnames, filenames in os.walk(path):
+                dirnames[:] = [d for d in dirnames
+                               if d not in IGNORE_DIRS and not d.endswith(".egg-info")]
+                files.extend(Path(dirpath, name).resolve()
+                             for name in filenames if name.endswith(".py"))
+        return sorted(set(files))
+
+    def _remember(self, files):
+        for f in files:
+            digest = self._hash_file(f)
+            if digest:
+                self._formatted_hashes[f] = digest
+
+    def _hash_file(self, path):
+        try:
+            return hashlib.sha1(path.read_bytes()).hexdigest()
+        except OSError:
+            return None
+
+    def _batch_command(self):
+        if shutil.which("ruff"):
+            return ["ruff", "format"]
+        if shutil.which("black"):
+            return ["black", "-q"]
+        return None
+
+    def _format_batch(self, cmd, batch):
+        try:
+            result = subprocess.run(cmd + [str(f) for f in batch],
+                                    capture_output=True, text=True, timeout=300)
+            return batch, result.returncode == 0, result.stderr
+        except (subprocess.TimeoutExpired, OSError) as e:
+            return batch, False, f"Format error: {e}"
+
+    def _write_output(self, text, tag=None):
+        if self.app.output_panel:
+            GLib.idle_add(self.app.output_panel.write_line, text, tag)
@@ -0,0 +1,174 @@
+import json
+import os
+import selectors
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+WORKER_SCRIPT = Path(__file__).with_name("format_worker.py")
+
+
+class FormatDaemon:
+    """Long-lived black worker process with health checks and auto-restart.
+
+    All methods are blocking and meant to be called from background threads.
+    format() returns None whenever the daemon cannot serve the request, so the
+    caller can fall back to the per-call subprocess formatter.
+    """
+
+    START_TIMEOUT = 15.0
+    REQUEST_TIMEOUT = 30.0
+    PING_TIMEOUT = 2.0
+    HEALTH_INTERVAL = 30.0
+    MAX_FAILURES = 3
+    COOLDOWN = 60.0
+
+    def __init__(self, python=None):
+        self.python = python or sys.executable
+        self._process = None
+        self._buffer = b""
+        self._lock = threading.Lock()
+        self._last_ok = 0.0
+        self._failures = 0
+        self._disabled_until = 0.0
+        self.version = None
+        self.last_error = None
+
+    @property
+    def running(self):
+        return self._process is not None and self._process.poll() is None
+
+    def format(self, source, path=None):
+        """Return (changed, text) or (None, error) on a formatting error,
+        or None if the daemon is unavailable."""
+        with self._lock:
+            if not self._ensure_healthy():
+                return None
+            response = self._request({"op": "format", "source": source,
+                                      "path": str(path) if path else None},
+                                     self.REQUEST_TIMEOUT)
+            if response is None:
+                self._kill()
+                return None
+            self._last_ok = time.monotonic()
+            if not response.get("ok"):
+                return None, response.get("error", "unknown error")
+            return response.get("changed", False), response.get("source", source)
+
+    def ping(self):
+        with self._lock:
+            return self.running and self._ping()
+
+    def stop(self):
+        with self._lock:
+            if self.running:
+                try:
+                    self._process.stdin.close()
+                    self._process.wait(timeout=1)
+                except (OSError, subprocess.TimeoutExpired):
+                    pass
+            self._kill()
+
+    # --- Internals (caller holds self._lock) ---
+
+    def _ensure_healthy(self):
+        now = time.monotonic()
+        if now < self._disabled_until:
+            return False
+        if self.running:
+            if now - self._last_ok < self.HEALTH_INTERVAL or self._ping():
+                return True
+            self._kill()
+        if self._start():
+            self._failures = 0
+            return True
+        self._failures += 1
+        if self._failures >= self.MAX_FAILURES:
+            # Never shortens a permanent disable set by _start()
+            self._disabled_until = max(self._disabled_until, now + self.COOLDOWN)
+            self._failures = 0
+        return False
+
+    def _start(self):
+        self._kill()
+        try:
+            self._process = subprocess.Popen(
+                [self.python, str(WORKER_SCRIPT)],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+        except OSError as e:
+            self.last_error = str(e)
+            self._process = None
+            return False
+        hello = self._read_message(self.START_TIMEOUT)
+        if hello is not None and not hello.get("ok"):
+            # The worker answered but cannot format (black is missing):
+            # restarting will not help, so stay on the fallback path.
+            self.last_error = hello.get("error")
+            self._disabled_until = float("inf")
+            self._kill()
+            return False
+        if hello is None:
+            self._kill()
+            return False
+        self.version = hello.get("version")
+        self._last_ok = time.monotonic()
+        return True
+
+    def _ping(self):
+        response = self._request({"op": "ping"}, self.PING_TIMEOUT)
+        if response and response.get("ok"):
+            self._last_ok = time.monotonic()
+            return True
+        return False
+
+    def _request(self, message, timeout):
+        try:
+            self._process.stdin.write(json.dumps(message).encode() + b"\n")
+            self._process.stdin.flush()
+        except (OSError, ValueError) as e:
+            self.last_error = str(e)
+            return None
+        return self._read_message(timeout)
+
+    def _read_message(self, timeout):
+        fd = self._process.stdout.fileno()
+        deadline = time.monotonic() + timeout
+        with selectors.DefaultSelector() as sel:
+            sel.register(fd, selectors.EVENT_READ)
+            while b"\n" not in self._buffer:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not sel.select(remaining):
+                    self.last_error = "worker timed out"
+                    return None
+                chunk = os.read(fd, 65536)
+                if not chunk:
+                    self.last_error = "worker exited"
+                    return None
+                self._buffer += chunk
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        try:
+            return json.loads(line)
+        except ValueError:
+            self.last_error = "malformed worker response"
+            return None
+
+    def _kill(self):
+        if self._process is not None:
+            if self._process.poll() is None:
+                self._process.kill()
+                try:
+                    self._process.wait(timeout=1)
+                except subprocess.TimeoutExpired:
+                    pass
+            for stream in (self._process.stdin, self._process.stdout):
+                try:
+                    stream.close()
+                except OSError:
+                    pass
+        self._process = None
+        self._buffer = b""
@@ -0,0 +1,96 @@
+"""Resident formatter worker.
+
+Runs as a standalone script in a child interpreter (it must not import gi or
+anything from the pywriter package). Black is imported once at startup and
+requests are served over stdin/stdout, one JSON object per line:
+
+    {"op": "ping"}                          -> {"ok": true, "version": "..."}
+    {"op": "format", "source": "...",
+     "path": "/abs/file.py"}                -> {"ok": true, "changed": bool,
+                                                "source": "..."}
+
+Errors are reported as {"ok": false, "error": "..."}.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+try:
+    import black
+except ImportError:
+    black = None
+
+
+_mode_cache = {}
+
+
+def _mode_for(path):
+    """Build a black.Mode from the nearest pyproject.toml, cached per file."""
+    if not path:
+        return black.Mode()
+    try:
+        project = black.find_pyproject_toml((str(Path(path).parent),))
+    except Exception:
+        project = None
+    if project in _mode_cache:
+        return _mode_cache[project]
+
+    mode = black.Mode()
+    if project:
+        try:
+            cfg = black.parse_pyproject_toml(project)
+            versions = {black.TargetVersion[v.upper()]
+                        for v in cfg.get("target_version", [])}
+            mode = black.Mode(
+                target_versions=versions,
+                line_length=cfg.get("line_length", black.DEFAULT_LINE_LENGTH),
+                string_normalization=not cfg.get("skip_string_normalization", False),
+                magic_trailing_comma=not cfg.get("skip_magic_trailing_comma", False),
+            )
+        except Exception:
+            mode = black.Mode()
+    _mode_cache[project] = mode
+    return mode
+
+
+def _handle(request):
+    op = request.get("op")
+    if op == "ping":
+        return {"ok": True, "version": black.__version__}
+    if op == "format":
+        source = request.get("source", "")
+        try:
+            formatted = black.format_file_contents(
+                source, fast=False, mode=_mode_for(request.get("path")))
+        except black.NothingChanged:
+            return {"ok": True, "changed": False, "source": source}
+        except Exception as e:
+            return {"ok": False, "error": str(e)}
+        return {"ok": True, "changed": True, "source": formatted}
+    return {"ok": False, "error": f"unknown op: {op}"}
+
+
+def main():
+    if black is None:
+        sys.stdout.write(json.dumps({"ok": False, "error": "black not installed"}) + "\n")
+        sys.stdout.flush()
+        return 3
+
+    sys.stdout.write(json.dumps({"ok": True, "version": black.__version__}) + "\n")
+    sys.stdout.flush()
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            response = _handle(json.loads(line))
+        except ValueError as e:
+            response = {"ok": False, "error": f"bad request: {e}"}
+        sys.stdout.write(json.dumps(response) + "\n")
+        sys.stdout.flush()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
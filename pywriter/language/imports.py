@@ -0,0 +1,202 @@
+import ast
+import hashlib
+import os
+from collections import deque
+from pathlib import Path
+
+from ..ignore import IGNORE_DIRS
+from ..tools.interpreter import VENV_DIRS
+
+
+def is_test_file(path):
+    name = Path(path).name
+    return name.endswith(".py") and (name.startswith("test_") or name.endswith("_test.py"))
+
+
+def module_names(root, path):
+    """Dotted names path can be imported as, from root or a root/src layout."""
+    names = []
+    for base in (root, root / "src"):
+        try:
+            parts = list(path.relative_to(base).with_suffix("").parts)
+        except ValueError:
+            continue
+        if parts and parts[-1] == "__init__":
+            parts.pop()
+        if parts:
+            names.append(".".join(parts))
+    return names
+
+
+def parse_imports(source, module, is_package):
+    """Return the absolute module names imported by source.
+
+    For "from a import b", both "a" and "a.b" are returned, since b may be
+    a submodule. Relative imports are resolved against module.
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return set()
+    package = module if is_package else module.rpartition(".")[0]
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                parts = package.split(".") if package else []
+                if node.level - 1 > len(parts):
+                    continue
+                base = ".".join(parts[:len(parts) - (node.level - 1)])
+                if node.module:
+                    base = f"{base}.{node.module}" if base else node.module
+            else:
+                base = node.module or ""
+            if base:
+                names.add(base)
+            names.update(f"{base}.{alias.name}" if base else alias.name
+                         for alias in node.names if alias.name != "*")
+    return names
+
+
+class ImportGraph:
+    """Import dependency graph of a workspace's Python files.
+
+    Files are parsed with ast; the imports of each file are cached by content
+    hash (with an mtime/size check to skip reading unchanged files), so a
+    rebuild only parses what changed.
+    """
+
+    def __init__(self):
+        self._cache = {}  # path -> (mtime_ns, size, digest, imported names)
+        self.digests = {}  # path -> content hash, from the latest build
+        self.modules = {}  # dotted name -> path
+        self.imports = {}  # path -> set of imported dotted names
+        self.importers = {}  # path -> set of paths that import it
+        self._root = None
+
+    def build(self, root):
+        root = Path(root).resolve()
+        self._root = root
+        files = self._collect_files(root)
+        self.digests = {}
+        self.modules = {}
+        self.imports = {}
+        for path in files:
+            for name in module_names(root, path):
+                self.modules.setdefault(name, path)
+        for path in files:
+            entry = self._scan(root, path)
+            if entry:
+                self.digests[path] = entry[2]
+                self.imports[path] = entry[3]
+        self._cache = {p: e for p, e in self._cache.items() if p in self.digests}
+
+        self.importers = {}
+        for path, names in self.imports.items():
+            for dep in self._dependencies(root, path, names):
+                if dep != path:
+                    self.importers.setdefault(dep, set()).add(path)
+        return self
+
+    def _collect_files(self, root):
+        files = []
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames
+                           if d not in IGNORE_DIRS and d not in VENV_DIRS
+                           and not d.endswith(".egg-info")]
+            files.extend(Path(dirpath, name) for name in filenames if name.endswith(".py"))
+        return files
+
+    def _scan(self, root, path):
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        cached = self._cache.get(path)
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            return cached
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        digest = hashlib.sha1(data).hexdigest()
+        if cached and cached[2] == digest:
+            names = cached[3]
+        else:
+            module = (module_names(root, path) or [path.stem])[0]
+            names = parse_imports(data, module, path.name == "__init__.py")
+        entry = self._cache[path] = (st.st_mtime_ns, st.st_size, digest, names)
+        return entry
+
+    def _dependencies(self, root, path, names):
+        for name in names:
+            # Importing a.b.c also runs a/__init__.py and a/b/__init__.py
+            parts = name.split(".")
+            for i in range(1, len(parts) + 1):
+                dep = self.modules.get(".".join(parts[:i]))
+                if dep:
+                    yield dep
+        if is_test_file(path):
+            # pytest loads every conftest.py from the rootdir down to the test
+            for folder in path.parents:
+                conftest = folder / "conftest.py"
+                if conftest in self.digests:
+                    yield conftest
+                if folder == root:
+                    break
+
+    def dependencies(self, path):
+        """All workspace files path imports, directly or indirectly."""
+        path = Path(path).resolve()
+        seen = set()
+        stack = [path]
+        while stack:
+            current = stack.pop()
+            for dep in self._dependencies(self._root, current, self.imports.get(current, ())):
+                if dep not in seen and dep != path:
+                    seen.add(dep)
+                    stack.append(dep)
+        return seen
+
+    def importers_of_module(self, name):
+        """Files importing name, or anything inside it (for deleted modules)."""
+        prefix = name + "."
+        return {path for path, names in self.imports.items()
+                if any(n == name or n.startswith(prefix) for n in names)}
+
+    def affected_tests(self, changed, deleted_modules=()):
+        """Map each test file depending on changed files to the reason chain.
+
+        The chain runs from the test file through its imports to a changed
+        file (or a deleted module name).
+        """
+        via = {}  # path -> next path towards the change, or None at the change
+        queue = deque()
+        for path in changed:
+            if path in self.digests and path not in via:
+                via[path] = None
+                queue.append(path)
+        for name in deleted_modules:
+            for path in self.importers_of_module(name):
+                if path not in via:
+                    via[path] = name
+                    queue.append(path)
+        while queue:
+            path = queue.popleft()
+            for importer in self.importers.get(path, ()):
+                if importer not in via:
+                    via[importer] = path
+                    queue.append(importer)
+
+        tests = {}
+        for path in via:
+            if is_test_file(path):
+                chain = [path]
+                while isinstance(via.get(chain[-1]), Path):
+                    chain.append(via[chain[-1]])
+                if isinstance(via.get(chain[-1]), str):
+                    chain.append(via[chain[-1]])  # deleted module name
+                tests[path] = chain
+        return tests
@@ -0,0 +1,284 @@
+import ast
+import bisect
+import hashlib
+import re
+import threading
+import tokenize
+from collections import OrderedDict
+
+from gi.repository import GLib
+
+
+# Statements that open an indented block which hides nested defs from the outline
+_BLOCK_KEYWORDS = {"if", "elif", "else", "for", "while", "try", "except",
+                   "finally", "with", "match", "case"}
+_QUICK_RE = re.compile(
+    r"^([ \t]*)(?:(?:async[ \t]+)?(def|class)[ \t]+(\w+)|(%s)\b)"
+    % "|".join(sorted(_BLOCK_KEYWORDS)), re.MULTILINE)
+_LINE_START = {tokenize.NEWLINE, tokenize.NL, tokenize.INDENT, tokenize.DEDENT,
+               tokenize.COMMENT}
+
+
+def parse_symbols(text):
+    """Return the class/function tree of text.
+
+    Symbols are (kind, name, line, end_line, children) tuples; end_line is
+    None when the extractor cannot tell where the body ends.
+
+    Falls back to scan_symbols() when the buffer does not parse.
+    """
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError):
+        return scan_symbols(text)
+    symbols = []
+    _walk(tree, symbols)
+    return symbols
+
+
+def scan_symbols(text):
+    """Recover the class/function tree from tokens and indentation.
+
+    Tolerates syntax errors: when the tokenizer gives up, scanning resumes on
+    the following line. Nesting follows the same rules as the AST outline
+    (only classes show their members).
+    """
+    root = []
+    # (column, children list or None when nested defs are hidden)
+    stack = [(-1, root)]
+    lines = text.splitlines(keepends=True)
+    start = 0
+    while start < len(lines):
+        start = _scan_from(lines, start, stack)
+    return root
+
+
+def quick_symbols(text):
+    """Cheap line-based first pass for very large buffers.
+
+    Only looks at line starts, so it may be fooled by strings and
+    continuation lines; the AST result replaces it shortly afterwards.
+    """
+    root = []
+    stack = [(-1, root)]
+    line = 1
+    pos = 0
+    for m in _QUICK_RE.finditer(text):
+        line += text.count("\n", pos, m.start())
+        pos = m.start()
+        col = len(m.group(1).expandtabs(8))
+        if m.group(2):
+            kind = "class" if m.group(2) == "class" else "function"
+            _add_symbol(stack, kind, m.group(3), line, col)
+        else:
+            _push_block(stack, col)
+    return root
+
+
+def _scan_from(lines, start, stack):
+    """Scan lines[start:], returning the index to resume at after an error."""
+    readline = iter(lines[start:]).__next__
+    prev_type = tokenize.NEWLINE
+    pending = None  # "def"/"class" keyword waiting for its name
+    try:
+        for tok in tokenize.generate_tokens(readline):
+            ttype, string, (row, col) = tok.type, tok.string, tok.start
+            if ttype == tokenize.NAME:
+                at_line_start = prev_type in _LINE_START
+                if pending and pending[0] is not None:
+                    kind, kcol, krow = pending
+                    _add_symbol(stack, kind, string, krow + start, kcol)
+                    pending = None
+                elif at_line_start and string in ("def", "class"):
+                    pending = ("function" if string == "def" else "class", col, row)
+                elif at_line_start and string == "async":
+                    pending = (None, col, row)
+                elif pending and string == "def":
+                    pending = ("function", pending[1], row)
+                elif at_line_start and string in _BLOCK_KEYWORDS:
+                    _push_block(stack, col)
+                else:
+                    pending = None
+            elif ttype not in (tokenize.COMMENT, tokenize.NL):
+                pending = None
+            prev_type = ttype
+    except (tokenize.TokenError, IndentationError, SyntaxError) as e:
+        row = e.args[1][0] if len(e.args) > 1 and e.args[1] else None
+        if isinstance(e, SyntaxError):
+            row = e.lineno
+        if not row:
+            return len(lines)
+        return start + max(row, 1)
+    return len(lines)
+
+
+def _pop_to(stack, col):
+    while len(stack) > 1 and stack[-1][0] >= col:
+        stack.pop()
+
+
+def _push_block(stack, col):
+    _pop_to(stack, col)
+    stack.append((col, None))
+
+
+def _add_symbol(stack, kind, name, line, col):
+    _pop_to(stack, col)
+    parent = stack[-1][1]
+    children = [] if kind == "class" and parent is not None else None
+    if parent is not None:
+        parent.append((kind, name, line, None,
+                       children if children is not None else []))
+    stack.append((col, children))
+
+
+def _walk(node, symbols):
+    for child in ast.iter_child_nodes(node):
+        if isinstance(child, ast.ClassDef):
+            children = []
+            _walk(child, children)
+            symbols.append(("class", child.name, child.lineno,
+                            getattr(child, "end_lineno", None), children))
+        elif isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            symbols.append(("function", child.name, child.lineno,
+                            getattr(child, "end_lineno", None), []))
+
+
+class SymbolIndex:
+    """Interval index over a symbol tree for enclosing-scope lookups.
+
+    Built once per parse; scope_at() is a binary search plus a walk up the
+    (short) parent chain. Symbols without an end line get one from the
+    indentation of the following code.
+    """
+
+    def __init__(self, symbols, text=""):
+        self.starts = []
+        self.ends = []
+        self.parents = []
+        self.keys = []  # (kind, name, occurrence) key path, as matched by the outline
+        self._flatten(symbols, -1, ())
+        if None in self.ends:
+            self._infer_ends(text)
+
+    def _flatten(self, symbols, parent, parent_key):
+        seen = {}
+        for kind, name, line, end_line, children in symbols:
+            n = seen.get((kind, name), 0)
+            seen[(kind, name)] = n + 1
+            key = parent_key + ((kind, name, n),)
+            idx = len(self.starts)
+            self.starts.append(line)
+            self.ends.append(end_line)
+            self.parents.append(parent)
+            self.keys.append(key)
+            self._flatten(children, idx, key)
+
+    def _infer_ends(self, text):
+        lines = text.splitlines()
+        indents = []
+        for line in lines:
+            stripped = line.lstrip()
+            if stripped and not stripped.startswith("#"):
+                indents.append(len(line[:len(line) - len(stripped)].expandtabs(8)))
+            else:
+                indents.append(None)
+
+        def col_of(line):
+            if 0 < line <= len(lines):
+                return indents[line - 1] or 0
+            return 0
+
+        open_ = []  # indices of symbols whose body is still running
+        nxt = 0
+        last_code = 0
+        for ln in range(1, len(lines) + 1):
+            indent = indents[ln - 1]
+            if indent is not None:
+                while open_ and col_of(self.starts[open_[-1]]) >= indent:
+                    i = open_.pop()
+                    if self.ends[i] is None:
+                        self.ends[i] = max(last_code, self.starts[i])
+                last_code = ln
+            while nxt < len(self.starts) and self.starts[nxt] <= ln:
+                open_.append(nxt)
+                nxt += 1
+        for i in open_ + list(range(nxt, len(self.starts))):
+            if self.ends[i] is None:
+                self.ends[i] = max(last_code, self.starts[i])
+
+    def scope_at(self, line):
+        """Return the key paths of the symbols enclosing line, outermost first."""
+        i = bisect.bisect_right(self.starts, line) - 1
+        while i >= 0 and self.ends[i] < line:
+            i = self.parents[i]
+        chain = []
+        while i >= 0:
+            chain.append(self.keys[i])
+            i = self.parents[i]
+        chain.reverse()
+        return chain
+
+
+class OutlineParser:
+    """Single background worker that parses outline snapshots.
+
+    Only the newest submitted snapshot is kept; older pending ones are
+    dropped. Snapshots whose text hash matches the last parse for the same
+    document are answered from cache. callback(doc_key, version, symbols,
+    index) runs on the main thread; callers compare version to drop stale results.
+
+    Buffers of at least quick_lines lines first get a quick_symbols() result,
+    refined by the AST parse unless a newer snapshot arrives meanwhile.
+    """
+
+    CACHE_SIZE = 32
+
+    def __init__(self, callback, quick_lines=5000):
+        self._callback = callback
+        self._quick_lines = quick_lines
+        self._cond = threading.Condition()
+        self._pending = None
+        self._hashes = OrderedDict()  # doc_key -> (digest, symbols, index)
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def submit(self, doc_key, version, text):
+        with self._cond:
+            self._pending = (doc_key, version, text)
+            self._cond.notify()
+
+    def forget(self, doc_key):
+        with self._cond:
+            self._hashes.pop(doc_key, None)
+            if self._pending and self._pending[0] == doc_key:
+                self._pending = None
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while self._pending is None:
+                    self._cond.wait()
+                doc_key, version, text = self._pending
+                self._pending = None
+                cached = self._hashes.get(doc_key)
+
+            digest = hashlib.sha1(text.encode("utf-8", "surrogatepass")).digest()
+            if cached and cached[0] == digest:
+                symbols, index = cached[1], cached[2]
+            else:
+                if text.count("\n") >= self._quick_lines:
+                    quick = quick_symbols(text)
+                    GLib.idle_add(self._callback, doc_key, version, quick,
+                                  SymbolIndex(quick, text))
+                    with self._cond:
+                        if self._pending is not None:
+                            continue  # superseded: skip the full parse
+                symbols = parse_symbols(text)
+                index = SymbolIndex(symbols, text)
+
+            with self._cond:
+                self._hashes[doc_key] = (digest, symbols, index)
+                self._hashes.move_to_end(doc_key)
+                while len(self._hashes) > self.CACHE_SIZE:
+                    self._hashes.popitem(last=False)
+            GLib.idle_add(self._callback, doc_key, version, symbols, index)
@@ -0,0 +1,108 @@
+import json
+import subprocess
+import threading
+
+from gi.repository import GLib
+
+from ..panels.problems import Diagnostic
+from ..tools.interpreter import VENV_DIRS
+
+DELAY_MS = 1000  # after the last save, so a burst of saves compiles once
+
+# Run in the chosen interpreter at the lowest CPU priority: writes
+# __pycache__ with its own magic number and reports syntax errors as JSON lines
+_COMPILE = """
+import json, os, py_compile, sys
+os.nice(19)
+for path in sys.argv[1:]:
+    try:
+        py_compile.compile(path, doraise=True)
+        error = None
+    except py_compile.PyCompileError as e:
+        exc = e.exc_value
+        error = [getattr(exc, "lineno", None) or 1, getattr(exc, "offset", None) or 1,
+                 getattr(exc, "msg", None) or e.msg]
+    except OSError:
+        continue  # e.g. a read-only __pycache__
+    print(json.dumps([path, error]), flush=True)
+"""
+
+
+class Precompiler:
+    """Writes .pyc files for saved modules in the background.
+
+    The first run after an edit then does not pay for compiling on the SD
+    card. Compilation uses the interpreter that will run the code, at the
+    lowest CPU priority; syntax errors it finds are shown in the Problems
+    panel until the file compiles again or is closed.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._pending = set()
+        self._timer_id = None
+
+    @property
+    def enabled(self):
+        return self.app.config.get("precompile_on_save", True)
+
+    def on_saved(self, filepath):
+        if not self.enabled or filepath.suffix != ".py":
+            return
+        if any(part in VENV_DIRS for part in filepath.parts):
+            return
+        self._pending.add(filepath.resolve())
+        if self._timer_id:
+            GLib.source_remove(self._timer_id)
+        self._timer_id = GLib.timeout_add(DELAY_MS, self._on_timeout,
+                                          priority=GLib.PRIORITY_LOW)
+
+    def forget(self, filepath):
+        """Drop filepath's compile errors, e.g. when its document is closed."""
+        filepath = filepath.resolve()
+        self._pending.discard(filepath)
+        if self.app.problems_panel:
+            self.app.problems_panel.clear(("compile", str(filepath)))
+
+    def _on_timeout(self):
+        self._timer_id = None
+        groups = {}
+        for path in self._pending:
+            groups.setdefault(self.app.interpreters.resolve(path).path, []).append(path)
+        self._pending = set()
+        for python, paths in groups.items():
+            threading.Thread(target=self._compile, args=(python, sorted(paths)),
+                             daemon=True).start()
+        return False
+
+    def _compile(self, python, paths):
+        try:
+            result = subprocess.run(
+                [python, "-c", _COMPILE, *map(str, paths)],
+                capture_output=True, text=True, timeout=120)
+        except (OSError, subprocess.TimeoutExpired):
+            return
+        results = {}
+        for line in result.stdout.splitlines():
+            try:
+                path, error = json.loads(line)
+            except ValueError:
+                continue
+            results[path] = error
+        GLib.idle_add(self._report, results)
+
+    def _report(self, results):
+        panel = self.app.problems_panel
+        if not panel:
+            return False
+        editor = self.app.editor_manager
+        for path, error in results.items():
+            diagnostics = []
+            # A document closed while it compiled keeps no errors (see forget())
+            if error and editor and editor.find_document(path):
+                line, column, message = error
+                diagnostics.append(Diagnostic(file=path, line=line, column=column,
+                                              message=message, severity="error",
+                                              code="compile"))
+            panel.set_diagnostics(diagnostics, source=("compile", path))
+        return False
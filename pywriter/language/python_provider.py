@@ -94,3 +94,30 @@ class PythonProvider:
 
     def format_file(self, filepath, callback):
         self.format_runner.run(filepath, callback)
+
+    def format_paths(self, paths):
+        """Format all Python files under paths, refreshing any open documents."""
+        manager = self.app.editor_manager
+        dirty = [d.path for d in manager.documents if d.path and d.dirty] if manager else []
+        if dirty and self.app.output_panel:
+            self.app.output_panel.write_line(
+                f"Skipping {len(dirty)} file(s) with unsaved changes", "info")
+        if self.app.bottom_notebook:
+            self.app.bottom_notebook.set_current_page(
+                self.app.bottom_notebook.page_num(self.app.output_panel))
+        self.format_runner.run_batch(paths, self._on_batch_formatted, exclude=dirty)
+
+    def _on_batch_formatted(self, paths):
+        manager = self.app.editor_manager
+        if not manager:
+            return
+        for path in paths:
+            doc = manager.find_document(path)
+            if doc and not doc.dirty:
+                manager.reload_document(path)
+        doc = manager.active_document
+        if doc and doc.path and doc.path.resolve() in paths:
+            self.schedule_lint(doc, immediate=True)
+
+    def shutdown(self):
+        self.format_runner.shutdown()
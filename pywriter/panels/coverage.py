@@ -0,0 +1,227 @@
+import ast
+import dis
+import json
+import threading
+import types
+import weakref
+from pathlib import Path
+
+import gi
+gi.require_version("Gtk", "3.0")
+from gi.repository import Gtk, GLib
+
+
+def executable_lines(source, filename="<source>"):
+    """Lines of source that start a statement with bytecode of its own.
+
+    Docstrings, "else:", "try:", global declarations and the continuation
+    lines of multi-line statements are not counted, so a line counts as
+    missed only if running it would have reported it.
+    """
+    try:
+        tree = ast.parse(source, filename)
+        code = compile(tree, filename, "exec", dont_inherit=True)
+    except (SyntaxError, ValueError):
+        return set()
+    statements = {node.lineno for node in ast.walk(tree) if isinstance(node, ast.stmt)}
+    code_lines = set()
+    stack = [code]
+    while stack:
+        code = stack.pop()
+        code_lines.update(line for _, line in dis.findlinestarts(code) if line)
+        stack.extend(c for c in code.co_consts if isinstance(c, types.CodeType))
+    return statements & code_lines
+
+
+class CoverageData:
+    """Executed lines of a coverage run, from tools/coverage_bootstrap.py.
+
+    Which lines could have run is only worked out per file on request
+    (analysis()), from the file as it is on disk, so loading a run costs
+    nothing for files that are never looked at.
+    """
+
+    def __init__(self, collector, executed):
+        self.collector = collector
+        self.executed = executed  # resolved path -> set of lines
+        self._analysis = {}
+
+    @classmethod
+    def load(cls, data_files):
+        """Merge the data files (e.g. one per test worker); None if none is readable."""
+        collectors, executed = set(), {}
+        for data_file in data_files:
+            try:
+                with open(data_file) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            collectors.add(data.get("collector", "?"))
+            for filename, lines in data.get("files", {}).items():
+                executed.setdefault(str(Path(filename).resolve()), set()).update(lines)
+        if not collectors:
+            return None
+        return cls(", ".join(sorted(collectors)), executed)
+
+    def analysis(self, path):
+        """Return (hit lines, missed lines) of path, or None if it was not measured."""
+        path = str(Path(path).resolve())
+        if path not in self.executed:
+            return None
+        result = self._analysis.get(path)
+        if result is None:
+            try:
+                source = Path(path).read_text(encoding="utf-8", errors="replace")
+            except OSError:
+                source = ""
+            statements = executable_lines(source, path)
+            executed = self.executed[path]
+            result = self._analysis[path] = (statements & executed, statements - executed)
+        return result
+
+
+class CoveragePanel(Gtk.Box):
+    """Per-file summary of the latest coverage run.
+
+    Open documents get their executed and missed lines highlighted when
+    they are shown, so only files that are actually looked at are analysed
+    and decorated. The table is filled from a background thread.
+    """
+
+    COL_FILE = 0
+    COL_STATEMENTS = 1
+    COL_MISSED = 2
+    COL_PERCENT = 3
+    COL_PATH = 4
+
+    def __init__(self, app):
+        super().__init__(orientation=Gtk.Orientation.VERTICAL)
+        self.app = app
+        self.data = None
+        self._decorated = weakref.WeakKeyDictionary()  # document -> CoverageData
+
+        header = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=2)
+        header.set_name("panel-header")
+        header.set_margin_start(4)
+        header.set_margin_end(4)
+        header.set_margin_top(2)
+
+        lbl = Gtk.Label(label="COVERAGE")
+        lbl.set_xalign(0)
+        header.pack_start(lbl, False, False, 0)
+
+        self.summary_label = Gtk.Label(label="")
+        self.summary_label.set_xalign(0)
+        header.pack_start(self.summary_label, True, True, 8)
+
+        clear_btn = Gtk.Button(label="Clear")
+        clear_btn.set_relief(Gtk.ReliefStyle.NONE)
+        clear_btn.set_tooltip_text("Remove the coverage highlighting from the editor")
+        clear_btn.connect("clicked", lambda b: self.clear())
+        header.pack_start(clear_btn, False, False, 0)
+        self.pack_start(header, False, False, 0)
+
+        # file, statements, missed, percent, path
+        self.store = Gtk.ListStore(str, int, int, float, str)
+        self.store.set_sort_column_id(self.COL_PERCENT, Gtk.SortType.ASCENDING)
+        self.tree = Gtk.TreeView(model=self.store)
+
+        col = Gtk.TreeViewColumn("File", Gtk.CellRendererText(), text=self.COL_FILE)
+        col.set_resizable(True)
+        col.set_expand(True)
+        col.set_sort_column_id(self.COL_FILE)
+        self.tree.append_column(col)
+
+        for title, column in (("Statements", self.COL_STATEMENTS),
+                              ("Missed", self.COL_MISSED)):
+            col = Gtk.TreeViewColumn(title, Gtk.CellRendererText(), text=column)
+            col.set_sort_column_id(column)
+            self.tree.append_column(col)
+
+        renderer = Gtk.CellRendererProgress()
+        col = Gtk.TreeViewColumn("Cover", renderer, value=self.COL_PERCENT)
+        col.set_cell_data_func(renderer, self._format_percent)
+        col.set_min_width(100)
+        col.set_sort_column_id(self.COL_PERCENT)
+        self.tree.append_column(col)
+
+        self.tree.connect("row-activated", self._on_row_activated)
+
+        scrolled = Gtk.ScrolledWindow()
+        scrolled.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
+        scrolled.add(self.tree)
+        self.pack_start(scrolled, True, True, 0)
+
+    def show_data(self, data, title):
+        """Show the summary of data and highlight the active document."""
+        self.clear()
+        self.data = data
+        self.summary_label.set_text(f"{title}: analysing {len(data.executed)} files "
+                                    f"({data.collector})")
+        root = self.app.workspace.root if self.app.workspace else None
+        threading.Thread(target=self._summarize, args=(data, title, root),
+                         daemon=True).start()
+        doc = self.app.editor_manager.active_document if self.app.editor_manager else None
+        if doc:
+            self.decorate(doc)
+
+    def _summarize(self, data, title, root):
+        rows = []
+        for path in sorted(data.executed):
+            hits, missed = data.analysis(path)
+            statements = len(hits) + len(missed)
+            name = path
+            if root:
+                try:
+                    name = str(Path(path).relative_to(Path(root).resolve()))
+                except ValueError:
+                    pass
+            rows.append([name, statements, len(missed),
+                         100.0 * len(hits) / statements if statements else 100.0, path])
+        GLib.idle_add(self._fill, data, title, rows)
+
+    def _fill(self, data, title, rows):
+        if data is not self.data:
+            return False  # a newer run replaced it meanwhile
+        self.tree.set_model(None)  # detach while filling
+        self.store.clear()
+        for row in rows:
+            self.store.append(row)
+        self.tree.set_model(self.store)
+        statements = sum(row[self.COL_STATEMENTS] for row in rows)
+        missed = sum(row[self.COL_MISSED] for row in rows)
+        percent = 100.0 * (statements - missed) / statements if statements else 100.0
+        self.summary_label.set_text(f"{title}: {percent:.1f}% of {statements} statements "
+                                    f"in {len(rows)} files ({data.collector})")
+        return False
+
+    def decorate(self, doc):
+        """Highlight doc's lines from the current data, once per run."""
+        if not self.data or not doc.path or self._decorated.get(doc) is self.data:
+            return
+        self._decorated[doc] = self.data
+        if doc.dirty:
+            return  # the line numbers may no longer match
+        result = self.data.analysis(doc.path)
+        if result and self.app.editor_manager:
+            self.app.editor_manager.set_coverage_marks(doc, *result)
+
+    def clear(self):
+        self.data = None
+        if self.app.editor_manager:
+            for doc in list(self._decorated):
+                self.app.editor_manager.set_coverage_marks(doc, (), ())
+        self._decorated.clear()
+        self.store.clear()
+        self.summary_label.set_text("")
+
+    def _format_percent(self, column, cell, model, it, data):
+        cell.set_property("text", f"{model.get_value(it, self.COL_PERCENT):.0f}%")
+
+    def _on_row_activated(self, tree, treepath, column):
+        model = tree.get_model()
+        path = model.get_value(model.get_iter(treepath), self.COL_PATH)
+        if Path(path).is_file() and self.app.editor_manager:
+            result = self.data.analysis(path) if self.data else None
+            missed = sorted(result[1]) if result else []
+            self.app.editor_manager.goto_line(path, missed[0] if missed else 1)
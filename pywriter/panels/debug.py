@@ -0,0 +1,233 @@
+import json
+import os
+from pathlib import Path
+
+import gi
+gi.require_version("Gtk", "3.0")
+from gi.repository import Gtk, GLib
+
+
+class DebugPanel(Gtk.Box):
+    """Bottom panel driving a run under tools/debug_bootstrap.py.
+
+    Shows the call stack and the variables of the selected frame while the
+    program is stopped, and sends continue/step commands and breakpoint
+    changes down the command pipe.
+    """
+
+    COL_LABEL = 0
+    COL_FILE = 1
+    COL_LINE = 2
+
+    def __init__(self, app):
+        super().__init__(orientation=Gtk.Orientation.VERTICAL)
+        self.app = app
+        self.session = None
+        self.stopped = False
+        self._cmd_fd = None
+        self._event_fd = None
+        self._watch_id = None
+        self._buffer = b""
+        self._filling = False
+
+        header = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=2)
+        header.set_name("panel-header")
+        header.set_margin_start(4)
+        header.set_margin_end(4)
+        header.set_margin_top(2)
+
+        lbl = Gtk.Label(label="DEBUG")
+        lbl.set_xalign(0)
+        header.pack_start(lbl, False, False, 0)
+
+        self.status_label = Gtk.Label(label="")
+        self.status_label.set_xalign(0)
+        header.pack_start(self.status_label, True, True, 8)
+
+        self._step_buttons = []
+        for label, tooltip, command in (("Continue", "Continue (F5)", "continue"),
+                                        ("Step Over", "Step Over (F10)", "next"),
+                                        ("Step Into", "Step Into (F11)", "step"),
+                                        ("Step Out", "Step Out (Shift+F11)", "return")):
+            btn = Gtk.Button(label=label)
+            btn.set_relief(Gtk.ReliefStyle.NONE)
+            btn.set_tooltip_text(tooltip)
+            btn.connect("clicked", lambda b, c=command: self.resume(c))
+            header.pack_start(btn, False, False, 0)
+            self._step_buttons.append(btn)
+
+        self.stop_btn = Gtk.Button(label="Stop")
+        self.stop_btn.set_relief(Gtk.ReliefStyle.NONE)
+        self.stop_btn.connect("clicked", lambda b: self.stop())
+        header.pack_start(self.stop_btn, False, False, 0)
+        self.pack_start(header, False, False, 0)
+
+        paned = Gtk.Paned(orientation=Gtk.Orientation.HORIZONTAL)
+
+        # label, file, line
+        self.stack_store = Gtk.ListStore(str, str, int)
+        self.stack_view = Gtk.TreeView(model=self.stack_store)
+        col = Gtk.TreeViewColumn("Call Stack", Gtk.CellRendererText(), text=self.COL_LABEL)
+        self.stack_view.append_column(col)
+        self.stack_view.get_selection().connect("changed", self._on_frame_selected)
+        scrolled = Gtk.ScrolledWindow()
+        scrolled.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
+        scrolled.add(self.stack_view)
+        paned.pack1(scrolled, resize=False, shrink=True)
+
+        # name, type, value
+        self.var_store = Gtk.TreeStore(str, str, str)
+        self.var_view = Gtk.TreeView(model=self.var_store)
+        for title, column in (("Name", 0), ("Type", 1), ("Value", 2)):
+            col = Gtk.TreeViewColumn(title, Gtk.CellRendererText(), text=column)
+            col.set_resizable(True)
+            self.var_view.append_column(col)
+        scrolled = Gtk.ScrolledWindow()
+        scrolled.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
+        scrolled.add(self.var_view)
+        paned.pack2(scrolled, resize=True, shrink=True)
+        paned.set_position(320)
+        self.pack_start(paned, True, True, 0)
+
+        self._set_stopped(False)
+
+    @property
+    def running(self):
+        return self.session is not None and self.session.running
+
+    def attach(self, session, cmd_fd, event_fd):
+        """Drive session through its command and event pipes (closed at exit)."""
+        if self.running:
+            self.session.stop()
+        self._close()
+        self.session = session
+        self._cmd_fd = cmd_fd
+        self._event_fd = event_fd
+        self.stack_store.clear()
+        self.var_store.clear()
+        self._set_stopped(False)
+        self.status_label.set_text(f"{session.title}: running")
+        # The program starts once it has the breakpoints
+        self.send_breakpoints()
+        os.set_blocking(event_fd, False)
+        self._watch_id = GLib.io_add_watch(
+            event_fd, GLib.PRIORITY_DEFAULT, GLib.IO_IN | GLib.IO_HUP | GLib.IO_ERR,
+            self._on_event)
+        session.on_exit.append(self._on_exit)
+
+    def send_breakpoints(self):
+        if self._cmd_fd is not None and self.app.editor_manager:
+            self._send({"cmd": "breakpoints",
+                        "breakpoints": self.app.editor_manager.breakpoints()})
+
+    def resume(self, command):
+        """Continue the stopped program with continue, next, step or return."""
+        if not self.stopped:
+            return
+        self._set_stopped(False)
+        self.status_label.set_text(f"{self.session.title}: running")
+        if self.app.editor_manager:
+            self.app.editor_manager.set_debug_line(None, 0)
+        self._send({"cmd": command})
+
+    def stop(self):
+        if self.running:
+            self.session.stop()
+
+    def _send(self, message):
+        try:
+            os.write(self._cmd_fd, (json.dumps(message) + "\n").encode())
+        except OSError:
+            pass  # the program has exited; _on_exit cleans up
+
+    def _set_stopped(self, stopped):
+        self.stopped = stopped
+        for btn in self._step_buttons:
+            btn.set_sensitive(stopped)
+        self.stop_btn.set_sensitive(self.running)
+
+    def _on_event(self, fd, condition):
+        try:
+            chunk = os.read(fd, 65536)
+        except BlockingIOError:
+            return True
+        except OSError:
+            chunk = b""
+        if not chunk:
+            self._watch_id = None
+            return False
+        self._buffer += chunk
+        *lines, self._buffer = self._buffer.split(b"\n")
+        for line in lines:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if event.get("event") == "stopped":
+                self._on_stopped(event)
+            elif event.get("event") == "variables":
+                self._fill_variables(event["variables"])
+        return True
+
+    def _on_stopped(self, event):
+        self._filling = True
+        self.stack_store.clear()
+        for filename, line, function in event["stack"]:
+            self.stack_store.append([f"{function}  ({Path(filename).name}:{line})",
+                                     filename, line])
+        self.stack_view.get_selection().select_path(Gtk.TreePath(event["frame"]))
+        self._filling = False
+        self._fill_variables(event["variables"])
+
+        status = {"breakpoint": "stopped at a breakpoint", "step": "paused",
+                  "exception": event.get("message") or "exception"}
+        self.status_label.set_text(f"{self.session.title}: "
+                                   f"{status.get(event['reason'], event['reason'])}")
+        self._set_stopped(True)
+        if event["stack"]:
+            self._show_frame(*event["stack"][0][:2])
+        self.app.show_debugger_tab()
+
+    def _fill_variables(self, variables):
+        self.var_store.clear()
+        for title, key in (("Locals", "locals"), ("Globals", "globals")):
+            if key not in variables:
+                continue
+            parent = self.var_store.append(None, [title, "", f"{len(variables[key])} names"])
+            for name, type_name, value in variables[key]:
+                self.var_store.append(parent, [name, type_name, value])
+        # Locals are what one usually looks at; globals stay folded
+        self.var_view.expand_row(Gtk.TreePath(0), False)
+
+    def _on_frame_selected(self, selection):
+        if self._filling or not self.stopped:
+            return
+        model, it = selection.get_selected()
+        if it is None:
+            return
+        self._send({"cmd": "frame", "index": model.get_path(it).get_indices()[0]})
+        self._show_frame(model.get_value(it, self.COL_FILE), model.get_value(it, self.COL_LINE))
+
+    def _show_frame(self, filename, line):
+        if Path(filename).is_file() and self.app.editor_manager:
+            self.app.editor_manager.set_debug_line(filename, line)
+
+    def _on_exit(self, session):
+        if session is not self.session:
+            return
+        self._close()
+        self._set_stopped(False)
+        self.status_label.set_text(f"{session.title}: {session.status_text()}")
+        if self.app.editor_manager:
+            self.app.editor_manager.set_debug_line(None, 0)
+
+    def _close(self):
+        if self._watch_id:
+            GLib.source_remove(self._watch_id)
+            self._watch_id = None
+        for fd in (self._cmd_fd, self._event_fd):
+            if fd is not None:
+                os.close(fd)
+        self._cmd_fd = self._event_fd = None
+        self._buffer = b""
+        self.stopped = False
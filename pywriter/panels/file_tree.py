@@ -6,9 +6,7 @@ gi.require_version("Gtk", "3.0")
 gi.require_version("Gio", "2.0")
 from gi.repository import Gtk, Gdk, Gio, GLib
 
-IGNORE_DIRS = {".git", "__pycache__", ".venv", "venv", "node_modules", ".mypy_cache",
-               ".ruff_cache", ".pytest_cache", "*.egg-info", ".tox", "build", "dist"}
-IGNORE_FILES = {".pyc", ".pyo", ".so", ".o"}
+from ..ignore import IGNORE_DIRS, IGNORE_FILES
 
 
 class FileTree(Gtk.Box):
@@ -202,6 +200,10 @@ class FileTree(Gtk.Box):
             item_new_folder.connect("activate", lambda w: self._create_folder_in(filepath))
             menu.append(item_new_folder)
 
+            item_format = Gtk.MenuItem(label="Format Folder")
+            item_format.connect("activate", lambda w: self._format_paths([filepath]))
+            menu.append(item_format)
+
         item_rename = Gtk.MenuItem(label="Rename")
         item_rename.connect("activate", lambda w: self._rename_item(filepath))
         menu.append(item_rename)
@@ -211,6 +213,11 @@ class FileTree(Gtk.Box):
             item_duplicate.connect("activate", lambda w: self._duplicate_item(filepath))
             menu.append(item_duplicate)
 
+        if not is_dir and filepath.endswith(".py"):
+            item_format = Gtk.MenuItem(label="Format File")
+            item_format.connect("activate", lambda w: self._format_paths([filepath]))
+            menu.append(item_format)
+
         item_delete = Gtk.MenuItem(label="Delete")
         item_delete.connect("activate", lambda w: self._delete_item(filepath, is_dir))
         menu.append(item_delete)
@@ -218,6 +225,10 @@ class FileTree(Gtk.Box):
         menu.show_all()
         menu.popup_at_pointer(event)
 
+    def _format_paths(self, paths):
+        if self.app.python_provider:
+            self.app.python_provider.format_paths(paths)
+
     def _prompt_name(self, title, default=""):
         dialog = Gtk.Dialog(title=title, parent=self.app.window,
                             flags=Gtk.DialogFlags.MODAL)
@@ -0,0 +1,198 @@
+from pathlib import Path
+
+import gi
+gi.require_version("Gtk", "3.0")
+from gi.repository import Gtk, GObject
+
+IMPORT_TIME_PREFIX = "import time:"
+OVER_BUDGET = "#f44747"
+CONTAINS_OVER_BUDGET = "#cca700"
+
+
+class ImportNode:
+    def __init__(self, name, self_us, cumulative_us):
+        self.name = name
+        self.self_us = self_us
+        self.cumulative_us = cumulative_us
+        self.children = []
+
+
+class ImportProfile:
+    """Import tree parsed from the "import time:" lines of python -X importtime.
+
+    Python prints a module after its nested imports have finished, indented
+    two spaces per nesting level, so children come before their parent.
+    """
+
+    def __init__(self):
+        self.roots = []
+        self._pending = {}  # depth -> nodes waiting for their parent
+
+    def feed_line(self, line):
+        """Add one "import time:" line; the header and junk are ignored."""
+        parts = line[len(IMPORT_TIME_PREFIX):].split("|")
+        if len(parts) != 3:
+            return
+        try:
+            self_us, cumulative_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            return  # the "self [us] | cumulative | imported package" header
+        name = parts[2][1:].rstrip()
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        node = ImportNode(name.strip(), self_us, cumulative_us)
+        node.children = self._pending.pop(depth + 1, [])
+        if depth == 0:
+            self.roots.append(node)
+        else:
+            self._pending.setdefault(depth, []).append(node)
+
+    def nodes(self):
+        stack = list(self.roots)
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(node.children)
+
+    @property
+    def total_us(self):
+        return sum(node.cumulative_us for node in self.roots)
+
+
+def _module_file(bases, name):
+    """Path of module name in one of the bases folders, or None."""
+    parts = name.split(".")
+    for base in bases:
+        for candidate in (base.joinpath(*parts).with_suffix(".py"),
+                          base.joinpath(*parts, "__init__.py")):
+            if candidate.is_file():
+                return candidate
+    return None
+
+
+class ImportProfilePanel(Gtk.Box):
+    """Bottom panel showing a -X importtime run as a sortable module tree.
+
+    Modules whose own import time exceeds the import_budget_ms setting are
+    shown in red; modules whose cumulative time exceeds it (because of what
+    they import) in yellow.
+    """
+
+    COL_NAME = 0
+    COL_SELF = 1
+    COL_CUMULATIVE = 2
+
+    def __init__(self, app):
+        super().__init__(orientation=Gtk.Orientation.VERTICAL)
+        self.app = app
+        self._profile = None
+        self._script_dir = None
+
+        header = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=2)
+        header.set_name("panel-header")
+        header.set_margin_start(4)
+        header.set_margin_end(4)
+        header.set_margin_top(2)
+
+        lbl = Gtk.Label(label="IMPORTS")
+        lbl.set_xalign(0)
+        header.pack_start(lbl, False, False, 0)
+
+        self.summary_label = Gtk.Label(label="")
+        self.summary_label.set_xalign(0)
+        header.pack_start(self.summary_label, True, True, 8)
+
+        self.flat_toggle = Gtk.ToggleButton(label="Flat")
+        self.flat_toggle.set_relief(Gtk.ReliefStyle.NONE)
+        self.flat_toggle.set_tooltip_text("List every module at the top level")
+        self.flat_toggle.connect("toggled", lambda b: self._fill())
+        header.pack_start(self.flat_toggle, False, False, 0)
+        self.pack_start(header, False, False, 0)
+
+        # module, self us, cumulative us
+        self.store = Gtk.TreeStore(str, GObject.TYPE_INT64, GObject.TYPE_INT64)
+        self.store.set_sort_column_id(self.COL_CUMULATIVE, Gtk.SortType.DESCENDING)
+        self.tree = Gtk.TreeView(model=self.store)
+
+        renderer = Gtk.CellRendererText()
+        col = Gtk.TreeViewColumn("Module", renderer, text=self.COL_NAME)
+        col.set_cell_data_func(renderer, self._color_row)
+        col.set_resizable(True)
+        col.set_expand(True)
+        col.set_sort_column_id(self.COL_NAME)
+        self.tree.append_column(col)
+
+        for title, column in (("Self", self.COL_SELF), ("Cumulative", self.COL_CUMULATIVE)):
+            renderer = Gtk.CellRendererText()
+            renderer.set_property("xalign", 1.0)
+            col = Gtk.TreeViewColumn(title, renderer)
+            col.set_cell_data_func(renderer, self._format_ms, column)
+            col.set_min_width(90)
+            col.set_sort_column_id(column)
+            self.tree.append_column(col)
+
+        self.tree.connect("row-activated", self._on_row_activated)
+
+        scrolled = Gtk.ScrolledWindow()
+        scrolled.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
+        scrolled.add(self.tree)
+        self.pack_start(scrolled, True, True, 0)
+
+    @property
+    def budget_us(self):
+        return self.app.config.get("import_budget_ms", 50) * 1000
+
+    def show_profile(self, profile, title, script_dir):
+        self._profile = profile
+        self._script_dir = script_dir
+        nodes = list(profile.nodes())
+        over = [n for n in nodes if n.self_us > self.budget_us]
+        text = (f"{title}  {len(nodes)} modules in {profile.total_us / 1000:.1f} ms; "
+                f"{len(over)} over the {self.budget_us / 1000:g} ms budget")
+        if over:
+            text += f" ({sum(n.self_us for n in over) / 1000:.1f} ms)"
+        self.summary_label.set_text(text)
+        self._fill()
+
+    def _fill(self):
+        self.tree.set_model(None)  # detach while filling
+        self.store.clear()
+        if self._profile:
+            if self.flat_toggle.get_active():
+                for node in self._profile.nodes():
+                    self.store.append(None, [node.name, node.self_us, node.cumulative_us])
+            else:
+                stack = [(None, node) for node in self._profile.roots]
+                while stack:
+                    parent, node = stack.pop()
+                    it = self.store.append(parent, [node.name, node.self_us,
+                                                    node.cumulative_us])
+                    stack.extend((it, child) for child in node.children)
+        self.tree.set_model(self.store)
+
+    def _format_ms(self, column, cell, model, it, data_col):
+        cell.set_property("text", f"{model.get_value(it, data_col) / 1000:.1f} ms")
+
+    def _color_row(self, column, cell, model, it, data):
+        budget = self.budget_us
+        if model.get_value(it, self.COL_SELF) > budget:
+            cell.set_property("foreground", OVER_BUDGET)
+        elif model.get_value(it, self.COL_CUMULATIVE) > budget:
+            cell.set_property("foreground", CONTAINS_OVER_BUDGET)
+        else:
+            cell.set_property("foreground-set", False)
+
+    def _on_row_activated(self, tree, treepath, column):
+        if not self.app.editor_manager:
+            return
+        bases = [self._script_dir] if self._script_dir else []
+        if self.app.workspace and self.app.workspace.root:
+            root = Path(self.app.workspace.root)
+            bases += [root, root / "src"]
+        it = self.store.get_iter(treepath)
+        path = _module_file(bases, self.store.get_value(it, self.COL_NAME))
+        if path:
+            self.app.editor_manager.goto_line(str(path), 1)
+        elif tree.row_expanded(treepath):
+            tree.collapse_row(treepath)
+        else:
+            tree.expand_row(treepath, False)
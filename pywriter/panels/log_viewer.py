@@ -0,0 +1,374 @@
+import mmap
+import os
+from array import array
+from bisect import bisect_right
+
+import gi
+gi.require_version("Gtk", "3.0")
+gi.require_version("PangoCairo", "1.0")
+from gi.repository import Gtk, Gdk, GLib, Pango, PangoCairo
+
+INDEX_STEP = 4 * 1024 * 1024  # bytes indexed per idle callback
+MAX_LINE_CHARS = 2000  # longer lines are cut off for display
+FOLLOW_INTERVAL_MS = 500
+
+BACKGROUND = (0x1e / 255, 0x1e / 255, 0x1e / 255)
+FOREGROUND = "#cccccc"
+LINE_NUMBER = "#858585"
+MATCH_LINE = (0x09 / 255, 0x47 / 255, 0x71 / 255)
+
+
+class LineIndex:
+    """Memory-mapped log file with the byte offsets of its line starts.
+
+    The file may still be growing: refresh() maps it again at its new size,
+    and index() scans a bounded number of new bytes at a time, so a large
+    log is indexed in steps between redraws. offsets[i] is the start of
+    line i; the last entry starts a line that is not finished yet (or is
+    the end of the file).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self.mm = None
+        self.size = 0
+        self.indexed = 0
+        self.offsets = array("q", [0])
+
+    def refresh(self):
+        """Map the file again if it has grown; return True if it did."""
+        size = os.fstat(self._file.fileno()).st_size
+        if size <= self.size:
+            return False
+        if self.mm:
+            self.mm.close()
+        self.mm = mmap.mmap(self._file.fileno(), size, access=mmap.ACCESS_READ)
+        self.size = size
+        return True
+
+    @property
+    def complete(self):
+        return self.indexed >= self.size
+
+    def index(self, limit=INDEX_STEP):
+        """Index up to limit more bytes; return True if more remain."""
+        if self.complete:
+            return False
+        end = min(self.size, self.indexed + limit)
+        find, append = self.mm.find, self.offsets.append
+        pos = self.indexed
+        while True:
+            pos = find(b"\n", pos, end) + 1
+            if not pos:
+                break
+            append(pos)
+        self.indexed = end
+        return not self.complete
+
+    def index_to(self, offset):
+        """Index at least up to byte offset (or the end of the file)."""
+        while self.indexed <= offset and self.index():
+            pass
+
+    @property
+    def line_count(self):
+        count = len(self.offsets)
+        if self.offsets[-1] >= self.size:
+            count -= 1  # nothing after the last newline (or an empty file)
+        return count
+
+    def line(self, i):
+        start = self.offsets[i]
+        if i + 1 < len(self.offsets):
+            end = self.offsets[i + 1] - 1
+        else:
+            end = self.indexed
+        end = min(end, start + MAX_LINE_CHARS * 4)
+        text = self.mm[start:end].decode("utf-8", "replace").rstrip("\r")
+        return text[:MAX_LINE_CHARS]
+
+    def line_of(self, offset):
+        return bisect_right(self.offsets, offset) - 1
+
+    def close(self):
+        if self.mm:
+            self.mm.close()
+            self.mm = None
+        self._file.close()
+
+
+class LogViewerPanel(Gtk.Box):
+    """Bottom panel showing a complete run log without loading it into memory.
+
+    The file is memory-mapped and only the lines in view are decoded and
+    drawn, so logs of hundreds of megabytes open at once; the line index
+    is built in the background. While its run is active the log is
+    followed as it grows.
+    """
+
+    def __init__(self, app):
+        super().__init__(orientation=Gtk.Orientation.VERTICAL)
+        self.app = app
+        self.index = None
+        self.session = None
+        self._title = ""
+        self._index_id = None
+        self._follow_id = None
+        self._match = None  # (offset, line) of the current search match
+        self._line_height = 0
+
+        header = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=2)
+        header.set_name("panel-header")
+        header.set_margin_start(4)
+        header.set_margin_end(4)
+        header.set_margin_top(2)
+
+        lbl = Gtk.Label(label="LOG")
+        lbl.set_xalign(0)
+        header.pack_start(lbl, False, False, 0)
+
+        self.summary_label = Gtk.Label(label="")
+        self.summary_label.set_xalign(0)
+        self.summary_label.set_ellipsize(Pango.EllipsizeMode.START)
+        header.pack_start(self.summary_label, True, True, 8)
+
+        self.search_entry = Gtk.SearchEntry()
+        self.search_entry.set_placeholder_text("Find")
+        self.search_entry.connect("activate", lambda e: self.find(forward=True))
+        header.pack_start(self.search_entry, False, False, 0)
+
+        for icon, tooltip, forward in (("go-up-symbolic", "Previous match", False),
+                                       ("go-down-symbolic", "Next match", True)):
+            btn = Gtk.Button.new_from_icon_name(icon, Gtk.IconSize.MENU)
+            btn.set_relief(Gtk.ReliefStyle.NONE)
+            btn.set_tooltip_text(tooltip)
+            btn.connect("clicked", lambda b, f=forward: self.find(forward=f))
+            header.pack_start(btn, False, False, 0)
+
+        self.line_entry = Gtk.Entry()
+        self.line_entry.set_placeholder_text("Line")
+        self.line_entry.set_width_chars(10)
+        self.line_entry.connect("activate", self._on_goto_line)
+        header.pack_start(self.line_entry, False, False, 4)
+        self.pack_start(header, False, False, 0)
+
+        body = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL)
+        self.adjustment = Gtk.Adjustment(value=0, lower=0, upper=0, step_increment=1,
+                                         page_increment=10, page_size=10)
+        self.adjustment.connect("value-changed", lambda a: self.area.queue_draw())
+        self.area = Gtk.DrawingArea()
+        self.area.set_can_focus(True)
+        self.area.add_events(Gdk.EventMask.SCROLL_MASK | Gdk.EventMask.SMOOTH_SCROLL_MASK
+                             | Gdk.EventMask.BUTTON_PRESS_MASK)
+        self.area.connect("draw", self._on_draw)
+        self.area.connect("scroll-event", self._on_scroll)
+        self.area.connect("size-allocate", lambda w, a: self._update_adjustment())
+        self.area.connect("button-press-event", lambda w, e: w.grab_focus())
+        self.area.connect("key-press-event", self._on_key_press)
+        body.pack_start(self.area, True, True, 0)
+        body.pack_start(Gtk.Scrollbar(orientation=Gtk.Orientation.VERTICAL,
+                                      adjustment=self.adjustment), False, False, 0)
+        self.pack_start(body, True, True, 0)
+
+        font = f"{app.config.get('font_family', 'Monospace')} " \
+               f"{max(6, app.config.get('font_size', 12) - 2)}"
+        self._font = Pango.FontDescription.from_string(font)
+
+    def open(self, path, title, session=None):
+        """Show the log at path; follow it while session is running."""
+        self.close()
+        try:
+            self.index = LineIndex(path)
+        except OSError as e:
+            self.summary_label.set_text(f"Cannot open {path}: {e}")
+            return
+        self.session = session
+        self._title = title
+        self._match = None
+        self.adjustment.set_value(0)
+        self._poll()
+        if session and session.running:
+            self._follow_id = GLib.timeout_add(FOLLOW_INTERVAL_MS, self._poll)
+
+    def close(self):
+        for source_id in (self._index_id, self._follow_id):
+            if source_id:
+                GLib.source_remove(source_id)
+        self._index_id = self._follow_id = None
+        if self.index:
+            self.index.close()
+            self.index = None
+
+    def _poll(self):
+        """Pick up new output; runs until the followed session has exited."""
+        if self.index.refresh() and self._index_id is None:
+            self._index_id = GLib.idle_add(self._index_step, priority=GLib.PRIORITY_LOW)
+        self._update_summary()
+        if self.session and self.session.running:
+            return True
+        if self._follow_id:
+            self.index.refresh()  # the output written just before the exit
+            if self._index_id is None and not self.index.complete:
+                self._index_id = GLib.idle_add(self._index_step, priority=GLib.PRIORITY_LOW)
+        self._follow_id = None
+        return False
+
+    def _index_step(self):
+        adj = self.adjustment
+        at_end = adj.get_value() + adj.get_page_size() >= adj.get_upper() - 1
+        more = self.index.index()
+        self._update_adjustment()
+        if at_end and self._follow_id:
+            adj.set_value(adj.get_upper() - adj.get_page_size())
+        self._update_summary()
+        self.area.queue_draw()
+        if not more:
+            self._index_id = None
+        return more
+
+    def _update_summary(self):
+        index = self.index
+        if not index:
+            return
+        text = f"{self._title}  {index.size / (1024 * 1024):.1f} MiB, " \
+               f"{index.line_count:,} lines"
+        if not index.complete:
+            text += f" (indexing {100 * index.indexed // max(index.size, 1)}%)"
+        if self.session and self.session.running:
+            text += ", following"
+        self.summary_label.set_text(f"{text}  —  {index.path}")
+
+    def _visible_lines(self):
+        if not self._line_height:
+            layout = self.area.create_pango_layout("Ag")
+            layout.set_font_description(self._font)
+            self._line_height = max(1, layout.get_pixel_size()[1])
+        return max(1, self.area.get_allocated_height() // self._line_height)
+
+    def _update_adjustment(self):
+        count = self.index.line_count if self.index else 0
+        page = self._visible_lines()
+        self.adjustment.configure(min(self.adjustment.get_value(), max(0, count - page)),
+                                  0, count, 1, max(1, page - 1), page)
+
+    def _scroll_to_line(self, line):
+        page = self.adjustment.get_page_size()
+        value = self.adjustment.get_value()
+        if not value <= line < value + page:
+            self.adjustment.set_value(max(0, line - page // 3))
+        self.area.queue_draw()
+
+    def _on_draw(self, area, cr):
+        cr.set_source_rgb(*BACKGROUND)
+        cr.paint()
+        index = self.index
+        if not index:
+            return False
+        page = self._visible_lines()
+        top = int(self.adjustment.get_value())
+        last = min(index.line_count, top + page + 1)
+        if top >= last:
+            return False
+        height = self._line_height
+        if self._match and top <= self._match[1] < last:
+            cr.set_source_rgb(*MATCH_LINE)
+            cr.rectangle(0, (self._match[1] - top) * height,
+                         area.get_allocated_width(), height)
+            cr.fill()
+
+        numbers = self.area.create_pango_layout("")
+        numbers.set_font_description(self._font)
+        numbers.set_markup(f'<span foreground="{LINE_NUMBER}">'
+                           + "\n".join(str(i + 1) for i in range(top, last))
+                           + "</span>", -1)
+        numbers.set_alignment(Pango.Alignment.RIGHT)
+        gutter = numbers.get_pixel_size()[0]
+        cr.move_to(4, 0)
+        PangoCairo.show_layout(cr, numbers)
+
+        text = self.area.create_pango_layout("\n".join(
+            index.line(i).replace("\t", "    ") for i in range(top, last)))
+        text.set_font_description(self._font)
+        rgba = Gdk.RGBA()
+        rgba.parse(FOREGROUND)
+        cr.set_source_rgb(rgba.red, rgba.green, rgba.blue)
+        cr.move_to(gutter + 16, 0)
+        PangoCairo.show_layout(cr, text)
+        return False
+
+    def _on_scroll(self, area, event):
+        adj = self.adjustment
+        ok, dx, dy = event.get_scroll_deltas()
+        if ok:
+            delta = dy * 3
+        elif event.direction == Gdk.ScrollDirection.UP:
+            delta = -3
+        elif event.direction == Gdk.ScrollDirection.DOWN:
+            delta = 3
+        else:
+            return False
+        adj.set_value(min(adj.get_value() + delta, adj.get_upper() - adj.get_page_size()))
+        return True
+
+    def _on_key_press(self, area, event):
+        adj = self.adjustment
+        steps = {Gdk.KEY_Up: -1, Gdk.KEY_Down: 1,
+                 Gdk.KEY_Page_Up: -adj.get_page_increment(),
+                 Gdk.KEY_Page_Down: adj.get_page_increment()}
+        if event.keyval == Gdk.KEY_Home:
+            adj.set_value(0)
+        elif event.keyval == Gdk.KEY_End:
+            adj.set_value(adj.get_upper() - adj.get_page_size())
+        elif event.keyval in steps:
+            adj.set_value(min(adj.get_value() + steps[event.keyval],
+                              adj.get_upper() - adj.get_page_size()))
+        else:
+            return False
+        return True
+
+    def find(self, forward=True):
+        """Search the mapped bytes for the entry text, wrapping around."""
+        index = self.index
+        needle = self.search_entry.get_text().encode("utf-8")
+        if not index or not index.mm or not needle:
+            return
+        if self._match:
+            start = self._match[0] + (1 if forward else 0)
+        else:
+            start = index.offsets[min(int(self.adjustment.get_value()),
+                                      len(index.offsets) - 1)]
+        if forward:
+            pos = index.mm.find(needle, start)
+            if pos < 0:
+                pos = index.mm.find(needle)
+        else:
+            pos = index.mm.rfind(needle, 0, start)
+            if pos < 0:
+                pos = index.mm.rfind(needle)
+        if pos < 0:
+            self._match = None
+            self.summary_label.set_text(f"Not found: {self.search_entry.get_text()}")
+            self.area.queue_draw()
+            return
+        index.index_to(pos)  # the line index may not have got there yet
+        self._update_adjustment()
+        self._match = (pos, index.line_of(pos))
+        self._update_summary()
+        self._scroll_to_line(self._match[1])
+
+    def _on_goto_line(self, entry):
+        index = self.index
+        try:
+            line = int(entry.get_text()) - 1
+        except ValueError:
+            return
+        if not index or line < 0:
+            return
+        while len(index.offsets) <= line and index.index():
+            pass
+        self._update_adjustment()
+        line = min(line, max(0, index.line_count - 1))
+        self._match = (index.offsets[line], line)
+        self._scroll_to_line(line)
+        self.area.grab_focus()
@@ -0,0 +1,270 @@
+import json
+import os
+import shutil
+import signal
+from pathlib import Path
+
+import gi
+gi.require_version("Gtk", "3.0")
+from gi.repository import Gtk, GLib, GObject
+
+POLL_INTERVAL_MS = 500
+TOP_SITES = 500
+
+
+def format_size(size, signed=False):
+    sign = "+" if signed and size > 0 else ""
+    for unit in ("B", "KiB", "MiB"):
+        if abs(size) < 1024 or unit == "MiB":
+            break
+        size /= 1024
+    if unit == "B":
+        return f"{sign}{size} {unit}"
+    return f"{sign}{size:.1f} {unit}"
+
+
+class MemorySnapshot:
+    """Allocation statistics written by tools/memory_bootstrap.py."""
+
+    def __init__(self, path, title):
+        with open(path) as f:
+            data = json.load(f)
+        self.title = title
+        self.label = data["label"]
+        self.time = data["time"]
+        self.current = data["current"]
+        self.peak = data["peak"]
+        # (filename, lineno) -> (size, count)
+        self.sites = {(fn, line): (size, count)
+                      for fn, line, size, count in data["stats"]}
+
+    @property
+    def description(self):
+        return (f"{self.title}: {self.label} at {self.time:.1f}s, "
+                f"{format_size(self.current)} (peak {format_size(self.peak)})")
+
+
+class MemoryPanel(Gtk.Box):
+    """Bottom panel listing the top allocation sites of memory-profiled runs.
+
+    Snapshots from every run are kept until cleared, so any snapshot can be
+    compared with an earlier one (of the same run or another).
+    """
+
+    COL_LOCATION = 0
+    COL_SIZE = 1
+    COL_SIZE_DIFF = 2
+    COL_COUNT = 3
+    COL_COUNT_DIFF = 4
+    COL_FILE = 5
+    COL_LINE = 6
+
+    def __init__(self, app):
+        super().__init__(orientation=Gtk.Orientation.VERTICAL)
+        self.app = app
+        self.session = None
+        self._snapshot_dir = None
+        self._seen = set()
+        self._poll_id = None
+        self._snapshots = []
+
+        header = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=4)
+        header.set_name("panel-header")
+        header.set_margin_start(4)
+        header.set_margin_end(4)
+        header.set_margin_top(2)
+
+        lbl = Gtk.Label(label="MEMORY")
+        lbl.set_xalign(0)
+        header.pack_start(lbl, False, False, 0)
+
+        self.snapshot_combo = Gtk.ComboBoxText()
+        self.snapshot_combo.connect("changed", lambda c: self._refresh())
+        header.pack_start(self.snapshot_combo, True, True, 0)
+
+        header.pack_start(Gtk.Label(label="compared with"), False, False, 0)
+        self.compare_combo = Gtk.ComboBoxText()
+        self.compare_combo.connect("changed", lambda c: self._refresh())
+        header.pack_start(self.compare_combo, True, True, 0)
+
+        self.snapshot_btn = Gtk.Button(label="Snapshot")
+        self.snapshot_btn.set_tooltip_text("Take a snapshot now; the program keeps running")
+        self.snapshot_btn.connect("clicked", lambda b: self._signal(signal.SIGUSR1))
+        header.pack_start(self.snapshot_btn, False, False, 0)
+
+        self.stop_btn = Gtk.Button(label="Stop and Snapshot")
+        self.stop_btn.connect("clicked", lambda b: self._signal(signal.SIGUSR2))
+        header.pack_start(self.stop_btn, False, False, 0)
+
+        clear_btn = Gtk.Button.new_from_icon_name("edit-clear-all-symbolic",
+                                                  Gtk.IconSize.MENU)
+        clear_btn.set_tooltip_text("Forget all snapshots")
+        clear_btn.connect("clicked", lambda b: self.clear())
+        header.pack_end(clear_btn, False, False, 0)
+
+        self.pack_start(header, False, False, 0)
+
+        # location, size, size diff, count, count diff, file, line
+        self.store = Gtk.ListStore(str, GObject.TYPE_INT64, GObject.TYPE_INT64,
+                                   GObject.TYPE_INT64, GObject.TYPE_INT64, str, int)
+        self.tree = Gtk.TreeView(model=self.store)
+
+        col = Gtk.TreeViewColumn("Location", Gtk.CellRendererText(), text=self.COL_LOCATION)
+        col.set_resizable(True)
+        col.set_expand(True)
+        col.set_sort_column_id(self.COL_LOCATION)
+        self.tree.append_column(col)
+
+        self._diff_columns = []
+        for title, column, sizes in (("Size", self.COL_SIZE, True),
+                                     ("Size diff", self.COL_SIZE_DIFF, True),
+                                     ("Blocks", self.COL_COUNT, False),
+                                     ("Blocks diff", self.COL_COUNT_DIFF, False)):
+            renderer = Gtk.CellRendererText()
+            col = Gtk.TreeViewColumn(title, renderer)
+            col.set_cell_data_func(renderer, self._format_cell, (column, sizes))
+            col.set_min_width(90)
+            col.set_sort_column_id(column)
+            self.tree.append_column(col)
+            if column in (self.COL_SIZE_DIFF, self.COL_COUNT_DIFF):
+                self._diff_columns.append(col)
+
+        self.tree.connect("row-activated", self._on_row_activated)
+
+        scrolled = Gtk.ScrolledWindow()
+        scrolled.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
+        scrolled.add(self.tree)
+        self.pack_start(scrolled, True, True, 0)
+        self._update_buttons()
+
+    def watch(self, session, snapshot_dir):
+        """Collect the snapshots session writes to snapshot_dir.
+
+        The directory is deleted when the session ends.
+        """
+        self._stop_polling()
+        self.session = session
+        self._snapshot_dir = snapshot_dir
+        self._seen = set()
+        self._poll_id = GLib.timeout_add(POLL_INTERVAL_MS, self._poll)
+        session.on_exit.append(lambda s: self._on_session_exit(s, snapshot_dir))
+        self._update_buttons()
+
+    def clear(self):
+        self._snapshots = []
+        self.snapshot_combo.remove_all()
+        self.compare_combo.remove_all()
+        self.store.clear()
+
+    def _signal(self, signum):
+        if self.session:
+            self.session.send_signal(signum)
+
+    def _update_buttons(self):
+        running = bool(self.session and self.session.running)
+        self.snapshot_btn.set_sensitive(running)
+        self.stop_btn.set_sensitive(running)
+
+    def _poll(self):
+        if not self._snapshot_dir:
+            return False
+        try:
+            names = sorted(os.listdir(self._snapshot_dir),
+                           key=lambda n: (len(n), n))
+        except OSError:
+            return True
+        for name in names:
+            if name in self._seen or not name.endswith(".json"):
+                continue
+            self._seen.add(name)
+            try:
+                snapshot = MemorySnapshot(os.path.join(self._snapshot_dir, name),
+                                          self.session.title)
+            except (OSError, ValueError, KeyError) as e:
+                self.session.write(f"Could not read memory snapshot: {e}\n", "error")
+                continue
+            self._add_snapshot(snapshot)
+        return True
+
+    def _on_session_exit(self, session, snapshot_dir):
+        if session is self.session:
+            self._poll()
+            self._stop_polling()
+            self._update_buttons()
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+
+    def _stop_polling(self):
+        if self._poll_id:
+            GLib.source_remove(self._poll_id)
+            self._poll_id = None
+        self._snapshot_dir = None
+
+    def _add_snapshot(self, snapshot):
+        self._snapshots.append(snapshot)
+        self.snapshot_combo.append_text(snapshot.description)
+        if len(self._snapshots) == 1:
+            self.compare_combo.append_text("(nothing)")
+        self.compare_combo.append_text(snapshot.description)
+        # Show the new snapshot, compared with the one before it
+        self.snapshot_combo.set_active(len(self._snapshots) - 1)
+        self.compare_combo.set_active(len(self._snapshots) - 1)
+
+    def _refresh(self):
+        index = self.snapshot_combo.get_active()
+        if index < 0 or index >= len(self._snapshots):
+            self.store.clear()
+            return
+        current = self._snapshots[index].sites
+        base_index = self.compare_combo.get_active() - 1
+        base = self._snapshots[base_index].sites if 0 <= base_index < len(self._snapshots) else None
+
+        rows = []
+        if base is None:
+            for key, (size, count) in current.items():
+                rows.append((key, size, 0, count, 0))
+            rows.sort(key=lambda r: -r[1])
+            sort_col = self.COL_SIZE
+        else:
+            for key in current.keys() | base.keys():
+                size, count = current.get(key, (0, 0))
+                old_size, old_count = base.get(key, (0, 0))
+                if size != old_size or count != old_count:
+                    rows.append((key, size, size - old_size, count, count - old_count))
+            rows.sort(key=lambda r: -abs(r[2]))
+            sort_col = self.COL_SIZE_DIFF
+        for col in self._diff_columns:
+            col.set_visible(base is not None)
+
+        self.tree.set_model(None)  # detach while filling
+        self.store.clear()
+        for (filename, line), size, size_diff, count, count_diff in rows[:TOP_SITES]:
+            self.store.append([f"{self._display_path(filename)}:{line}",
+                               size, size_diff, count, count_diff, filename, line])
+        self.store.set_sort_column_id(sort_col, Gtk.SortType.DESCENDING)
+        self.tree.set_model(self.store)
+
+    def _display_path(self, filename):
+        root = self.app.workspace.root if self.app.workspace else None
+        if root:
+            try:
+                return str(Path(filename).relative_to(root))
+            except ValueError:
+                pass
+        return filename
+
+    def _format_cell(self, column, cell, model, it, data):
+        col, sizes = data
+        value = model.get_value(it, col)
+        signed = col in (self.COL_SIZE_DIFF, self.COL_COUNT_DIFF)
+        if sizes:
+            cell.set_property("text", format_size(value, signed))
+        else:
+            cell.set_property("text", f"{value:+d}" if signed else str(value))
+
+    def _on_row_activated(self, tree, treepath, column):
+        model = tree.get_model()
+        it = model.get_iter(treepath)
+        filepath = model.get_value(it, self.COL_FILE)
+        line = model.get_value(it, self.COL_LINE)
+        if Path(filepath).is_file() and self.app.editor_manager:
+            self.app.editor_manager.goto_line(filepath, line)
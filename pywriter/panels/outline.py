@@ -1,10 +1,11 @@
-import ast
-import threading
+import weakref
 
 import gi
 gi.require_version("Gtk", "3.0")
 from gi.repository import Gtk, GLib
 
+from ..language.outline import OutlineParser
+
 
 class OutlinePanel(Gtk.Box):
     """Right-side panel showing classes and functions from AST."""
@@ -19,6 +20,18 @@ class OutlinePanel(Gtk.Box):
         self.app = app
         self._update_timeout_id = None
         self._connected_buffer = None
+        self._doc = None
+        self._syncing = False
+        # Per-document sets of (kind, name) key paths the user collapsed
+        self._collapsed_states = weakref.WeakKeyDictionary()
+        self._collapsed = set()
+        self._parser = OutlineParser(self._on_parsed,
+                                     app.config.get("outline_quick_pass_lines", 5000))
+        self._docs = weakref.WeakValueDictionary()  # parser doc key -> document
+        self._symbols_cache = weakref.WeakKeyDictionary()  # doc -> (version, symbols, index)
+        self._index = None
+        self._cursor_line = 1
+        self._scope = None
 
         header = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=2)
         header.set_name("panel-header")
@@ -48,6 +61,8 @@ class OutlinePanel(Gtk.Box):
 
         self.tree.append_column(col)
         self.tree.connect("row-activated", self._on_row_activated)
+        self.tree.connect("row-collapsed", self._on_row_collapsed)
+        self.tree.connect("row-expanded", self._on_row_expanded)
 
         scrolled = Gtk.ScrolledWindow()
         scrolled.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
@@ -58,10 +73,35 @@ class OutlinePanel(Gtk.Box):
         if not doc:
             self.store.clear()
             self._disconnect_buffer()
+            self._doc = None
+            self._index = None
+            self._set_scope([])
             return
         self._connect_buffer(doc.buffer)
+        if doc is not self._doc:
+            self._doc = doc
+            self._docs[id(doc)] = doc
+            self.store.clear()
+            self._index = None
+            self._scope = None
+            self._collapsed = self._collapsed_states.setdefault(doc, set())
+            cached = self._symbols_cache.get(doc)
+            if cached:
+                self._apply_symbols(cached[1])
+                self._index = cached[2]
+                self._update_scope()
+                if cached[0] == doc.version:
+                    return
         self._schedule_update(doc)
 
+    def forget_document(self, doc):
+        """Drop the parser's cached result for a closed document."""
+        if doc is self._doc and self._update_timeout_id:
+            GLib.source_remove(self._update_timeout_id)
+            self._update_timeout_id = None
+        self._docs.pop(id(doc), None)
+        self._parser.forget(id(doc))
+
     def _connect_buffer(self, buf):
         if self._connected_buffer == buf:
             return
@@ -89,42 +129,145 @@ class OutlinePanel(Gtk.Box):
 
     def _do_update(self, doc):
         self._update_timeout_id = None
-        text = doc.get_text()
-        threading.Thread(target=self._parse, args=(text,), daemon=True).start()
+        self._parser.submit(id(doc), doc.version, doc.get_text())
         return False
 
-    def _parse(self, text):
-        symbols = []
-        try:
-            tree = ast.parse(text)
-            self._walk(tree, symbols, depth=0)
-        except SyntaxError:
-            pass
-        GLib.idle_add(self._apply_symbols, symbols)
-
-    def _walk(self, node, symbols, depth):
-        for child in ast.iter_child_nodes(node):
-            if isinstance(child, ast.ClassDef):
-                children = []
-                self._walk(child, children, depth + 1)
-                symbols.append(("class", child.name, child.lineno, children))
-            elif isinstance(child, ast.FunctionDef) or isinstance(child, ast.AsyncFunctionDef):
-                symbols.append(("function", child.name, child.lineno, []))
+    def _on_parsed(self, doc_key, version, symbols, index):
+        doc = self._docs.get(doc_key)
+        if doc is None or version != doc.version:
+            return False  # stale: a newer snapshot is on its way
+        self._symbols_cache[doc] = (version, symbols, index)
+        if doc is self._doc:
+            self._apply_symbols(symbols)
+            self._index = index
+            self._update_scope()
+        return False
+
+    def follow_cursor(self, line):
+        """Track the cursor line (1-based): update breadcrumbs and outline selection."""
+        self._cursor_line = line
+        self._update_scope()
+
+    def _update_scope(self):
+        if self._index is None:
+            return
+        self._set_scope(self._index.scope_at(self._cursor_line))
+
+    def _set_scope(self, chain):
+        if chain == self._scope:
+            return
+        self._scope = chain
+        if self.app.editor_manager:
+            self.app.editor_manager.set_breadcrumbs([key[-1][1] for key in chain])
+        selection = self.tree.get_selection()
+        if not chain:
+            selection.unselect_all()
+            return
+        # Select the deepest row that is visible (its ancestors are expanded)
+        target = None
+        for key in chain:
+            it = self._iter_for_key(key)
+            if it is None:
+                break
+            target = it
+            if not self.tree.row_expanded(self.store.get_path(it)):
+                break
+        if target is not None:
+            treepath = self.store.get_path(target)
+            selection.select_path(treepath)
+            self.tree.scroll_to_cell(treepath, None, False, 0, 0)
+
+    def _iter_for_key(self, key):
+        it = None
+        for kind, name, occurrence in key:
+            child = self.store.iter_children(it)
+            n = 0
+            while child is not None:
+                if (self.store.get_value(child, self.COL_KIND) == kind
+                        and self.store.get_value(child, self.COL_NAME) == name):
+                    if n == occurrence:
+                        break
+                    n += 1
+                child = self.store.iter_next(child)
+            if child is None:
+                return None
+            it = child
+        return it
 
     def _apply_symbols(self, symbols):
-        self.store.clear()
-        self._add_symbols(symbols, None)
+        """Patch the tree in place so selection, scroll and collapsed rows survive."""
+        self._syncing = True
+        try:
+            self._sync_children(None, symbols, ())
+        finally:
+            self._syncing = False
+        return False
+
+    def _sync_children(self, parent_iter, symbols, parent_key):
+        # Rows are matched by (kind, name, occurrence) among their siblings
+        wanted = []
+        seen = {}
+        for kind, name, line, _end, children in symbols:
+            n = seen.get((kind, name), 0)
+            seen[(kind, name)] = n + 1
+            wanted.append(((kind, name, n), line, children))
+        wanted_keys = {key for key, _, _ in wanted}
 
-    def _add_symbols(self, symbols, parent_iter):
-        for kind, name, line, children in symbols:
-            if kind == "class":
-                icon = "dialog-information-symbolic"
+        existing = {}
+        seen = {}
+        it = self.store.iter_children(parent_iter)
+        while it is not None:
+            nxt = self.store.iter_next(it)
+            kind = self.store.get_value(it, self.COL_KIND)
+            name = self.store.get_value(it, self.COL_NAME)
+            n = seen.get((kind, name), 0)
+            seen[(kind, name)] = n + 1
+            key = (kind, name, n)
+            if key in wanted_keys:
+                existing[key] = it
             else:
-                icon = "text-x-generic-symbolic"
-            it = self.store.append(parent_iter, [icon, name, line, kind])
-            if children:
-                self._add_symbols(children, it)
-        self.tree.expand_all()
+                self.store.remove(it)
+            it = nxt
+
+        for pos, (key, line, children) in enumerate(wanted):
+            kind, name, _ = key
+            it = existing.get(key)
+            if it is None:
+                it = self.store.insert(parent_iter, pos,
+                                       [self._icon_for(kind), name, line, kind])
+            else:
+                current = self.store.iter_nth_child(parent_iter, pos)
+                if current is not None and self.store.get_path(current) != self.store.get_path(it):
+                    self.store.move_before(it, current)
+                if self.store.get_value(it, self.COL_LINE) != line:
+                    self.store.set_value(it, self.COL_LINE, line)
+            key_path = parent_key + ((kind, name),)
+            self._sync_children(it, children, key_path)
+            if children and key_path not in self._collapsed:
+                treepath = self.store.get_path(it)
+                if not self.tree.row_expanded(treepath):
+                    self.tree.expand_row(treepath, False)
+
+    def _icon_for(self, kind):
+        if kind == "class":
+            return "dialog-information-symbolic"
+        return "text-x-generic-symbolic"
+
+    def _key_path(self, it):
+        keys = []
+        while it is not None:
+            keys.append((self.store.get_value(it, self.COL_KIND),
+                         self.store.get_value(it, self.COL_NAME)))
+            it = self.store.iter_parent(it)
+        return tuple(reversed(keys))
+
+    def _on_row_collapsed(self, tree, it, treepath):
+        if not self._syncing:
+            self._collapsed.add(self._key_path(it))
+
+    def _on_row_expanded(self, tree, it, treepath):
+        if not self._syncing:
+            self._collapsed.discard(self._key_path(it))
 
     def _on_row_activated(self, tree, treepath, column):
         it = self.store.get_iter(treepath)
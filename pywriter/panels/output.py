@@ -1,14 +1,46 @@
+import threading
+
 import gi
 gi.require_version("Gtk", "3.0")
-from gi.repository import Gtk, GLib
+from gi.repository import Gtk, Gdk, GLib
+
+from ..tools.terminal import ANSI_COLORS
+
+FLUSH_INTERVAL_MS = 16  # coalesce output into at most one insert batch per frame
+SCROLL_SLACK = 8
+
+# Keys forwarded to terminal runs as escape sequences
+_KEY_SEQUENCES = {
+    Gdk.KEY_Return: b"\r", Gdk.KEY_KP_Enter: b"\r",
+    Gdk.KEY_BackSpace: b"\x7f", Gdk.KEY_Tab: b"\t", Gdk.KEY_Escape: b"\x1b",
+    Gdk.KEY_Up: b"\x1b[A", Gdk.KEY_Down: b"\x1b[B",
+    Gdk.KEY_Right: b"\x1b[C", Gdk.KEY_Left: b"\x1b[D",
+    Gdk.KEY_Home: b"\x1b[H", Gdk.KEY_End: b"\x1b[F",
+    Gdk.KEY_Delete: b"\x1b[3~",
+}
 
 
 class OutputPanel(Gtk.Box):
-    """Bottom panel for program output and tool messages."""
+    """Bottom panel for program output and tool messages.
+
+    The main Output tab has no session; each script run gets its own panel
+    bound to a RunSession, with its own stop button and exit status.
+
+    append() may be called from any thread. Text is queued and flushed to the
+    buffer at most once per frame; the buffer keeps only the newest
+    output_max_lines lines.
+    """
 
-    def __init__(self, app):
+    def __init__(self, app, session=None):
         super().__init__(orientation=Gtk.Orientation.VERTICAL)
         self.app = app
+        self.session = None
+        self._status_timeout_id = None
+        self.max_lines = app.config.get("output_max_lines", 10000)
+        self._lock = threading.Lock()
+        self._pending = []  # [[chunks], tag_name] runs in arrival order
+        self._flush_scheduled = False
+        self._stick_to_bottom = True
 
         toolbar = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=2)
         toolbar.set_name("panel-header")
@@ -16,9 +48,12 @@ class OutputPanel(Gtk.Box):
         toolbar.set_margin_end(4)
         toolbar.set_margin_top(2)
 
-        lbl = Gtk.Label(label="OUTPUT")
-        lbl.set_xalign(0)
-        toolbar.pack_start(lbl, True, True, 0)
+        self._title_label = Gtk.Label(label="OUTPUT")
+        self._title_label.set_xalign(0)
+        toolbar.pack_start(self._title_label, True, True, 0)
+
+        self._status_label = Gtk.Label(label="")
+        toolbar.pack_start(self._status_label, False, False, 4)
 
         btn_clear = Gtk.Button()
         btn_clear.set_image(Gtk.Image.new_from_icon_name("edit-clear-symbolic",
@@ -28,6 +63,15 @@ class OutputPanel(Gtk.Box):
         btn_clear.connect("clicked", lambda b: self.clear())
         toolbar.pack_end(btn_clear, False, False, 0)
 
+        self._btn_log = Gtk.Button()
+        self._btn_log.set_image(Gtk.Image.new_from_icon_name("text-x-generic-symbolic",
+                                                              Gtk.IconSize.SMALL_TOOLBAR))
+        self._btn_log.set_relief(Gtk.ReliefStyle.NONE)
+        self._btn_log.set_tooltip_text("Open the complete output in the log viewer")
+        self._btn_log.set_sensitive(False)
+        self._btn_log.connect("clicked", lambda b: self.app.show_run_log(self.session))
+        toolbar.pack_end(self._btn_log, False, False, 0)
+
         btn_stop = Gtk.Button()
         btn_stop.set_image(Gtk.Image.new_from_icon_name("process-stop-symbolic",
                                                          Gtk.IconSize.SMALL_TOOLBAR))
@@ -49,35 +93,168 @@ class OutputPanel(Gtk.Box):
         self.buffer = self.textview.get_buffer()
         self.buffer.create_tag("error", foreground="#f44747")
         self.buffer.create_tag("info", foreground="#888888")
+        self.buffer.create_tag("bold", weight=700)
+        for code, color in ANSI_COLORS.items():
+            self.buffer.create_tag(f"ansi-{code}", foreground=color)
+        self._end_mark = self.buffer.create_mark("end", self.buffer.get_end_iter(), False)
 
         scrolled = Gtk.ScrolledWindow()
         scrolled.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
         scrolled.add(self.textview)
         self.pack_start(scrolled, True, True, 0)
 
+        self._vadjustment = scrolled.get_vadjustment()
+        self._vadjustment.connect("value-changed", self._on_scrolled)
+
+        if session:
+            self.attach(session)
+
+    def attach(self, session):
+        """Bind the panel to a new run, clearing the previous run's output."""
+        self.session = session
+        self.clear()
+        self._title_label.set_text(session.title.upper())
+        self._btn_log.set_sensitive(session.log is not None)
+        self.update_status()
+        if self._status_timeout_id is None:
+            self._status_timeout_id = GLib.timeout_add_seconds(1, self._tick_status)
+
+    def update_status(self):
+        if self.session:
+            self._status_label.set_text(self.session.status_text())
+
+    def _tick_status(self):
+        self.update_status()
+        if self.session and self.session.running:
+            return True
+        self._status_timeout_id = None
+        return False
+
     def append(self, text, tag_name=None):
-        def _do():
+        if not text:
+            return
+        with self._lock:
+            if self._pending and self._pending[-1][1] == tag_name:
+                self._pending[-1][0].append(text)
+            else:
+                self._pending.append([[text], tag_name])
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+        GLib.timeout_add(FLUSH_INTERVAL_MS, self._flush)
+
+    def _flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self._flush_scheduled = False
+        pending = self._drop_overflow(pending)
+        tag_table = self.buffer.get_tag_table()
+        for chunks, tag_name in pending:
+            text = "".join(chunks)
+            if "\r" in text:
+                text = self._overwrite_current_line(text)
+            if "\b" in text:
+                text = self._apply_backspaces(text)
             end = self.buffer.get_end_iter()
-            if tag_name:
-                tag = self.buffer.get_tag_table().lookup(tag_name)
-                if tag:
-                    self.buffer.insert_with_tags(end, text, tag)
-                else:
-                    self.buffer.insert(end, text)
+            tag = tag_table.lookup(tag_name) if tag_name else None
+            if tag:
+                self.buffer.insert_with_tags(end, text, tag)
             else:
                 self.buffer.insert(end, text)
-            # Auto-scroll
+        self._trim()
+        if self._stick_to_bottom:
+            self.textview.scroll_to_mark(self._end_mark, 0.0, False, 0, 0)
+        return False
+
+    def _overwrite_current_line(self, text):
+        """Apply carriage returns: each \r discards the line written so far.
+
+        Collapses \r within text first, so a progress bar costs at most one
+        delete of the buffer's last line per flush.
+        """
+        lines = text.split("\n")
+        if "\r" in lines[0]:
+            last = self.buffer.get_line_count() - 1
+            self.buffer.delete(self.buffer.get_iter_at_line(last),
+                               self.buffer.get_end_iter())
+        return "\n".join(line.rsplit("\r", 1)[-1] for line in lines)
+
+    def _apply_backspaces(self, text):
+        """Each \b removes the previous character (terminal echo of erase)."""
+        out = []
+        erase = 0
+        for ch in text:
+            if ch != "\b":
+                out.append(ch)
+            elif out and out[-1] != "\n":
+                out.pop()
+            elif not out:
+                erase += 1
+        if erase:
             end = self.buffer.get_end_iter()
-            self.buffer.place_cursor(end)
-            self.textview.scroll_to_mark(self.buffer.get_insert(), 0.0, False, 0, 0)
-        GLib.idle_add(_do)
+            start = end.copy()
+            start.backward_chars(min(erase, end.get_line_offset()))
+            self.buffer.delete(start, end)
+        return "".join(out)
+
+    def forward_key(self, event):
+        """Send a keystroke to a run on a pseudo-terminal; True if it was sent.
+
+        The window calls this before activating its shortcuts, so keys like
+        Ctrl+W reach the program while its tab has the focus.
+        """
+        session = self.session
+        if not session or not getattr(session, "accepts_input", False):
+            return False
+        state = event.state & Gtk.accelerator_get_default_mod_mask()
+        if state & Gdk.ModifierType.SHIFT_MASK and state & Gdk.ModifierType.CONTROL_MASK:
+            return False  # leave Ctrl+Shift shortcuts (copy) to the view
+        data = _KEY_SEQUENCES.get(event.keyval)
+        if data is None:
+            char = Gdk.keyval_to_unicode(event.keyval)
+            if not char:
+                return False
+            if state & Gdk.ModifierType.CONTROL_MASK:
+                if not (0x40 <= char < 0x80):
+                    return False
+                data = bytes([char & 0x1f])
+            else:
+                data = chr(char).encode("utf-8")
+        session.send_input(data)
+        return True
+
+    def _drop_overflow(self, pending):
+        """Skip runs that would be trimmed right away anyway."""
+        if self.max_lines <= 0:
+            return pending
+        lines = 0
+        for i in range(len(pending) - 1, -1, -1):
+            lines += sum(chunk.count("\n") for chunk in pending[i][0])
+            if lines > self.max_lines:
+                return pending[i:]
+        return pending
+
+    def _trim(self):
+        excess = self.buffer.get_line_count() - self.max_lines
+        if self.max_lines > 0 and excess > 0:
+            self.buffer.delete(self.buffer.get_start_iter(),
+                               self.buffer.get_iter_at_line(excess))
+
+    def _on_scrolled(self, adj):
+        # Only user scrolling moves the value away from the bottom; growing
+        # content changes the upper bound without emitting value-changed.
+        self._stick_to_bottom = (adj.get_value() + adj.get_page_size()
+                                 >= adj.get_upper() - SCROLL_SLACK)
 
     def clear(self):
+        with self._lock:
+            self._pending = []
         self.buffer.set_text("")
+        self._stick_to_bottom = True
 
     def write_line(self, text, tag_name=None):
         self.append(text + "\n", tag_name)
 
     def _on_stop(self):
         if self.app.runner:
-            self.app.runner.stop()
+            self.app.runner.stop(self.session)
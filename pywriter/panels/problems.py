@@ -1,3 +1,5 @@
+from pathlib import Path
+
 import gi
 gi.require_version("Gtk", "3.0")
 from gi.repository import Gtk
@@ -14,7 +16,11 @@ class Diagnostic:
 
 
 class ProblemsPanel(Gtk.Box):
-    """Bottom panel displaying lint diagnostics."""
+    """Bottom panel displaying diagnostics.
+
+    Each source (the linter, the background compiler for one file, ...)
+    replaces only its own diagnostics; the panel shows all of them.
+    """
 
     COL_ICON = 0
     COL_FILE = 1
@@ -26,6 +32,7 @@ class ProblemsPanel(Gtk.Box):
     def __init__(self, app):
         super().__init__(orientation=Gtk.Orientation.VERTICAL)
         self.app = app
+        self._sources = {}  # source key -> [Diagnostic]
 
         header = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=2)
         header.set_name("panel-header")
@@ -76,18 +83,32 @@ class ProblemsPanel(Gtk.Box):
         scrolled.add(self.tree)
         self.pack_start(scrolled, True, True, 0)
 
-    def set_diagnostics(self, diagnostics):
-        self.store.clear()
-        for d in diagnostics:
-            icon = "dialog-error-symbolic" if d.severity == "error" else "dialog-warning-symbolic"
-            from pathlib import Path
-            filename = Path(d.file).name if d.file else ""
-            self.store.append([icon, filename, d.line, d.message, d.code, str(d.file)])
-        self.count_label.set_text(str(len(diagnostics)))
-
-    def clear(self):
+    def set_diagnostics(self, diagnostics, source="lint"):
+        if diagnostics:
+            self._sources[source] = list(diagnostics)
+        else:
+            self._sources.pop(source, None)
+        self._refresh()
+
+    def clear(self, source=None):
+        """Remove the diagnostics of source, or of every source when None."""
+        if source is None:
+            self._sources = {}
+        else:
+            self._sources.pop(source, None)
+        self._refresh()
+
+    def _refresh(self):
         self.store.clear()
-        self.count_label.set_text("0")
+        count = 0
+        for diagnostics in self._sources.values():
+            for d in diagnostics:
+                icon = ("dialog-error-symbolic" if d.severity == "error"
+                        else "dialog-warning-symbolic")
+                filename = Path(d.file).name if d.file else ""
+                self.store.append([icon, filename, d.line, d.message, d.code, str(d.file)])
+            count += len(diagnostics)
+        self.count_label.set_text(str(count))
 
     def _on_row_activated(self, tree, treepath, column):
         it = self.store.get_iter(treepath)
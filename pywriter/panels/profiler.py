@@ -0,0 +1,196 @@
+import os
+import pstats
+import threading
+from pathlib import Path
+
+import gi
+gi.require_version("Gtk", "3.0")
+from gi.repository import Gtk, GLib
+
+
+class ProfileData:
+    """Flattened cProfile statistics with caller and callee maps."""
+
+    def __init__(self, stats_path):
+        stats = pstats.Stats(str(stats_path))
+        self.total_time = stats.total_tt
+        self.total_calls = stats.total_calls
+        # func key (file, line, name) -> (primitive calls, ncalls, tottime, cumtime)
+        self.functions = {}
+        self.callers = {}  # func -> {caller: (cc, nc, tt, ct)}
+        self.callees = {}  # func -> {callee: (cc, nc, tt, ct)}
+        for func, (cc, nc, tt, ct, callers) in stats.stats.items():
+            self.functions[func] = (cc, nc, tt, ct)
+            self.callers[func] = callers
+            for caller, timing in callers.items():
+                self.callees.setdefault(caller, {})[func] = timing
+
+
+def _format_func(func):
+    filename, line, name = func
+    if filename == "~":
+        return name  # built-in
+    return f"{name}  ({Path(filename).name}:{line})"
+
+
+def _format_calls(cc, nc):
+    return str(nc) if cc == nc else f"{nc}/{cc}"
+
+
+class ProfilerPanel(Gtk.Box):
+    """Bottom panel showing cProfile results: a sortable flat view and a
+    caller/callee tree for the selected function."""
+
+    COL_NAME = 0
+    COL_CALLS = 1
+    COL_NCALLS = 2
+    COL_TOTTIME = 3
+    COL_CUMTIME = 4
+    COL_FILE = 5
+    COL_LINE = 6
+    COL_KEY = 7
+
+    def __init__(self, app):
+        super().__init__(orientation=Gtk.Orientation.VERTICAL)
+        self.app = app
+        self._data = None
+        self._keys = {}  # str key -> func key
+
+        header = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=2)
+        header.set_name("panel-header")
+        header.set_margin_start(4)
+        header.set_margin_end(4)
+        header.set_margin_top(2)
+
+        lbl = Gtk.Label(label="PROFILE")
+        lbl.set_xalign(0)
+        header.pack_start(lbl, True, True, 0)
+
+        self.summary_label = Gtk.Label(label="")
+        header.pack_end(self.summary_label, False, False, 4)
+        self.pack_start(header, False, False, 0)
+
+        paned = Gtk.Paned(orientation=Gtk.Orientation.HORIZONTAL)
+
+        # name, ncalls text, ncalls, tottime, cumtime, file, line, key
+        self.store = Gtk.ListStore(str, str, int, float, float, str, int, str)
+        self.tree = Gtk.TreeView(model=self.store)
+        self._add_columns(self.tree, sortable=True)
+        self.tree.connect("row-activated", self._on_row_activated)
+        self.tree.get_selection().connect("changed", self._on_selection_changed)
+        self.store.set_sort_column_id(self.COL_TOTTIME, Gtk.SortType.DESCENDING)
+
+        scrolled = Gtk.ScrolledWindow()
+        scrolled.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
+        scrolled.add(self.tree)
+        paned.pack1(scrolled, resize=True, shrink=False)
+
+        self.call_store = Gtk.TreeStore(str, str, int, float, float, str, int, str)
+        self.call_tree = Gtk.TreeView(model=self.call_store)
+        self._add_columns(self.call_tree, sortable=False)
+        self.call_tree.connect("row-activated", self._on_row_activated)
+
+        scrolled = Gtk.ScrolledWindow()
+        scrolled.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
+        scrolled.add(self.call_tree)
+        paned.pack2(scrolled, resize=True, shrink=False)
+        paned.set_position(700)
+
+        self.pack_start(paned, True, True, 0)
+
+    def _add_columns(self, tree, sortable):
+        col = Gtk.TreeViewColumn("Function", Gtk.CellRendererText(), text=self.COL_NAME)
+        col.set_resizable(True)
+        col.set_expand(True)
+        if sortable:
+            col.set_sort_column_id(self.COL_NAME)
+        tree.append_column(col)
+
+        col = Gtk.TreeViewColumn("ncalls", Gtk.CellRendererText(), text=self.COL_CALLS)
+        col.set_min_width(70)
+        if sortable:
+            col.set_sort_column_id(self.COL_NCALLS)
+        tree.append_column(col)
+
+        for title, column in (("tottime", self.COL_TOTTIME), ("cumtime", self.COL_CUMTIME)):
+            renderer = Gtk.CellRendererText()
+            col = Gtk.TreeViewColumn(title, renderer)
+            col.set_cell_data_func(renderer, self._format_seconds, column)
+            col.set_min_width(80)
+            if sortable:
+                col.set_sort_column_id(column)
+            tree.append_column(col)
+
+    def _format_seconds(self, column, cell, model, it, data_col):
+        if model.get_value(it, self.COL_KEY):
+            cell.set_property("text", f"{model.get_value(it, data_col):.4f}")
+        else:
+            cell.set_property("text", "")
+
+    def load(self, stats_path, title="", remove=True):
+        """Load a cProfile stats file in the background and show it.
+
+        The file is deleted afterwards unless remove is False.
+        """
+        self.summary_label.set_text(f"Loading {title}...")
+
+        def work():
+            try:
+                data = ProfileData(stats_path)
+            except (OSError, EOFError, TypeError, ValueError) as e:
+                GLib.idle_add(self.summary_label.set_text, f"Could not load profile: {e}")
+                return
+            finally:
+                if remove:
+                    try:
+                        os.unlink(stats_path)
+                    except OSError:
+                        pass
+            GLib.idle_add(self._show, data, title)
+
+        threading.Thread(target=work, daemon=True).start()
+
+    def _show(self, data, title):
+        self._data = data
+        self._keys = {}
+        self.call_store.clear()
+        self.tree.set_model(None)  # detach while filling
+        self.store.clear()
+        for func, (cc, nc, tt, ct) in data.functions.items():
+            self.store.append(self._row(func, (cc, nc, tt, ct)))
+        self.tree.set_model(self.store)
+        self.summary_label.set_text(
+            f"{title}  {data.total_calls} calls in {data.total_time:.3f}s")
+        return False
+
+    def _row(self, func, timing):
+        cc, nc, tt, ct = timing
+        key = repr(func)
+        self._keys[key] = func
+        filename, line, _ = func
+        return [_format_func(func), _format_calls(cc, nc), nc, tt, ct,
+                "" if filename == "~" else filename, line, key]
+
+    def _on_selection_changed(self, selection):
+        model, it = selection.get_selected()
+        if it is None or not self._data:
+            return
+        func = self._keys.get(model.get_value(it, self.COL_KEY))
+        if func is None:
+            return
+        self.call_store.clear()
+        for title, entries in (("Called by", self._data.callers.get(func, {})),
+                               ("Calls", self._data.callees.get(func, {}))):
+            parent = self.call_store.append(None, [f"{title} ({len(entries)})",
+                                                   "", 0, 0.0, 0.0, "", 0, ""])
+            for other, timing in sorted(entries.items(), key=lambda e: -e[1][3]):
+                self.call_store.append(parent, self._row(other, timing))
+        self.call_tree.expand_all()
+
+    def _on_row_activated(self, tree, treepath, column):
+        model = tree.get_model()
+        it = model.get_iter(treepath)
+        filepath = model.get_value(it, self.COL_FILE)
+        line = model.get_value(it, self.COL_LINE)
+        if filepath and Path(filepath).is_file() and self.app.editor_manager:
+            self.app.editor_manager.goto_line(filepath, line)
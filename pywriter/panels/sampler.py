@@ -0,0 +1,188 @@
+import json
+import os
+from pathlib import Path
+
+import gi
+gi.require_version("Gtk", "3.0")
+from gi.repository import Gtk, GLib
+
+REFRESH_INTERVAL_MS = 1000
+TOP_FUNCTIONS = 300
+
+
+class SampleAggregator:
+    """Accumulates the stack messages of tools/sampler_bootstrap.py.
+
+    self_counts counts samples with the function on top of the stack;
+    total_counts counts samples with the function anywhere on it (once per
+    sample, so recursion is not counted twice).
+    """
+
+    def __init__(self):
+        self.functions = {}  # id -> (filename, line, name)
+        self.self_counts = {}
+        self.total_counts = {}
+        self.samples = 0
+        self._buffer = b""
+
+    def feed(self, data):
+        """Parse complete lines from data; return True if anything changed."""
+        lines = (self._buffer + data).split(b"\n")
+        self._buffer = lines.pop()
+        changed = False
+        for line in lines:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            self._add(message)
+            changed = True
+        return changed
+
+    def _add(self, message):
+        for fid, func in message.get("functions", {}).items():
+            self.functions[int(fid)] = tuple(func)
+        for stack, count in message.get("stacks", ()):
+            top = stack[-1]
+            self.self_counts[top] = self.self_counts.get(top, 0) + count
+            for fid in set(stack):
+                self.total_counts[fid] = self.total_counts.get(fid, 0) + count
+        self.samples += message.get("samples", 0)
+
+
+class SamplerPanel(Gtk.Box):
+    """Live top-functions table for a run under the sampling profiler."""
+
+    COL_NAME = 0
+    COL_SELF = 1
+    COL_TOTAL = 2
+    COL_FILE = 3
+    COL_LINE = 4
+
+    def __init__(self, app):
+        super().__init__(orientation=Gtk.Orientation.VERTICAL)
+        self.app = app
+        self.session = None
+        self._data = SampleAggregator()
+        self._read_fd = None
+        self._watch_id = None
+        self._refresh_id = None
+        self._dirty = False
+
+        header = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=2)
+        header.set_name("panel-header")
+        header.set_margin_start(4)
+        header.set_margin_end(4)
+        header.set_margin_top(2)
+
+        lbl = Gtk.Label(label="SAMPLES")
+        lbl.set_xalign(0)
+        header.pack_start(lbl, True, True, 0)
+
+        self.summary_label = Gtk.Label(label="")
+        header.pack_end(self.summary_label, False, False, 4)
+        self.pack_start(header, False, False, 0)
+
+        # name, self %, total %, file, line
+        self.store = Gtk.ListStore(str, float, float, str, int)
+        self.tree = Gtk.TreeView(model=self.store)
+
+        col = Gtk.TreeViewColumn("Function", Gtk.CellRendererText(), text=self.COL_NAME)
+        col.set_resizable(True)
+        col.set_expand(True)
+        col.set_sort_column_id(self.COL_NAME)
+        self.tree.append_column(col)
+
+        for title, column in (("Self %", self.COL_SELF), ("Total %", self.COL_TOTAL)):
+            renderer = Gtk.CellRendererText()
+            col = Gtk.TreeViewColumn(title, renderer)
+            col.set_cell_data_func(renderer, self._format_percent, column)
+            col.set_min_width(80)
+            col.set_sort_column_id(column)
+            self.tree.append_column(col)
+        self.store.set_sort_column_id(self.COL_SELF, Gtk.SortType.DESCENDING)
+
+        self.tree.connect("row-activated", self._on_row_activated)
+
+        scrolled = Gtk.ScrolledWindow()
+        scrolled.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
+        scrolled.add(self.tree)
+        self.pack_start(scrolled, True, True, 0)
+
+    def watch(self, session, read_fd):
+        """Show the samples session streams to read_fd (closed at EOF)."""
+        self._stop_watching()
+        self.session = session
+        self._data = SampleAggregator()
+        self.store.clear()
+        self.summary_label.set_text(f"{session.title}: waiting for samples")
+        os.set_blocking(read_fd, False)
+        self._read_fd = read_fd
+        self._watch_id = GLib.io_add_watch(
+            read_fd, GLib.PRIORITY_DEFAULT, GLib.IO_IN | GLib.IO_HUP | GLib.IO_ERR,
+            self._on_readable)
+        self._refresh_id = GLib.timeout_add(REFRESH_INTERVAL_MS, self._refresh)
+
+    def _stop_watching(self):
+        if self._watch_id:
+            GLib.source_remove(self._watch_id)
+            self._watch_id = None
+        if self._read_fd is not None:
+            os.close(self._read_fd)
+            self._read_fd = None
+        if self._refresh_id:
+            GLib.source_remove(self._refresh_id)
+            self._refresh_id = None
+
+    def _on_readable(self, fd, condition):
+        while True:
+            try:
+                chunk = os.read(fd, 65536)
+            except BlockingIOError:
+                return True
+            except OSError:
+                chunk = b""
+            if not chunk:
+                # The program has exited: show the final numbers
+                self._watch_id = None
+                self._stop_watching()
+                self._refresh()
+                return False
+            if self._data.feed(chunk):
+                self._dirty = True
+
+    def _refresh(self):
+        if not self._dirty:
+            return True
+        self._dirty = False
+        data = self._data
+        samples = max(data.samples, 1)
+        top = sorted(data.self_counts.items(), key=lambda e: -e[1])[:TOP_FUNCTIONS]
+        shown = {fid for fid, _ in top}
+        # Callers with a large total share belong in the table as well
+        top += [(fid, 0) for fid, _ in sorted(data.total_counts.items(),
+                                               key=lambda e: -e[1])[:TOP_FUNCTIONS]
+                if fid not in shown]
+
+        self.tree.set_model(None)  # detach while filling
+        self.store.clear()
+        for fid, self_count in top:
+            filename, line, name = data.functions.get(fid, ("?", 0, "?"))
+            self.store.append([f"{name}  ({Path(filename).name}:{line})",
+                               100.0 * self_count / samples,
+                               100.0 * data.total_counts.get(fid, 0) / samples,
+                               filename, line])
+        self.tree.set_model(self.store)
+        self.summary_label.set_text(f"{self.session.title}: {data.samples} samples")
+        return True
+
+    def _format_percent(self, column, cell, model, it, data_col):
+        cell.set_property("text", f"{model.get_value(it, data_col):.1f}")
+
+    def _on_row_activated(self, tree, treepath, column):
+        model = tree.get_model()
+        it = model.get_iter(treepath)
+        filepath = model.get_value(it, self.COL_FILE)
+        line = model.get_value(it, self.COL_LINE)
+        if Path(filepath).is_file() and self.app.editor_manager:
+            self.app.editor_manager.goto_line(filepath, line)
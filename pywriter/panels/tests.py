@@ -0,0 +1,321 @@
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import gi
+gi.require_version("Gtk", "3.0")
+from gi.repository import Gtk
+
+from ..tools.testing import FAILED, module_of
+from .coverage import CoverageData
+
+OUTCOME_ICONS = {
+    "passed": "emblem-ok-symbolic",
+    "failed": "dialog-error-symbolic",
+    "error": "dialog-error-symbolic",
+    "xpassed": "dialog-warning-symbolic",
+    "skipped": "action-unavailable-symbolic",
+    "xfailed": "action-unavailable-symbolic",
+    "running": "content-loading-symbolic",
+}
+# Module rows show their worst test outcome
+_SEVERITY = ["", "passed", "skipped", "xfailed", "running", "xpassed", "error", "failed"]
+
+
+class TestsPanel(Gtk.Box):
+    """Bottom panel listing pytest tests by module with streaming results."""
+
+    COL_ICON = 0
+    COL_NAME = 1
+    COL_DURATION = 2
+    COL_NODEID = 3
+    COL_OUTCOME = 4
+
+    def __init__(self, app):
+        super().__init__(orientation=Gtk.Orientation.VERTICAL)
+        self.app = app
+        self._rows = {}  # nodeid or module -> TreeIter
+        self._results = {}  # nodeid -> result dict of the latest run
+        self._reasons = {}  # test module -> why Run Affected Tests selected it
+        self._started = None
+        self._snapshotting = False  # hashing the workspace before a full run
+        self._coverage_dir = None  # collects the workers' data in a coverage run
+
+        header = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=2)
+        header.set_name("panel-header")
+        header.set_margin_start(4)
+        header.set_margin_end(4)
+        header.set_margin_top(2)
+
+        lbl = Gtk.Label(label="TESTS")
+        lbl.set_xalign(0)
+        header.pack_start(lbl, False, False, 0)
+
+        self.summary_label = Gtk.Label(label="")
+        self.summary_label.set_xalign(0)
+        header.pack_start(self.summary_label, True, True, 8)
+
+        for icon, tooltip, callback in (
+                ("view-refresh-symbolic", "Discover tests", lambda b: self.discover()),
+                ("media-playback-start-symbolic", "Run all tests", lambda b: self.run()),
+                ("system-run-symbolic", "Run tests affected by changes since the last green run",
+                 lambda b: self.run_affected()),
+                ("edit-redo-symbolic", "Re-run failed tests", lambda b: self.run_failed()),
+                ("media-playback-stop-symbolic", "Stop", lambda b: self.stop())):
+            btn = Gtk.Button.new_from_icon_name(icon, Gtk.IconSize.MENU)
+            btn.set_relief(Gtk.ReliefStyle.NONE)
+            btn.set_tooltip_text(tooltip)
+            btn.connect("clicked", callback)
+            header.pack_start(btn, False, False, 0)
+
+        self.pack_start(header, False, False, 0)
+
+        paned = Gtk.Paned(orientation=Gtk.Orientation.HORIZONTAL)
+
+        # icon, name, duration, nodeid, outcome
+        self.store = Gtk.TreeStore(str, str, str, str, str)
+        self.tree = Gtk.TreeView(model=self.store)
+
+        col = Gtk.TreeViewColumn("Test")
+        icon_cell = Gtk.CellRendererPixbuf()
+        col.pack_start(icon_cell, False)
+        col.add_attribute(icon_cell, "icon-name", self.COL_ICON)
+        name_cell = Gtk.CellRendererText()
+        col.pack_start(name_cell, True)
+        col.add_attribute(name_cell, "text", self.COL_NAME)
+        col.set_resizable(True)
+        col.set_expand(True)
+        self.tree.append_column(col)
+
+        col = Gtk.TreeViewColumn("Duration", Gtk.CellRendererText(), text=self.COL_DURATION)
+        col.set_min_width(80)
+        self.tree.append_column(col)
+
+        self.tree.connect("row-activated", self._on_row_activated)
+        self.tree.get_selection().connect("changed", self._on_selection_changed)
+
+        scrolled = Gtk.ScrolledWindow()
+        scrolled.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
+        scrolled.add(self.tree)
+        paned.pack1(scrolled, resize=True, shrink=False)
+
+        self.details = Gtk.TextView()
+        self.details.set_editable(False)
+        self.details.set_monospace(True)
+        self.details.set_wrap_mode(Gtk.WrapMode.NONE)
+        scrolled = Gtk.ScrolledWindow()
+        scrolled.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
+        scrolled.add(self.details)
+        paned.pack2(scrolled, resize=True, shrink=True)
+        paned.set_position(600)
+
+        self.pack_start(paned, True, True, 0)
+
+    @property
+    def _root(self):
+        return self.app.workspace.root if self.app.workspace else None
+
+    def clear(self):
+        self.store.clear()
+        self._rows = {}
+        self._results = {}
+        self._reasons = {}
+        self.details.get_buffer().set_text("")
+        self.summary_label.set_text("")
+
+    def discover(self):
+        runner = self.app.test_runner
+        if not self._root or not runner:
+            return
+        self.summary_label.set_text("Discovering tests...")
+        runner.discover(self._root, self._on_discovered)
+
+    def _on_discovered(self, nodeids, error):
+        self.clear()
+        for nodeid in nodeids:
+            self._row_for(nodeid)
+        self.tree.expand_all()
+        if error:
+            self.summary_label.set_text("Discovery failed (see details)")
+            self.details.get_buffer().set_text(error)
+        else:
+            self.summary_label.set_text(f"{len(nodeids)} tests")
+        return False
+
+    def run(self, nodeids=None, green_digests=None, details="", coverage=False):
+        """Run nodeids (test ids or module paths), or every test when None.
+
+        If every test passes, green_digests is recorded as the workspace
+        state of the last green run. A full run takes its own snapshot
+        first, so files edited while it runs are not recorded as tested.
+        With coverage, the lines the tests executed go to the Coverage tab.
+        """
+        runner = self.app.test_runner
+        if not self._root or not runner or runner.running or self._snapshotting:
+            return
+        if nodeids is None and green_digests is None:
+            self._snapshotting = True
+            self.summary_label.set_text("Hashing workspace...")
+            root = self._root
+            runner.select_affected(
+                root, lambda tests, digests: self._on_snapshot(root, digests, details, coverage))
+            return
+        nodeids = list(nodeids or [])
+        targets = set(nodeids)
+        for nodeid in list(self._rows):
+            if not nodeids or nodeid in targets or module_of(nodeid) in targets:
+                self._results.pop(nodeid, None)
+                if "::" in nodeid:
+                    self._set_outcome(self._rows[nodeid], "running", "")
+        for nodeid in nodeids:
+            self._row_for(nodeid)
+        self.details.get_buffer().set_text(details)
+        self._started = time.monotonic()
+        self.summary_label.set_text("Running...")
+        self._coverage_dir = tempfile.mkdtemp(prefix="pywriter-cov-") if coverage else None
+        runner.run(self._root, nodeids, self._on_result, self._on_done,
+                   coverage_dir=self._coverage_dir, green_digests=green_digests)
+
+    def _on_snapshot(self, root, digests, details, coverage):
+        self._snapshotting = False
+        if root == self._root:
+            self.run(green_digests=digests, details=details, coverage=coverage)
+        return False
+
+    def run_affected(self):
+        """Run only the test modules that import files changed since the last green run."""
+        runner = self.app.test_runner
+        if not self._root or not runner or runner.running or self._snapshotting:
+            return
+        self.summary_label.set_text("Finding affected tests...")
+        runner.select_affected(self._root, self._on_affected)
+
+    def _on_affected(self, tests, digests):
+        root = self._root
+        if not root:
+            return False
+        if tests is None:
+            self.run(green_digests=digests,
+                     details="No green run recorded yet: running all tests.\n")
+            return False
+        if not tests:
+            self.summary_label.set_text("No tests affected since the last green run")
+            return False
+
+        root = root.resolve()
+        self._reasons = {}
+        for test, chain in sorted(tests.items()):
+            module = str(test.relative_to(root))
+            steps = [str(p.relative_to(root)) if isinstance(p, Path) else p for p in chain]
+            if isinstance(chain[-1], Path):
+                steps[-1] += " (changed)"
+            else:
+                steps[-1] = f"deleted module {steps[-1]}"
+            self._reasons[module] = " → ".join(steps)
+        details = "Selected because of changes since the last green run:\n" + \
+            "\n".join(self._reasons.values()) + "\n"
+        self.run(sorted(self._reasons), green_digests=digests, details=details)
+        return False
+
+    def run_failed(self):
+        failed = [n for n, r in self._results.items() if r["outcome"] in FAILED]
+        if failed:
+            self.run(failed)
+
+    def stop(self):
+        if self.app.test_runner:
+            self.app.test_runner.stop()
+
+    def _row_for(self, nodeid):
+        it = self._rows.get(nodeid)
+        if it is not None:
+            return it
+        module = module_of(nodeid)
+        parent = self._rows.get(module)
+        if parent is None:
+            parent = self._rows[module] = self.store.append(
+                None, ["", module, "", module, ""])
+        if nodeid == module:
+            return parent
+        name = nodeid[len(module) + 2:]
+        it = self._rows[nodeid] = self.store.append(parent, ["", name, "", nodeid, ""])
+        self.tree.expand_row(self.store.get_path(parent), False)
+        return it
+
+    def _set_outcome(self, it, outcome, duration):
+        self.store.set(it, self.COL_ICON, OUTCOME_ICONS.get(outcome, ""),
+                       self.COL_OUTCOME, outcome, self.COL_DURATION, duration)
+        parent = self.store.iter_parent(it)
+        if parent is None:
+            return
+        worst = ""
+        child = self.store.iter_children(parent)
+        while child is not None:
+            child_outcome = self.store.get_value(child, self.COL_OUTCOME)
+            if _SEVERITY.index(child_outcome) > _SEVERITY.index(worst):
+                worst = child_outcome
+            child = self.store.iter_next(child)
+        self.store.set(parent, self.COL_ICON, OUTCOME_ICONS.get(worst, ""),
+                       self.COL_OUTCOME, worst)
+
+    def _on_result(self, result):
+        nodeid = result["nodeid"]
+        if result["event"] == "collect_error":
+            result = dict(result, outcome="error", duration=0.0, file=None, line=None)
+        self._results[nodeid] = result
+        self._set_outcome(self._row_for(nodeid), result["outcome"],
+                          f"{result['duration'] * 1000:.0f} ms")
+        self._update_summary()
+
+    def _on_done(self, error):
+        self._update_summary(finished=True)
+        # Tests that never reported (stopped or crashed run) lose their spinner
+        for nodeid, it in self._rows.items():
+            if nodeid not in self._results and \
+                    self.store.get_value(it, self.COL_OUTCOME) == "running":
+                self._set_outcome(it, "", "")
+        if error:
+            self.summary_label.set_text(self.summary_label.get_text() + " (errors, see details)")
+            self.details.get_buffer().set_text(error)
+        if self._coverage_dir:
+            data = CoverageData.load(sorted(Path(self._coverage_dir).glob("worker-*.json")))
+            shutil.rmtree(self._coverage_dir, ignore_errors=True)
+            self._coverage_dir = None
+            if data:
+                self.app.show_coverage(data, "Tests")
+
+    def _update_summary(self, finished=False):
+        counts = {}
+        for result in self._results.values():
+            counts[result["outcome"]] = counts.get(result["outcome"], 0) + 1
+        parts = [f"{n} {outcome}" for outcome, n in sorted(counts.items())]
+        text = ", ".join(parts) or "no results"
+        if finished and self._started is not None:
+            text += f" in {time.monotonic() - self._started:.1f}s"
+        self.summary_label.set_text(text)
+
+    def _on_selection_changed(self, selection):
+        model, it = selection.get_selected()
+        if it is None:
+            return
+        nodeid = model.get_value(it, self.COL_NODEID)
+        result = self._results.get(nodeid)
+        if result and result["message"]:
+            text = result["message"]
+        else:
+            text = self._reasons.get(module_of(nodeid), "")
+        self.details.get_buffer().set_text(text)
+
+    def _on_row_activated(self, tree, treepath, column):
+        it = self.store.get_iter(treepath)
+        nodeid = self.store.get_value(it, self.COL_NODEID)
+        result = self._results.get(nodeid)
+        if result and result.get("file"):
+            filepath, line = result["file"], result["line"]
+        elif self._root:
+            filepath, line = str(self._root / module_of(nodeid)), 1
+        else:
+            return
+        if Path(filepath).is_file() and self.app.editor_manager:
+            self.app.editor_manager.goto_line(filepath, line)
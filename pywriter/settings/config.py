@@ -4,6 +4,7 @@ from pathlib import Path
 DEFAULT_SETTINGS = {
     "tab_width": 4,
     "lint_on_save": True,
+    "precompile_on_save": True,
     "format_on_save": False,
     "font_size": 12,
     "font_family": "Monospace",
@@ -13,6 +14,20 @@ DEFAULT_SETTINGS = {
     "theme": "classic",
     "lint_debounce_ms": 500,
     "large_file_threshold": 10000,
+    "format_daemon": True,
+    "format_daemon_python": None,
+    "outline_quick_pass_lines": 5000,
+    "output_max_lines": 10000,
+    "run_logs": True,
+    "run_logs_keep": 50,
+    "max_concurrent_runs": 2,
+    "interpreter_overrides": {},
+    "sampler_interval_ms": 10,
+    "test_workers": 2,
+    "watch_debounce_ms": 300,
+    "import_budget_ms": 50,
+    "fork_server": False,
+    "fork_server_preload": [],
 }
 
 CONFIG_DIR = Path.home() / ".config" / "pywriter"
@@ -0,0 +1,167 @@
+"""Line coverage bootstrap.
+
+Runs as a standalone script in the child interpreter (it must not import gi
+or anything from the pywriter package):
+
+    python coverage_bootstrap.py DATA_FILE script.py [args...]
+    python coverage_bootstrap.py DATA_FILE -m module [args...]
+
+When the program ends (also through SystemExit or an exception) the lines
+it executed are written to DATA_FILE as one JSON object:
+
+    {"collector": "coverage.py 7.4.0", "files": {filename: [line, ...]}}
+
+coverage.py is used when the interpreter has it, so .coveragerc and
+friends apply. Otherwise a built-in collector records the lines itself:
+with sys.monitoring on 3.12+, where each line reports once and then
+disables itself, or with sys.settrace before that. The standard library,
+site-packages and this wrapper are never recorded.
+"""
+
+import json
+import os
+import runpy
+import sys
+import sysconfig
+import threading
+
+_LIBRARY_DIRS = tuple(os.path.join(p, "") for p in {
+    sysconfig.get_paths()[name] for name in ("stdlib", "platstdlib", "purelib", "platlib")})
+_HIDDEN_FILES = {__file__, runpy.__file__, "<frozen runpy>"}
+
+
+def is_user_code(filename):
+    return not (filename in _HIDDEN_FILES or filename.startswith("<")
+                or filename.startswith(_LIBRARY_DIRS))
+
+
+class CoveragePyCollector:
+    def __init__(self, coverage):
+        self.name = f"coverage.py {coverage.__version__}"
+        self._cov = coverage.Coverage(data_file=None)
+
+    def start(self):
+        self._cov.start()
+
+    def stop(self):
+        self._cov.stop()
+        data = self._cov.get_data()
+        return {f: data.lines(f) or [] for f in data.measured_files()}
+
+
+class MonitoringCollector:
+    name = "sys.monitoring"
+
+    def __init__(self):
+        self.lines = {}
+
+    def start(self):
+        monitoring = sys.monitoring
+        self.TOOL = monitoring.COVERAGE_ID
+        monitoring.use_tool_id(self.TOOL, "pywriter coverage")
+        monitoring.register_callback(self.TOOL, monitoring.events.PY_START, self._on_start)
+        monitoring.register_callback(self.TOOL, monitoring.events.LINE, self._on_line)
+        monitoring.set_events(self.TOOL, monitoring.events.PY_START)
+
+    def _on_start(self, code, offset):
+        if is_user_code(code.co_filename):
+            sys.monitoring.set_local_events(self.TOOL, code, sys.monitoring.events.LINE)
+        return sys.monitoring.DISABLE
+
+    def _on_line(self, code, line):
+        lines = self.lines.get(code.co_filename)
+        if lines is None:
+            lines = self.lines[code.co_filename] = set()
+        lines.add(line)
+        return sys.monitoring.DISABLE  # once is enough
+
+    def stop(self):
+        sys.monitoring.set_events(self.TOOL, 0)
+        sys.monitoring.free_tool_id(self.TOOL)
+        return self.lines
+
+
+class TraceCollector:
+    name = "sys.settrace"
+
+    def __init__(self):
+        self.lines = {}
+        self._user = {}  # code object -> lines set, or None for other code
+
+    def start(self):
+        threading.settrace(self._on_call)
+        sys.settrace(self._on_call)
+
+    def _on_call(self, frame, event, arg):
+        code = frame.f_code
+        try:
+            lines = self._user[code]
+        except KeyError:
+            lines = None
+            if is_user_code(code.co_filename):
+                lines = self.lines.setdefault(code.co_filename, set())
+            self._user[code] = lines
+        if lines is None:
+            return None
+
+        def on_line(frame, event, arg):
+            if event == "line":
+                lines.add(frame.f_lineno)
+            return on_line
+        return on_line
+
+    def stop(self):
+        sys.settrace(None)
+        threading.settrace(None)
+        return self.lines
+
+
+def _collector():
+    try:
+        import coverage
+        return CoveragePyCollector(coverage)
+    except (ImportError, AttributeError):
+        pass
+    if hasattr(sys, "monitoring"):
+        return MonitoringCollector()
+    return TraceCollector()
+
+
+def _write(data_file, collector, files):
+    files = {os.path.abspath(f): sorted(lines) for f, lines in files.items()
+             if is_user_code(f) and lines}
+    tmp = data_file + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"collector": collector.name, "files": files}, f)
+    os.replace(tmp, data_file)
+
+
+def main():
+    if len(sys.argv) < 3 or (sys.argv[2] == "-m" and len(sys.argv) < 4):
+        sys.stderr.write("usage: coverage_bootstrap.py DATA_FILE script.py|-m module "
+                         "[args...]\n")
+        return 2
+    data_file = sys.argv[1]
+    module = sys.argv[3] if sys.argv[2] == "-m" else None
+    if module:
+        sys.argv = sys.argv[3:]
+        sys.path[0] = os.getcwd()
+    else:
+        script = sys.argv[2]
+        sys.argv = sys.argv[2:]
+        sys.path[0] = os.path.dirname(os.path.abspath(script))
+
+    collector = _collector()
+    collector.start()
+    try:
+        if module:
+            runpy.run_module(module, run_name="__main__", alter_sys=True)
+        else:
+            runpy.run_path(script, run_name="__main__")
+    finally:
+        _write(data_file, collector, collector.stop())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
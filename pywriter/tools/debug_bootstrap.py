@@ -0,0 +1,338 @@
+"""Debugger bootstrap.
+
+Runs as a standalone script in the child interpreter (it must not import gi
+or anything from the pywriter package):
+
+    python debug_bootstrap.py CMD_FD EVENT_FD script.py [args...]
+
+Commands arrive on CMD_FD and events are written to EVENT_FD, one JSON
+object per line. The first command must be the breakpoint list; the
+script starts once it has arrived:
+
+    -> {"cmd": "breakpoints", "breakpoints": {filename: [line, ...]}}
+    -> {"cmd": "continue" | "step" | "next" | "return"}
+    -> {"cmd": "frame", "index": n}
+    <- {"event": "stopped", "reason": "breakpoint" | "step" | "exception",
+        "message": "...", "stack": [[filename, line, function], ...],
+        "frame": n, "variables": {"locals": [[name, type, repr], ...],
+                                  "globals": [...]}}
+    <- {"event": "variables", "frame": n, "variables": {...}}
+
+Stacks list the innermost frame first. Breakpoints may be replaced at any
+time, also while the program runs (see TraceDebugger for the limits on
+older Pythons). Stepping never stops in the debugger's own code, runpy,
+the standard library or site-packages; breakpoints there still work.
+
+On Python 3.12+ sys.monitoring is used: line events are only switched on
+for code objects from files with breakpoints (and everywhere while
+stepping), so other code runs at full speed. Older versions use bdb,
+which skips the frames of files without breakpoints.
+"""
+
+import bdb
+import functools
+import json
+import os
+import queue
+import reprlib
+import runpy
+import sys
+import sysconfig
+import threading
+import traceback
+
+_repr = reprlib.Repr()
+_repr.maxstring = 200
+_repr.maxother = 200
+_LIBRARY_DIRS = tuple(os.path.join(p, "") for p in {
+    sysconfig.get_paths()[name] for name in ("stdlib", "platstdlib", "purelib", "platlib")})
+_HIDDEN_FILES = {__file__, runpy.__file__, "<frozen runpy>", bdb.__file__}
+
+
+@functools.lru_cache(maxsize=None)
+def canonic(filename):
+    # Symlinks resolved, to match the IDE's Path.resolve() breakpoint paths
+    if filename.startswith("<") and filename.endswith(">"):
+        return filename
+    return os.path.normcase(os.path.realpath(filename))
+
+
+def is_user_code(filename):
+    return not (filename in _HIDDEN_FILES or filename.startswith("<")
+                or filename.startswith(_LIBRARY_DIRS))
+
+
+def _variables(namespace, skip_private):
+    result = []
+    for name, value in sorted(namespace.items()):
+        if skip_private and name.startswith("__"):
+            continue
+        if skip_private and type(value).__name__ == "module":
+            continue
+        try:
+            text = _repr.repr(value)
+        except Exception as e:  # a broken __repr__ must not kill the debugger
+            text = f"<repr failed: {type(e).__name__}>"
+        result.append([name, type(value).__name__, text])
+    return result
+
+
+class DebugSession:
+    """Pipe protocol, breakpoint table and the stopped-state interaction."""
+
+    def __init__(self, cmd_fd, event_fd):
+        self._commands = os.fdopen(cmd_fd, "rb")
+        self._event_fd = event_fd
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()  # one thread is stopped at a time
+        self.breakpoints = {}  # canonic filename -> set of lines
+        self.on_breakpoints_changed = None
+        self._read_breakpoints()
+        threading.Thread(target=self._read_commands, name="pywriter-debugger",
+                         daemon=True).start()
+
+    def _read_breakpoints(self):
+        line = self._commands.readline()
+        message = json.loads(line) if line else {}
+        self._set_breakpoints(message.get("breakpoints", {}))
+
+    def _set_breakpoints(self, breakpoints):
+        self.breakpoints = {canonic(f): set(lines) for f, lines in breakpoints.items() if lines}
+        if self.on_breakpoints_changed:
+            self.on_breakpoints_changed()
+
+    def _read_commands(self):
+        for line in self._commands:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            if message.get("cmd") == "breakpoints":
+                self._set_breakpoints(message.get("breakpoints", {}))
+            else:
+                self._queue.put(message)
+        self._queue.put({"cmd": "continue"})  # the IDE went away: run freely
+
+    def send(self, message):
+        data = (json.dumps(message) + "\n").encode()
+        try:
+            while data:
+                data = data[os.write(self._event_fd, data):]
+        except OSError:
+            pass
+
+    def is_breakpoint(self, filename, line):
+        return line in self.breakpoints.get(canonic(filename), ())
+
+    def interaction(self, frame, reason, message=""):
+        """Report a stop at frame and return the resume command."""
+        with self._lock:
+            stack = []
+            while frame is not None:
+                if frame.f_code.co_filename not in _HIDDEN_FILES:
+                    stack.append(frame)
+                frame = frame.f_back
+            self.send({"event": "stopped", "reason": reason, "message": message,
+                       "stack": [[f.f_code.co_filename, f.f_lineno, f.f_code.co_name]
+                                 for f in stack],
+                       "frame": 0, "variables": self._frame_variables(stack[0])})
+            while True:
+                command = self._queue.get()
+                if command.get("cmd") == "frame":
+                    index = command.get("index", 0)
+                    if 0 <= index < len(stack):
+                        self.send({"event": "variables", "frame": index,
+                                   "variables": self._frame_variables(stack[index])})
+                else:
+                    return command.get("cmd", "continue")
+
+    def _frame_variables(self, frame):
+        if frame.f_locals is frame.f_globals:  # module level
+            return {"globals": _variables(frame.f_globals, skip_private=True)}
+        return {"locals": _variables(frame.f_locals, skip_private=False),
+                "globals": _variables(frame.f_globals, skip_private=True)}
+
+
+class TraceDebugger(bdb.Bdb):
+    """sys.settrace backend for Python < 3.12.
+
+    bdb only traces the lines of frames whose file has breakpoints (or
+    while stepping); with no breakpoints at all, tracing is switched off.
+    Breakpoints added while the program runs therefore only apply to frames
+    entered later, and not at all once tracing is off.
+    """
+
+    def __init__(self, session):
+        super().__init__()
+        self.session = session
+        self._started = False
+        session.on_breakpoints_changed = self._sync_breakpoints
+        self._sync_breakpoints()
+
+    def _sync_breakpoints(self):
+        self.clear_all_breaks()
+        for filename, lines in self.session.breakpoints.items():
+            for line in lines:
+                self.set_break(filename, line)
+
+    def canonic(self, filename):
+        return canonic(filename)  # bdb's own only makes paths absolute
+
+    def stop_here(self, frame):
+        return is_user_code(frame.f_code.co_filename) and super().stop_here(frame)
+
+    def user_line(self, frame):
+        if not self._started:
+            # bdb stops at the first line; run on to the first breakpoint
+            self._started = True
+            if not self.session.is_breakpoint(frame.f_code.co_filename, frame.f_lineno):
+                self.set_continue()
+                return
+        reason = ("breakpoint" if self.session.is_breakpoint(frame.f_code.co_filename,
+                                                              frame.f_lineno) else "step")
+        command = self.session.interaction(frame, reason)
+        if command == "step":
+            self.set_step()
+        elif command == "next":
+            self.set_next(frame)
+        elif command == "return":
+            self.set_return(frame)
+        else:
+            self.set_continue()
+
+    def run_script(self, script):
+        self.runcall(runpy.run_path, script, run_name="__main__")
+
+    def detach(self):
+        sys.settrace(None)
+
+
+class MonitoringDebugger:
+    """sys.monitoring backend for Python 3.12+.
+
+    PY_START turns on LINE events for code objects from files with
+    breakpoints (and then disables itself for that code); lines that are
+    not breakpoints disable themselves too. Stepping switches LINE events
+    on globally until the next continue.
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self.mode = "continue"
+        self._target = None  # frame of the last stop, for next and return
+        monitoring = sys.monitoring
+        self.TOOL = monitoring.DEBUGGER_ID
+        self.E = monitoring.events
+        monitoring.use_tool_id(self.TOOL, "pywriter debugger")
+        monitoring.register_callback(self.TOOL, self.E.PY_START, self._on_start)
+        monitoring.register_callback(self.TOOL, self.E.LINE, self._on_line)
+        session.on_breakpoints_changed = self._sync_breakpoints
+        self._resume("continue", None)
+
+    def _watch_code(self, code):
+        if canonic(code.co_filename) in self.session.breakpoints:
+            sys.monitoring.set_local_events(self.TOOL, code, self.E.LINE)
+
+    def _sync_breakpoints(self):
+        # Code that is already running gets no new PY_START event
+        for frame in sys._current_frames().values():
+            while frame is not None:
+                self._watch_code(frame.f_code)
+                frame = frame.f_back
+        sys.monitoring.restart_events()
+
+    def _on_start(self, code, offset):
+        self._watch_code(code)
+        return sys.monitoring.DISABLE
+
+    def _on_line(self, code, line):
+        filename = code.co_filename
+        if self.session.is_breakpoint(filename, line):
+            self._stop(sys._getframe(1), "breakpoint")
+            return None
+        if self.mode == "continue" or not is_user_code(filename):
+            # Stepping restarts disabled events
+            return sys.monitoring.DISABLE if self.mode == "continue" else None
+        frame = sys._getframe(1)
+        if self.mode == "step":
+            stop = True
+        elif frame is self._target:
+            stop = self.mode == "next"
+        else:
+            # Deeper calls run on; stop once the target frame has returned
+            stop = not self._is_active(self._target, frame)
+        if stop:
+            self._stop(frame, "step")
+        return None
+
+    @staticmethod
+    def _is_active(target, frame):
+        """Whether target is frame or one of its callers."""
+        while frame is not None:
+            if frame is target:
+                return True
+            frame = frame.f_back
+        return False
+
+    def _stop(self, frame, reason):
+        self._resume(self.session.interaction(frame, reason), frame)
+
+    def _resume(self, mode, frame):
+        self.mode = mode if mode in ("step", "next", "return") else "continue"
+        self._target = frame
+        events = self.E.PY_START
+        if self.mode != "continue":
+            events |= self.E.LINE
+        sys.monitoring.set_events(self.TOOL, events)
+        sys.monitoring.restart_events()
+
+    def run_script(self, script):
+        runpy.run_path(script, run_name="__main__")
+
+    def detach(self):
+        if sys.monitoring.get_tool(self.TOOL) is not None:
+            sys.monitoring.set_events(self.TOOL, 0)
+            sys.monitoring.free_tool_id(self.TOOL)
+
+
+def main():
+    if len(sys.argv) < 4:
+        sys.stderr.write("usage: debug_bootstrap.py CMD_FD EVENT_FD script.py [args...]\n")
+        return 2
+    session = DebugSession(int(sys.argv[1]), int(sys.argv[2]))
+    script = sys.argv[3]
+    sys.argv = sys.argv[3:]
+    sys.path[0] = os.path.dirname(os.path.abspath(script))
+
+    if hasattr(sys, "monitoring"):
+        debugger = MonitoringDebugger(session)
+    else:
+        debugger = TraceDebugger(session)
+    try:
+        debugger.run_script(script)
+    except SystemExit:
+        raise
+    except BaseException as e:
+        debugger.detach()
+        first, frame = None, None
+        tb = e.__traceback__
+        while tb is not None:
+            if tb.tb_frame.f_code.co_filename not in _HIDDEN_FILES and first is None:
+                first = tb
+            if is_user_code(tb.tb_frame.f_code.co_filename):
+                frame = tb.tb_frame
+            tb = tb.tb_next
+        if frame is not None:
+            # Post-mortem stop so the variables at the failure can be inspected
+            message = "".join(traceback.format_exception_only(type(e), e)).strip()
+            session.interaction(frame, "exception", message)
+        first = first or e.__traceback__
+        sys.excepthook(type(e), e.with_traceback(first), first)
+        return 1
+    finally:
+        debugger.detach()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,277 @@
+import array
+import collections
+import json
+import os
+import signal
+import socket
+import subprocess
+import threading
+from pathlib import Path
+
+HELPER_SCRIPT = Path(__file__).with_name("forkserver_helper.py")
+MAX_MESSAGE = 1 << 20
+
+# The subset of resource.struct_rusage that RunSession.record() reads
+ForkedUsage = collections.namedtuple("ForkedUsage", "ru_utime ru_stime ru_maxrss")
+
+
+class ForkedProcess:
+    """Stand-in for subprocess.Popen for a program forked by the fork server.
+
+    The program is not our child, so its exit status and resource usage
+    arrive from the helper instead of os.wait4.
+    """
+
+    def __init__(self, pid, helper):
+        self.pid = pid
+        self.helper = helper
+        self.returncode = None
+        self.rusage = None
+        self._exited = threading.Event()
+
+    def wait(self):
+        self._exited.wait()
+        return self.returncode
+
+    def kill(self):
+        try:
+            os.kill(self.pid, signal.SIGKILL)
+        except OSError:
+            pass
+
+    def _set_exit(self, returncode, rusage):
+        self.returncode = returncode
+        self.rusage = ForkedUsage(*rusage) if rusage else None
+        self._exited.set()
+
+
+class _Helper:
+    """One helper process and the socket connected to it."""
+
+    def __init__(self, key, python, preload):
+        self.key = key
+        self.preloaded = []
+        self.failed = {}
+        self.retired = False
+        self._processes = {}  # pid -> ForkedProcess
+        self._replies = {}  # request id -> [threading.Event, message]
+        self._next_id = 0
+        self._send_lock = threading.Lock()
+        self._reply_lock = threading.Lock()  # a reply is either taken or too late
+        self._alive = True
+        self._sock, child_sock = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        try:
+            self._process = subprocess.Popen(
+                [python, "-u", str(HELPER_SCRIPT), str(child_sock.fileno()), *preload],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                pass_fds=[child_sock.fileno()],
+                start_new_session=True,
+            )
+        except OSError:
+            self._sock.close()
+            raise
+        finally:
+            child_sock.close()
+
+    @property
+    def alive(self):
+        return self._alive
+
+    def wait_ready(self, timeout):
+        self._sock.settimeout(timeout)
+        try:
+            message = json.loads(self._sock.recv(MAX_MESSAGE).decode() or "null")
+        except (OSError, ValueError):
+            message = None
+        if not message or message.get("event") != "ready":
+            self.close()
+            return False
+        self._sock.settimeout(None)
+        self.preloaded = message["preloaded"]
+        self.failed = message["failed"]
+        threading.Thread(target=self._read_messages, daemon=True).start()
+        return True
+
+    def spawn(self, argv, cwd, env, out_fd, timeout):
+        """Fork a program writing to out_fd; return its ForkedProcess or None."""
+        with self._send_lock:
+            if not self._alive:
+                return None
+            self._next_id += 1
+            request_id = self._next_id
+            reply = self._replies[request_id] = [threading.Event(), None]
+            request = json.dumps({"id": request_id, "argv": argv, "cwd": cwd, "env": env})
+            try:
+                self._sock.sendmsg([request.encode()], [(
+                    socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array("i", [out_fd]))])
+            except OSError:
+                self._replies.pop(request_id, None)
+                return None
+        reply[0].wait(timeout)
+        with self._reply_lock:
+            self._replies.pop(request_id, None)
+            message = reply[1]
+        if message is None:
+            # It may still fork the program later; kill it so the caller's
+            # fallback run is the only one
+            self.kill()
+            return None
+        return message.get("process")
+
+    def retire(self):
+        """Stop serving new runs; close once the forked programs have exited."""
+        self.retired = True
+        if not self._processes:
+            self.close()
+
+    def kill(self):
+        """SIGKILL a helper that stopped answering; its runs count as lost."""
+        self.retired = True
+        self.close()
+        try:
+            self._process.kill()
+        except OSError:
+            pass
+
+    def close(self):
+        self._alive = False
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def _read_messages(self):
+        while True:
+            try:
+                data = self._sock.recv(MAX_MESSAGE)
+            except OSError:
+                data = b""
+            if not data:
+                break
+            try:
+                message = json.loads(data.decode())
+            except ValueError:
+                continue  # one bad packet must not stop the reader (and its waiters)
+            event = message.get("event")
+            if event == "spawned":
+                # Registered here, before its "exited" message can be read
+                process = ForkedProcess(message["pid"], self)
+                self._processes[process.pid] = message["process"] = process
+            elif event == "exited":
+                process = self._processes.pop(message["pid"], None)
+                if process:
+                    process._set_exit(message["returncode"], message["rusage"])
+                if self.retired and not self._processes:
+                    self.close()
+            with self._reply_lock:
+                reply = self._replies.get(message.get("id"))
+                if reply:
+                    reply[1] = message
+                    reply[0].set()
+                elif event == "spawned":
+                    message["process"].kill()  # too late: the request fell back
+
+        self._alive = False
+        self._sock.close()
+        for reply in list(self._replies.values()):
+            reply[0].set()
+        for process in self._processes.values():
+            # Nobody is left to report the status; treat it as lost
+            process._set_exit(-signal.SIGKILL, None)
+        self._processes = {}
+        try:
+            self._process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+            self._process.wait()
+
+
+class ForkServer:
+    """Resident helper that pre-imports modules and forks runs from itself.
+
+    Starting python3 and importing pygame or numpy takes seconds on a Pi
+    Zero; with the fork_server setting on, the modules listed in
+    fork_server_preload are imported once in the workspace interpreter and
+    each run is forked from that warm process.
+
+    spawn() blocks and is meant for the runner's threads. It returns None
+    whenever the helper cannot serve the run, so the caller can fall back
+    to a normal subprocess; a helper that does not answer within
+    REQUEST_TIMEOUT is killed first, so the run never starts twice. The
+    helper is replaced when the interpreter, its venv's installed packages
+    or the preload list change; a replaced helper lives on until the
+    programs it forked have exited.
+    """
+
+    START_TIMEOUT = 120.0
+    REQUEST_TIMEOUT = 10.0
+
+    def __init__(self, app):
+        self.app = app
+        self._helper = None
+        self._failed_key = None
+        self._lock = threading.Lock()
+        self.last_error = None
+
+    @property
+    def enabled(self):
+        return bool(self.app.config.get("fork_server", False))
+
+    def warm_up(self, info):
+        """Start (or replace) the helper for info in the background."""
+        if self.enabled:
+            threading.Thread(target=self._ensure, args=(info,), daemon=True).start()
+
+    def spawn(self, info, argv, cwd, env, out_fd):
+        helper = self._ensure(info)
+        if helper is None:
+            return None
+        process = helper.spawn(argv, cwd, env, out_fd, self.REQUEST_TIMEOUT)
+        if process is None:
+            self.last_error = "the fork server did not answer"
+        return process
+
+    def stop(self):
+        with self._lock:
+            if self._helper:
+                self._helper.retire()
+                self._helper = None
+
+    def _key(self, info):
+        preload = tuple(self.app.config.get("fork_server_preload") or ())
+        stamps = []
+        if info.venv:
+            # Installing or removing a package touches site-packages
+            for site in sorted(info.venv.glob("lib/python*/site-packages")):
+                try:
+                    stamps.append(site.stat().st_mtime_ns)
+                except OSError:
+                    pass
+        return info.path, preload, tuple(stamps)
+
+    def _ensure(self, info):
+        key = self._key(info)
+        with self._lock:
+            helper = self._helper
+            if helper and helper.key == key and helper.alive:
+                return helper
+            if helper:
+                helper.retire()
+                self._helper = None
+            if key == self._failed_key:
+                return None
+            try:
+                helper = _Helper(key, info.path, key[1])
+            except OSError as e:
+                self.last_error = str(e)
+                self._failed_key = key
+                return None
+            if not helper.wait_ready(self.START_TIMEOUT):
+                self.last_error = "the fork server failed to start"
+                self._failed_key = key
+                return None
+            self._failed_key = None
+            self._helper = helper
+            return helper
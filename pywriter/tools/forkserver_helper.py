@@ -0,0 +1,170 @@
+"""Fork server helper.
+
+Runs as a standalone script in the workspace interpreter (it must not
+import gi or anything from the pywriter package):
+
+    python -u forkserver_helper.py FD module [module ...]
+
+The listed modules are imported once, then run requests are served over
+the AF_UNIX SOCK_SEQPACKET socket FD, one JSON message each. A request
+carries the descriptor for the program's stdout/stderr as SCM_RIGHTS
+ancillary data:
+
+    -> {"id": n, "argv": [script, args...], "cwd": "...", "env": {...}}
+    <- {"event": "spawned", "id": n, "pid": pid}
+    <- {"event": "exited", "pid": pid, "returncode": rc,
+        "rusage": [user, sys, max_rss]}
+
+The first message is {"event": "ready", "preloaded": [...], "failed":
+{module: error}}. Each run is forked from this process, so preloaded
+modules are already in memory; it runs in its own session with the
+script as __main__. Start the helper with -u so the forked programs'
+output is unbuffered, like a normal run. Children are reaped on SIGCHLD
+through a wakeup pipe.
+"""
+
+import array
+import importlib
+import json
+import os
+import runpy
+import select
+import signal
+import socket
+import sys
+
+MAX_MESSAGE = 1 << 20
+
+
+def _send(sock, message):
+    sock.send(json.dumps(message).encode())
+
+
+def _receive(sock):
+    """Return (request, fds), or (None, []) once the IDE has gone."""
+    fds = array.array("i")
+    try:
+        data, ancdata, _, _ = sock.recvmsg(
+            MAX_MESSAGE, socket.CMSG_SPACE(4 * fds.itemsize))
+    except InterruptedError:
+        return {}, []
+    for level, kind, payload in ancdata:
+        if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+            fds.frombytes(payload[:len(payload) - len(payload) % fds.itemsize])
+    if not data:
+        return None, list(fds)
+    return json.loads(data.decode()), list(fds)
+
+
+def _run_child(request, out_fd):
+    """Set up the forked child and run the script; return its exit code.
+
+    The code is returned (not passed to os._exit) so the interpreter shuts
+    down normally: atexit handlers run and non-daemon threads are joined.
+    """
+    os.setsid()
+    signal.set_wakeup_fd(-1)
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.dup2(out_fd, 1)
+    os.dup2(out_fd, 2)
+    os.close(devnull)
+    os.close(out_fd)
+
+    os.chdir(request["cwd"])
+    os.environ.clear()
+    os.environ.update(request["env"])
+    script = os.path.abspath(request["argv"][0])
+    sys.argv = list(request["argv"])
+    sys.path[0] = os.path.dirname(script)
+    try:
+        runpy.run_path(script, run_name="__main__")
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            return e.code or 0
+        print(e.code, file=sys.stderr)
+        return 1
+    except BaseException as e:
+        # Hide the helper's and runpy's frames, as if run by python itself
+        tb = e.__traceback__
+        while tb and tb.tb_frame.f_code.co_filename != script:
+            tb = tb.tb_next
+        tb = tb or e.__traceback__
+        sys.excepthook(type(e), e.with_traceback(tb), tb)
+        return 1
+    return 0
+
+
+def _reap(sock, children):
+    while children:
+        try:
+            pid, status, rusage = os.wait4(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+        children.discard(pid)
+        if os.WIFSIGNALED(status):
+            returncode = -os.WTERMSIG(status)
+        else:
+            returncode = os.WEXITSTATUS(status)
+        _send(sock, {"event": "exited", "pid": pid, "returncode": returncode,
+                     "rusage": [rusage.ru_utime, rusage.ru_stime, rusage.ru_maxrss]})
+
+
+def main():
+    sock = socket.socket(fileno=int(sys.argv[1]))
+    preloaded, failed = [], {}
+    for name in sys.argv[2:]:
+        try:
+            importlib.import_module(name)
+            preloaded.append(name)
+        except BaseException as e:
+            failed[name] = f"{type(e).__name__}: {e}"
+    sys.stdout.flush()
+    sys.stderr.flush()
+
+    wake_r, wake_w = os.pipe()
+    os.set_blocking(wake_w, False)
+    signal.set_wakeup_fd(wake_w)
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _send(sock, {"event": "ready", "preloaded": preloaded, "failed": failed})
+
+    children = set()
+    while True:
+        try:
+            readable, _, _ = select.select([sock, wake_r], [], [])
+        except InterruptedError:
+            continue
+        if wake_r in readable:
+            os.read(wake_r, 512)
+            _reap(sock, children)
+        if sock not in readable:
+            continue
+        request, fds = _receive(sock)
+        if request is None:
+            return 0  # the IDE went away; running programs carry on
+        if not request:
+            continue
+        if len(fds) != 1:
+            for fd in fds:
+                os.close(fd)
+            _send(sock, {"event": "error", "id": request.get("id"),
+                         "error": "expected one output descriptor"})
+            continue
+        pid = os.fork()
+        if pid == 0:
+            sock.close()
+            os.close(wake_r)
+            os.close(wake_w)
+            return _run_child(request, fds[0])
+        os.close(fds[0])
+        children.add(pid)
+        _send(sock, {"event": "spawned", "id": request["id"], "pid": pid})
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+import json
+import shutil
+import subprocess
+import threading
+from pathlib import Path
+
+import gi
+gi.require_version("Gio", "2.0")
+from gi.repository import Gio, GLib
+
+VENV_DIRS = ("venv", ".venv", "env")
+
+_PROBE = "import json, sys; print(json.dumps([sys.version.split()[0], sys.path]))"
+
+
+class InterpreterInfo:
+    def __init__(self, path, source, venv=None):
+        self.path = path
+        self.source = source  # "override", "venv" or "system"
+        self.venv = venv
+        self.version = None
+        self.sys_path = []
+
+    @property
+    def label(self):
+        name = f"{self.venv.name}" if self.venv else Path(self.path).name
+        return f"Python {self.version} ({name})" if self.version else name
+
+
+class InterpreterResolver:
+    """Resolves the Python interpreter for scripts once per workspace.
+
+    The result (plus the interpreter's version and sys.path, probed once in
+    the background) is cached until a venv directory in the workspace is
+    created, removed or changed, or the override settings change. Folders
+    listed in the interpreter_overrides setting use their own interpreter.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._root = None
+        self._cache = {}  # folder key -> InterpreterInfo
+        self._monitors = []
+        self.on_changed = []  # callables(), run on the main thread
+
+    def set_workspace(self, root):
+        self._root = Path(root) if root else None
+        self.invalidate()
+
+    def invalidate(self):
+        self._cache.clear()
+        for monitor in self._monitors:
+            monitor.cancel()
+        self._monitors = []
+        if self._root:
+            self._watch(self._root)
+        for callback in self.on_changed:
+            callback()
+
+    def resolve(self, filepath=None):
+        """Return the InterpreterInfo for filepath (or the workspace)."""
+        filepath = Path(filepath).resolve() if filepath else None
+        override = self._find_override(filepath)
+        if override:
+            key, python = override
+            info = self._cache.get(key)
+            if info is None or info.path != python:
+                info = self._remember(key, InterpreterInfo(python, "override"))
+            return info
+
+        if self._root and (filepath is None or self._root.resolve() in filepath.parents):
+            base = self._root.resolve()
+        elif filepath:
+            base = filepath.parent
+        else:
+            base = Path.cwd()
+        info = self._cache.get(base)
+        if info is None:
+            info = self._remember(base, self._discover(base))
+            if base != (self._root.resolve() if self._root else None):
+                self._watch(base)
+        return info
+
+    def _find_override(self, filepath):
+        overrides = self.app.config.get("interpreter_overrides") or {}
+        if not filepath or not overrides:
+            return None
+        best = None
+        for folder, python in overrides.items():
+            folder = Path(folder).expanduser().resolve()
+            if folder == filepath or folder in filepath.parents:
+                if best is None or len(folder.parts) > len(best[0].parts):
+                    best = (folder, python)
+        return best
+
+    def _discover(self, base):
+        for parent in (base, *base.parents):
+            for venv_dir in VENV_DIRS:
+                venv_python = parent / venv_dir / "bin" / "python"
+                if venv_python.exists():
+                    return InterpreterInfo(str(venv_python), "venv", parent / venv_dir)
+        return InterpreterInfo(shutil.which("python3") or "python3", "system")
+
+    def _remember(self, key, info):
+        self._cache[key] = info
+        threading.Thread(target=self._probe, args=(info,), daemon=True).start()
+        return info
+
+    def _probe(self, info):
+        try:
+            result = subprocess.run([info.path, "-c", _PROBE],
+                                    capture_output=True, text=True, timeout=30)
+            info.version, info.sys_path = json.loads(result.stdout)
+        except (OSError, subprocess.TimeoutExpired, ValueError):
+            return
+        GLib.idle_add(self._notify)
+
+    def _notify(self):
+        for callback in self.on_changed:
+            callback()
+        return False
+
+    def _watch(self, folder):
+        """Watch folder for venvs appearing/disappearing and existing venvs changing."""
+        paths = [folder] + [folder / d / "bin" for d in VENV_DIRS if (folder / d / "bin").is_dir()]
+        for path in paths:
+            try:
+                monitor = Gio.File.new_for_path(str(path)).monitor_directory(
+                    Gio.FileMonitorFlags.NONE, None)
+            except GLib.Error:
+                continue
+            monitor.connect("changed", self._on_fs_changed, path == folder)
+            self._monitors.append(monitor)
+
+    def _on_fs_changed(self, monitor, file, other_file, event_type, is_root):
+        if is_root and file.get_basename() not in VENV_DIRS:
+            return
+        if event_type in (Gio.FileMonitorEvent.CREATED,
+                          Gio.FileMonitorEvent.DELETED,
+                          Gio.FileMonitorEvent.MOVED_IN,
+                          Gio.FileMonitorEvent.MOVED_OUT,
+                          Gio.FileMonitorEvent.CHANGES_DONE_HINT):
+            self.invalidate()
@@ -0,0 +1,165 @@
+import json
+import os
+import re
+import signal
+from collections import deque
+from pathlib import Path
+
+import gi
+gi.require_version("Gtk", "3.0")
+from gi.repository import GLib
+
+KERNEL_SCRIPT = Path(__file__).with_name("repl_kernel.py")
+CELL_MARKER = re.compile(r"\s*#\s*%%")
+
+
+def find_cell(lines, line):
+    """Return (start, end) of the "# %%" cell around 0-based line; end is exclusive."""
+    start = line
+    while start > 0 and not CELL_MARKER.match(lines[start]):
+        start -= 1
+    end = line + 1
+    while end < len(lines) and not CELL_MARKER.match(lines[end]):
+        end += 1
+    return start, end
+
+
+class ReplKernel:
+    """Persistent Python process of the workspace for running code snippets.
+
+    Code runs in a namespace that survives between requests, so imports and
+    data are paid for once. Output appears in the "Python Console" run tab.
+    Requests are sent one at a time, each after the previous one finished,
+    so their headers and output do not interleave.
+    """
+
+    TITLE = "Python Console"
+
+    def __init__(self, app):
+        self.app = app
+        self.session = None
+        self._request_fd = None
+        self._reply_fd = None
+        self._watch_id = None
+        self._buffer = b""
+        self._queue = deque()  # (header, request) waiting for the kernel
+        self._busy = False
+        self._count = 0
+
+    @property
+    def running(self):
+        return self.session is not None and self.session.running
+
+    def execute(self, code, path, first_line, label):
+        """Queue code from path, starting at 1-based first_line, for the kernel."""
+        if not code.strip():
+            return
+        if not self.running and not self._start(path):
+            return
+        self._count += 1
+        self._queue.append((f"[{self._count}] {label}", {
+            "id": self._count, "code": code, "line": first_line,
+            "filename": str(path) if path else "<untitled>"}))
+        self.app.show_run_tab(self.session.panel)
+        self._send_next()
+
+    def interrupt(self):
+        """Drop queued requests and SIGINT the code that is running."""
+        self._queue.clear()
+        if self.running and self._busy:
+            self.session.send_signal(signal.SIGINT)
+
+    def restart(self, path=None):
+        self._close()
+        self._start(path)
+
+    def shutdown(self):
+        self._close()
+        if self.session:
+            self.session.stop()
+            self.session = None
+
+    def _start(self, path):
+        runner = self.app.runner
+        if not runner:
+            return False
+        root = self.app.workspace.root if self.app.workspace else None
+        cwd = root or (Path(path).parent if path else Path.home())
+        info = self.app.interpreters.resolve(None if root else path)
+        request_r, request_w = os.pipe()
+        reply_r, reply_w = os.pipe()
+        env = {"PYWRITER_KERNEL_FDS": f"{request_r},{reply_w}",
+               "PYWRITER_KERNEL_CWD": str(cwd)}
+        session = runner.run(KERNEL_SCRIPT, env=env, title=self.TITLE,
+                             pass_fds=(request_r, reply_w), python=info.path,
+                             persistent=True)
+        if not session:
+            os.close(request_w)
+            os.close(reply_r)
+            return False
+        self.session = session
+        self._request_fd = request_w
+        self._reply_fd = reply_r
+        os.set_blocking(reply_r, False)
+        self._watch_id = GLib.io_add_watch(
+            reply_r, GLib.PRIORITY_DEFAULT, GLib.IO_IN | GLib.IO_HUP | GLib.IO_ERR,
+            self._on_reply)
+        session.on_exit.append(self._on_exit)
+        return True
+
+    def _send_next(self):
+        if self._busy or not self._queue or not self.running:
+            return
+        header, request = self._queue.popleft()
+        self.session.write(f"\n>>> {header}\n", "info")
+        try:
+            os.write(self._request_fd, (json.dumps(request) + "\n").encode())
+        except OSError:
+            self.session.write("The kernel is not accepting input\n", "error")
+            return
+        self._busy = True
+
+    def _on_reply(self, fd, condition):
+        try:
+            chunk = os.read(fd, 65536)
+        except BlockingIOError:
+            return True
+        except OSError:
+            chunk = b""
+        if not chunk:
+            self._watch_id = None
+            return False  # the kernel exited; _on_exit cleans up
+        self._buffer += chunk
+        *lines, self._buffer = self._buffer.split(b"\n")
+        for line in lines:
+            try:
+                reply = json.loads(line)
+            except ValueError:
+                continue  # garbled: never let it kill the watch
+            self._busy = False
+            if reply["status"] == "interrupted":
+                self._queue.clear()
+            elif reply["time"] >= 1.0:
+                self.session.write(f"--- {reply['time']:.2f}s ---\n", "info")
+        self._send_next()
+        return True
+
+    def _on_exit(self, session):
+        if session is not self.session:
+            return  # an old kernel replaced by restart()
+        self._close()
+        self.session = None
+        session.write("--- Kernel stopped: its namespace is gone; "
+                      "the next run starts a new one ---\n", "info")
+
+    def _close(self):
+        if self._watch_id:
+            GLib.source_remove(self._watch_id)
+            self._watch_id = None
+        for fd in (self._request_fd, self._reply_fd):
+            if fd is not None:
+                os.close(fd)
+        self._request_fd = self._reply_fd = None
+        self._buffer = b""
+        self._queue.clear()
+        self._busy = False
@@ -0,0 +1,88 @@
+"""Memory profiling bootstrap.
+
+Runs as a standalone script in the child interpreter (it must not import gi
+or anything from the pywriter package):
+
+    python memory_bootstrap.py SNAPSHOT_DIR script.py [args...]
+
+tracemalloc is started before the script runs, and allocation statistics
+grouped by file and line are written to SNAPSHOT_DIR as snapshot-<n>.json:
+
+    {"label": "...", "time": seconds, "current": bytes, "peak": bytes,
+     "stats": [[filename, lineno, size, count], ...]}
+
+A snapshot is taken when the script ends, on SIGUSR1 (the script keeps
+running) and on SIGUSR2 (the script is stopped afterwards).
+"""
+
+import json
+import os
+import runpy
+import signal
+import sys
+import time
+import tracemalloc
+
+_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, runpy.__file__),
+    tracemalloc.Filter(False, "<frozen runpy>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+_snapshot_dir = None
+_count = 0
+_start = time.monotonic()
+
+
+def take_snapshot(label):
+    global _count
+    snapshot = tracemalloc.take_snapshot().filter_traces(_FILTERS)
+    current, peak = tracemalloc.get_traced_memory()
+    stats = [[s.traceback[0].filename, s.traceback[0].lineno, s.size, s.count]
+             for s in snapshot.statistics("lineno")]
+    _count += 1
+    path = os.path.join(_snapshot_dir, "snapshot-%d.json" % _count)
+    with open(path + ".tmp", "w") as f:
+        json.dump({"label": label, "time": time.monotonic() - _start,
+                   "current": current, "peak": peak, "stats": stats}, f)
+    # Renamed into place so the IDE never reads a half-written file
+    os.replace(path + ".tmp", path)
+
+
+def _on_snapshot(signum, frame):
+    take_snapshot("on demand")
+
+
+def _on_stop(signum, frame):
+    raise SystemExit("Stopped for a memory snapshot")
+
+
+def main():
+    global _snapshot_dir
+    if len(sys.argv) < 3:
+        sys.stderr.write("usage: memory_bootstrap.py SNAPSHOT_DIR script.py [args...]\n")
+        return 2
+    _snapshot_dir = sys.argv[1]
+    script = sys.argv[2]
+    sys.argv = sys.argv[2:]
+    sys.path[0] = os.path.dirname(os.path.abspath(script))
+
+    signal.signal(signal.SIGUSR1, _on_snapshot)
+    signal.signal(signal.SIGUSR2, _on_stop)
+    tracemalloc.start()
+    try:
+        runpy.run_path(script, run_name="__main__")
+    finally:
+        signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+        signal.signal(signal.SIGUSR2, signal.SIG_IGN)
+        take_snapshot("at exit")
+        tracemalloc.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
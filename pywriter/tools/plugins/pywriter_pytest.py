@@ -0,0 +1,77 @@
+"""pytest plugin streaming results to the Tests panel.
+
+Loaded in pytest worker processes with -p pywriter_pytest (this directory is
+put on PYTHONPATH). It must not import gi or anything from the pywriter
+package. When PYWRITER_REPORT_FD is set, one JSON object per line is written
+to that file descriptor as each test finishes:
+
+    {"event": "result", "nodeid": "...", "outcome": "passed" | "failed" |
+     "error" | "skipped" | "xfailed" | "xpassed", "duration": seconds,
+     "message": "...", "file": "/abs/path.py", "line": n}
+
+file and line point at the failure when there is one, otherwise at the
+test itself. Modules that fail to import are reported as
+{"event": "collect_error", "nodeid": "...", "message": "..."}.
+"""
+
+import json
+import os
+
+_fd = None
+_rootdir = ""
+_pending = {}  # nodeid -> result being assembled from setup/call/teardown
+
+
+def pytest_configure(config):
+    global _fd, _rootdir
+    fd = os.environ.get("PYWRITER_REPORT_FD")
+    _fd = int(fd) if fd else None
+    _rootdir = str(getattr(config, "rootpath", None) or config.rootdir)
+
+
+def _send(message):
+    if _fd is None:
+        return
+    data = (json.dumps(message) + "\n").encode()
+    while data:
+        data = data[os.write(_fd, data):]
+
+
+def pytest_collectreport(report):
+    if report.failed:
+        _send({"event": "collect_error", "nodeid": report.nodeid,
+               "message": str(report.longrepr)})
+
+
+def pytest_runtest_logreport(report):
+    result = _pending.get(report.nodeid)
+    if result is None:
+        path, lineno, _ = report.location
+        result = _pending[report.nodeid] = {
+            "event": "result", "nodeid": report.nodeid, "outcome": "passed",
+            "duration": 0.0, "message": "",
+            "file": os.path.join(_rootdir, path), "line": (lineno or 0) + 1}
+    result["duration"] += report.duration
+
+    if report.failed:
+        if report.when == "call":
+            result["outcome"] = "failed"
+        elif result["outcome"] != "failed":
+            result["outcome"] = "error"
+        result["message"] = report.longreprtext
+        crash = getattr(report.longrepr, "reprcrash", None)
+        if crash is not None:
+            result["file"], result["line"] = str(crash.path), crash.lineno
+    elif report.passed and report.when == "call" and hasattr(report, "wasxfail"):
+        result["outcome"] = "xpassed"
+    elif report.skipped and result["outcome"] == "passed":
+        if hasattr(report, "wasxfail"):
+            result["outcome"] = "xfailed"
+            result["message"] = report.wasxfail
+        else:
+            result["outcome"] = "skipped"
+            if isinstance(report.longrepr, tuple):
+                result["message"] = report.longrepr[2]
+
+    if report.when == "teardown":
+        _send(_pending.pop(report.nodeid))
@@ -0,0 +1,109 @@
+"""REPL kernel for Run Selection / Run Cell.
+
+Runs as a standalone script in the workspace interpreter (it must not
+import gi or anything from the pywriter package). The IDE passes two pipe
+descriptors and the working directory in the environment:
+
+    PYWRITER_KERNEL_FDS=REQUEST_FD,REPLY_FD  PYWRITER_KERNEL_CWD=...
+
+Requests are JSON lines {"id": n, "code": "...", "filename": "...",
+"line": first line number}; each is executed in one namespace that lives
+as long as the process, and a JSON line {"id": n, "status": "ok" |
+"error" | "interrupted", "time": seconds} is written back once its output
+has been flushed. Program output goes to stdout/stderr as usual. If the
+last statement is an expression its repr is printed, as in the
+interactive interpreter. SIGINT interrupts the running code and is
+ignored while idle. Lines that are not JSON are skipped; a request
+without "code" gets an "error" reply.
+"""
+
+import ast
+import builtins
+import json
+import os
+import signal
+import sys
+import textwrap
+import time
+import traceback
+import types
+
+
+def _compile(code, filename, first_line):
+    # Leading newlines keep line numbers (and SyntaxError positions) in step
+    # with the document
+    source = "\n" * (first_line - 1) + textwrap.dedent(code)
+    tree = ast.parse(source, filename)
+    display = None
+    if tree.body and isinstance(tree.body[-1], ast.Expr):
+        display = compile(ast.Expression(tree.body.pop().value), filename, "eval")
+    return compile(tree, filename, "exec"), display
+
+
+def execute(namespace, code, filename, first_line):
+    """Run code in namespace and return its status."""
+    try:
+        body, display = _compile(code, filename, first_line)
+    except (SyntaxError, ValueError, OverflowError) as e:
+        traceback.print_exception(type(e), e, None)
+        return "error"
+    try:
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        try:
+            exec(body, namespace)
+            if display is not None:
+                sys.displayhook(eval(display, namespace))
+        finally:
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+    except SystemExit:
+        raise
+    except BaseException as e:
+        # Drop the kernel's own frames from the traceback
+        tb = e.__traceback__
+        while tb and tb.tb_frame.f_code.co_filename == __file__:
+            tb = tb.tb_next
+        sys.excepthook(type(e), e.with_traceback(tb), tb)
+        return "interrupted" if isinstance(e, KeyboardInterrupt) else "error"
+    return "ok"
+
+
+def main():
+    request_fd, reply_fd = (int(fd) for fd in os.environ.pop("PYWRITER_KERNEL_FDS").split(","))
+    os.chdir(os.environ.pop("PYWRITER_KERNEL_CWD", os.getcwd()))
+    sys.path[0] = os.getcwd()
+
+    main_module = types.ModuleType("__main__")
+    main_module.__builtins__ = builtins
+    sys.modules["__main__"] = main_module
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    with os.fdopen(request_fd, "rb") as requests, \
+            os.fdopen(reply_fd, "w", buffering=1) as replies:
+        for line in requests:
+            try:
+                request = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(request, dict):
+                continue
+            started = time.perf_counter()
+            code = request.get("code")
+            if not isinstance(code, str):
+                print(f"pywriter kernel: request without code: {line!r}", file=sys.stderr)
+                status = "error"
+            else:
+                try:
+                    status = execute(main_module.__dict__, code,
+                                     request.get("filename", "<console>"),
+                                     request.get("line", 1))
+                except KeyboardInterrupt:
+                    status = "interrupted"  # arrived just after the code finished
+            sys.stdout.flush()
+            sys.stderr.flush()
+            replies.write(json.dumps({"id": request.get("id"), "status": status,
+                                      "time": time.perf_counter() - started}) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+import json
+import signal
+import statistics
+import time
+from pathlib import Path
+
+HISTORY_FILE = Path.home() / ".cache" / "pywriter" / "run_history.json"
+MAX_RUNS_PER_FILE = 20
+REGRESSION_PERCENT = 25  # above the median by more than this counts as a regression
+MIN_REGRESSION_TIME = 0.1  # seconds; shorter medians are too noisy to judge
+
+
+def format_bytes(kib):
+    if kib >= 1024:
+        return f"{kib / 1024:.1f} MiB"
+    return f"{kib} KiB"
+
+
+class RunRecord:
+    """Resource usage of one finished run."""
+
+    FIELDS = ("started", "title", "returncode", "wall", "user", "sys", "max_rss")
+
+    def __init__(self, started, title, returncode, wall, user, sys, max_rss):
+        self.started = started  # time.time() at start
+        self.title = title
+        self.returncode = returncode
+        self.wall = wall
+        self.user = user
+        self.sys = sys
+        self.max_rss = max_rss  # KiB
+
+    def to_list(self):
+        return [getattr(self, f) for f in self.FIELDS]
+
+    def summary(self):
+        return (f"{self.wall:.2f}s wall, {self.user:.2f}s user + {self.sys:.2f}s sys CPU, "
+                f"{format_bytes(self.max_rss)} peak RSS")
+
+
+class RunHistory:
+    """Recent runs per script, kept in ~/.cache/pywriter/run_history.json."""
+
+    def __init__(self, path=HISTORY_FILE):
+        self._path = path
+        self._runs = {}  # str(filepath) -> [RunRecord], oldest first
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self._path) as f:
+                data = json.load(f)
+            self._runs = {fp: [RunRecord(*r) for r in runs] for fp, runs in data.items()}
+        except (OSError, ValueError, TypeError):
+            self._runs = {}
+
+    def _save(self):
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self._path, "w") as f:
+                json.dump({fp: [r.to_list() for r in runs]
+                           for fp, runs in self._runs.items()}, f)
+        except OSError:
+            pass
+
+    def records(self, filepath, title=None):
+        runs = self._runs.get(str(filepath), [])
+        return [r for r in runs if title is None or r.title == title]
+
+    def add(self, filepath, record):
+        runs = self._runs.setdefault(str(filepath), [])
+        runs.append(record)
+        del runs[:-MAX_RUNS_PER_FILE]
+        self._save()
+
+    def compare(self, filepath, record):
+        """Compare record with the median of earlier successful runs.
+
+        Returns (description, regressed) or None. regressed is True when a
+        measure exceeds its median by more than REGRESSION_PERCENT.
+        """
+        earlier = [r for r in self.records(filepath, record.title)
+                   if r is not record and r.returncode == 0]
+        if not earlier or record.returncode != 0:
+            return None
+        parts = []
+        regressions = []
+        for label, attr, fmt in (("wall", "wall", lambda v: f"{v:.2f}s"),
+                                 ("CPU", None, lambda v: f"{v:.2f}s"),
+                                 ("peak RSS", "max_rss", format_bytes)):
+            def value(r):
+                return r.user + r.sys if attr is None else getattr(r, attr)
+            median = statistics.median(value(r) for r in earlier)
+            if median:
+                change = (value(record) - median) / median * 100
+                parts.append(f"{label} {change:+.0f}% (median {fmt(median)})")
+                if change > REGRESSION_PERCENT and \
+                        (attr == "max_rss" or median >= MIN_REGRESSION_TIME):
+                    regressions.append(label)
+        if not parts:
+            return None
+        text = f"vs. {len(earlier)} earlier runs: " + ", ".join(parts)
+        if regressions:
+            text += " — regression in " + ", ".join(regressions)
+        return text, bool(regressions)
+
+    def format_table(self, filepath):
+        lines = []
+        for r in reversed(self.records(filepath)):
+            when = time.strftime("%Y-%m-%d %H:%M", time.localtime(r.started))
+            if r.returncode is not None and r.returncode < 0:
+                try:
+                    status = signal.Signals(-r.returncode).name
+                except ValueError:
+                    status = f"signal {-r.returncode}"
+            else:
+                status = "ok" if r.returncode == 0 else f"exit {r.returncode}"
+            lines.append(f"{when}  {r.title:<30} {status:<9} {r.wall:8.2f}s "
+                         f"{r.user + r.sys:8.2f}s CPU {format_bytes(r.max_rss):>11}")
+        return "\n".join(lines)
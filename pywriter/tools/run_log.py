@@ -0,0 +1,59 @@
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+
+RUN_LOG_DIR = Path.home() / ".cache" / "pywriter" / "runs"
+
+_open_logs = set()  # paths of the logs of runs still going
+
+
+def prune(keep):
+    """Delete all but the newest keep finished logs in RUN_LOG_DIR.
+
+    Logs still being written are never deleted and do not count.
+    """
+    try:
+        logs = sorted((p for p in RUN_LOG_DIR.glob("*.log") if p not in _open_logs),
+                      key=lambda p: p.stat().st_mtime)
+    except OSError:
+        return
+    for path in logs[:max(0, len(logs) - keep)]:
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+
+class RunLog:
+    """The complete raw output of one run, in a file under RUN_LOG_DIR.
+
+    Unlike the Output panel, which keeps only the newest output_max_lines
+    lines, nothing is dropped. Writes are unbuffered so the log viewer sees
+    output as soon as it arrives. Opening a log prunes the oldest finished ones.
+    """
+
+    def __init__(self, title, keep):
+        RUN_LOG_DIR.mkdir(parents=True, exist_ok=True)
+        prune(keep - 1)
+        name = re.sub(r"[^\w.-]+", "_", title).strip("_")
+        fd, path = tempfile.mkstemp(prefix=time.strftime("%Y%m%d-%H%M%S-") + name + "-",
+                                    suffix=".log", dir=str(RUN_LOG_DIR))
+        self.path = Path(path)
+        self._file = os.fdopen(fd, "wb", buffering=0)
+        _open_logs.add(self.path)
+
+    def write(self, data):
+        if self._file is None:
+            return
+        try:
+            self._file.write(data)
+        except OSError:
+            self.close()  # e.g. a full SD card: the run itself goes on
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            _open_logs.discard(self.path)
@@ -1,84 +1,570 @@
+import codecs
+import fcntl
 import os
+import pty
+import struct
 import subprocess
+import termios
 import threading
 import signal
+import time
 from pathlib import Path
 
 import gi
 gi.require_version("Gtk", "3.0")
 from gi.repository import GLib
 
+from .run_history import RunHistory, RunRecord
+from .run_log import RunLog
+from .terminal import Vt100Decoder
+
+READ_SIZE = 65536
+PTY_SIZE = (24, 100)  # rows, columns
+KILL_TIMEOUT_MS = 2000  # SIGTERM grace period before SIGKILL on restart
+
+
+def _close_fds(fds):
+    for fd in fds:
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+
+
+class OutputDecoder:
+    """Incremental UTF-8 decoding of raw output with \r\n folded to \n.
+
+    A bare \r is kept so the Output panel can overwrite the current line;
+    a trailing \r is held back in case the \n arrives in the next chunk.
+    Invalid bytes are replaced rather than raising.
+    """
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._held_cr = ""
+
+    def decode(self, data, final=False):
+        text = self._held_cr + self._decoder.decode(data, final)
+        self._held_cr = ""
+        if text.endswith("\r") and not final:
+            text, self._held_cr = text[:-1], "\r"
+        return text.replace("\r\n", "\n")
+
+
+class RunSession:
+    """One run of a script: its process, output tab, exit status and timing."""
+
+    def __init__(self, filepath, argv, title, env=None, use_pty=False, pass_fds=(),
+                 persistent=False, divert=None):
+        self.filepath = filepath
+        self.argv = argv
+        self.title = title
+        self.env = env
+        self.use_pty = use_pty
+        self.pass_fds = tuple(pass_fds)
+        self.persistent = persistent  # long-lived helper, e.g. the REPL kernel
+        self.log = None  # RunLog with the complete raw output, if enabled
+        self.panel = None
+        self.process = None
+        self.pty_fd = None
+        self._pty_watch = None
+        self._pty_decoders = None
+        self._pty_eof = False
+        self.returncode = None
+        self.rusage = None  # resource.struct_rusage once reaped with os.wait4
+        self.started_at = time.time()
+        self.start_time = time.monotonic()
+        self.end_time = None
+        self.on_exit = []  # callables(session), run on the main thread
+        self._stop_requested = False
+        self._line_filter = divert
+
+    @property
+    def running(self):
+        return self.end_time is None
+
+    @property
+    def elapsed(self):
+        return (self.end_time or time.monotonic()) - self.start_time
+
+    def write(self, text, tag=None):
+        if self.panel:
+            self.panel.append(text, tag)
+
+    def _filter_output(self, text, final=False):
+        """Return (text to show, partial line held back) after diverting lines."""
+        prefix, callback = self._line_filter
+        *lines, tail = text.split("\n")
+        shown = []
+        for line in lines:
+            if line.startswith(prefix):
+                callback(line)
+            else:
+                shown.append(line + "\n")
+        # Hold back a partial line only while it may still turn out to match
+        if tail and (final or not (prefix.startswith(tail) or tail.startswith(prefix))):
+            if tail.startswith(prefix):
+                callback(tail)
+            else:
+                shown.append(tail)
+            tail = ""
+        return "".join(shown), tail
+
+    @property
+    def accepts_input(self):
+        return self.pty_fd is not None and self.running
+
+    def send_input(self, data):
+        """Write keystrokes to the program's terminal."""
+        if not self.accepts_input:
+            return
+        try:
+            os.write(self.pty_fd, data)
+        except OSError:
+            pass
+
+    def send_signal(self, signum):
+        """Send signum to the program itself (not its process group)."""
+        # The reaper thread owns waiting on the process, so never poll() here
+        if self.running and self.process and self.process.returncode is None:
+            try:
+                os.kill(self.process.pid, signum)
+            except OSError:
+                pass
+
+    def stop(self):
+        if not self.running:
+            return
+        self._stop_requested = True
+        if self.process and self.process.returncode is None:
+            try:
+                os.killpg(os.getpgid(self.process.pid), signal.SIGTERM)
+            except OSError:
+                self.process.kill()
+            self.write("\n--- Process terminated ---\n", "info")
+
+    def kill(self):
+        """SIGKILL the program's process group (when stop() is ignored)."""
+        if self.running and self.process and self.process.returncode is None:
+            try:
+                os.killpg(os.getpgid(self.process.pid), signal.SIGKILL)
+            except OSError:
+                pass
+
+    @property
+    def signal_name(self):
+        """Name of the signal that killed the program, or None."""
+        if self.returncode is None or self.returncode >= 0:
+            return None
+        try:
+            return signal.Signals(-self.returncode).name
+        except ValueError:
+            return f"signal {-self.returncode}"
+
+    def status_text(self):
+        if self.running:
+            return f"running {self.elapsed:.1f}s"
+        if self.returncode is None:
+            return "failed to start"
+        if self.returncode < 0:
+            return f"killed by {self.signal_name} after {self.elapsed:.2f}s"
+        return f"exit {self.returncode} after {self.elapsed:.2f}s"
+
+    def record(self):
+        """Return a RunRecord of the finished run, or None without rusage."""
+        if self.rusage is None:
+            return None
+        return RunRecord(self.started_at, self.title, self.returncode, self.elapsed,
+                         self.rusage.ru_utime, self.rusage.ru_stime, self.rusage.ru_maxrss)
+
 
 class ToolRunner:
-    """Runs Python scripts asynchronously, capturing output to the Output panel."""
+    """Runs Python scripts asynchronously, each with its own output tab.
+
+    Several runs may be active at once, up to the max_concurrent_runs
+    setting. Running a script again restarts it in its existing tab. The
+    raw output of every run is also saved to a RunLog file (run_logs).
+    """
 
     def __init__(self, app):
         self.app = app
-        self._process = None
+        self.sessions = []
+        self.history = RunHistory()
+
+    @property
+    def max_concurrent(self):
+        return max(1, self.app.config.get("max_concurrent_runs", 2))
+
+    def run(self, filepath, interpreter_args=(), env=None, title=None, use_pty=False,
+            pass_fds=(), python=None, persistent=False, divert=None):
+        """Start filepath and return its RunSession, or None if it was not started.
+
+        With use_pty the program runs on a pseudo-terminal: it sees a TTY
+        (line-buffered output, working input()) and keystrokes typed in its
+        output tab are forwarded to it.
 
-    def run(self, filepath):
+        pass_fds are inherited by the program and closed in this process once
+        it has started (or failed to). python overrides the interpreter
+        resolved for filepath. Persistent sessions do not count towards
+        max_concurrent_runs and are left out of the run history.
+
+        divert is an optional (prefix, callback) pair: output lines starting
+        with prefix are passed to callback, on the reader thread, instead of
+        being shown. It does not apply to use_pty runs.
+        """
         filepath = Path(filepath)
         if not filepath.exists():
             self._write_output(f"File not found: {filepath}\n", "error")
-            return
-
-        if self._process and self._process.poll() is None:
-            self.stop()
+            _close_fds(pass_fds)
+            return None
 
-        interpreter = self._find_interpreter(filepath)
-        self._write_output(f">>> Running: {interpreter} {filepath.name}\n", "info")
+        title = title or filepath.name
+        previous = self.find_session(filepath, title)
+        if previous:
+            # Restart in place: the old process is detached from the tab
+            panel = previous.panel
+            previous.panel = None
+            self._retire(previous)
+        else:
+            panel = None
 
-        threading.Thread(target=self._run_subprocess,
-                         args=(interpreter, filepath), daemon=True).start()
+        active = [s for s in self.sessions
+                  if s.running and not s.persistent and s is not previous]
+        if len(active) >= self.max_concurrent:
+            self._write_output(
+                f"Not running {title}: {len(active)} runs already active "
+                f"(max_concurrent_runs = {self.max_concurrent})\n", "error")
+            if panel:
+                self.app.close_run_tab(panel)
+            _close_fds(pass_fds)
+            return None
 
-    def stop(self):
-        if self._process and self._process.poll() is None:
+        interpreter = python or self._find_interpreter(filepath)
+        argv = [interpreter, *interpreter_args, str(filepath)]
+        session = RunSession(filepath, argv, title, env, use_pty, pass_fds, persistent,
+                             divert)
+        if self.app.config.get("run_logs", True):
             try:
-                os.killpg(os.getpgid(self._process.pid), signal.SIGTERM)
+                session.log = RunLog(title, self.app.config.get("run_logs_keep", 50))
             except OSError:
-                self._process.kill()
-            self._write_output("\n--- Process terminated ---\n", "info")
+                pass  # no log, but the run can still go ahead
+        if panel:
+            panel.attach(session)
+        else:
+            panel = self.app.open_run_tab(session)
+        session.panel = panel
+        self.sessions.append(session)
+        self.app.show_run_tab(panel)
+
+        session.write(f">>> Running: {' '.join(argv[:-1])} {filepath.name}\n", "info")
+        if use_pty:
+            self._start_pty(session)
+        elif self._can_fork(session, interpreter_args):
+            threading.Thread(target=self._run_forked,
+                             args=(session, self.app.interpreters.resolve(filepath)),
+                             daemon=True).start()
+        else:
+            threading.Thread(target=self._run_subprocess, args=(session,),
+                             daemon=True).start()
+        return session
+
+    def _retire(self, session):
+        """Stop a session replaced by a restart and forget it once it has exited.
+
+        Until then it stays in sessions, so stop() still reaches it; if it
+        ignores SIGTERM it is killed after KILL_TIMEOUT_MS.
+        """
+        if not session.running:
+            self.sessions.remove(session)
+            return
+        session.on_exit.append(self._forget_session)
+        session.stop()
+        GLib.timeout_add(KILL_TIMEOUT_MS, self._kill_if_running, session)
+
+    def _forget_session(self, session):
+        if session in self.sessions:
+            self.sessions.remove(session)
+
+    def _kill_if_running(self, session):
+        if session.running:
+            session.kill()
+        return False
+
+    def find_session(self, filepath, title=None):
+        filepath = Path(filepath)
+        for session in self.sessions:
+            if session.panel is None:
+                continue  # retired by a restart, on its way out
+            if session.filepath == filepath and (title is None or session.title == title):
+                return session
+        return None
+
+    def close_session(self, session):
+        session.stop()
+        if session in self.sessions:
+            self.sessions.remove(session)
+
+    def stop(self, session=None):
+        """Stop session, or every active run when session is None."""
+        targets = [session] if session else list(self.sessions)
+        for s in targets:
+            s.stop()
 
     def _find_interpreter(self, filepath):
-        # Check for workspace venv
-        workspace = filepath.parent
-        for venv_dir in ("venv", ".venv", "env"):
-            venv_python = workspace / venv_dir / "bin" / "python"
-            if venv_python.exists():
-                return str(venv_python)
-        # Walk up parents
-        for parent in filepath.parents:
-            for venv_dir in ("venv", ".venv", "env"):
-                venv_python = parent / venv_dir / "bin" / "python"
-                if venv_python.exists():
-                    return str(venv_python)
-        return "python3"
-
-    def _run_subprocess(self, interpreter, filepath):
+        return self.app.interpreters.resolve(filepath).path
+
+    def _session_env(self, session):
+        env = dict(os.environ, PYTHONUNBUFFERED="1")
+        if session.env:
+            env.update(session.env)
+        return env
+
+    def _run_subprocess(self, session):
         try:
-            self._process = subprocess.Popen(
-                [interpreter, str(filepath)],
+            env = self._session_env(session)
+            session.process = subprocess.Popen(
+                session.argv,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.STDOUT,
-                cwd=str(filepath.parent),
+                cwd=str(session.filepath.parent),
+                env=env,
                 preexec_fn=os.setsid,
-                bufsize=1,
-                universal_newlines=True
+                pass_fds=session.pass_fds,
+                bufsize=0
             )
+            self._release_fds(session)
+            if session._stop_requested:
+                os.killpg(session.process.pid, signal.SIGTERM)
 
-            for line in self._process.stdout:
-                self._write_output(line)
+            self._read_output(session, session.process.stdout.fileno())
+            session.process.stdout.close()
+            session.returncode = self._reap(session)
+            session.end_time = time.monotonic()
+            self._write_exit_status(session)
 
-            self._process.wait()
-            code = self._process.returncode
-            if code != 0:
-                self._write_output(f"\n--- Process exited with code {code} ---\n", "error")
-            else:
-                self._write_output("\n--- Process finished ---\n", "info")
+        except OSError as e:
+            self._release_fds(session)
+            session.end_time = time.monotonic()
+            session.write(f"Failed to run: {e}\n", "error")
+
+        GLib.idle_add(self._on_session_exit, session)
+
+    def _can_fork(self, session, interpreter_args):
+        # Tool runs (profilers, tracers) need a fresh interpreter of their own
+        fork_server = self.app.fork_server
+        return (fork_server is not None and fork_server.enabled
+                and not interpreter_args and not session.pass_fds)
+
+    def _run_forked(self, session, info):
+        """Run the session forked from the fork server's preloaded helper."""
+        read_fd, write_fd = os.pipe()
+        try:
+            process = self.app.fork_server.spawn(
+                info, [str(session.filepath)], str(session.filepath.parent),
+                self._session_env(session), write_fd)
+        finally:
+            os.close(write_fd)
+        if process is None:
+            os.close(read_fd)
+            session.write(f">>> Fork server unavailable ({self.app.fork_server.last_error}), "
+                          "starting a new interpreter\n", "info")
+            self._run_subprocess(session)
+            return
+
+        session.process = process
+        helper = process.helper
+        note = (">>> Forked from the fork server (preloaded: "
+                + (", ".join(helper.preloaded) or "none"))
+        if helper.failed:
+            note += "; failed: " + ", ".join(f"{name} ({error})"
+                                             for name, error in helper.failed.items())
+        session.write(note + ")\n", "info")
+        if session._stop_requested:
+            try:
+                os.killpg(process.pid, signal.SIGTERM)
+            except OSError:
+                pass
+
+        self._read_output(session, read_fd)
+        os.close(read_fd)
+        session.returncode = process.wait()
+        session.rusage = process.rusage
+        session.end_time = time.monotonic()
+        self._write_exit_status(session)
+        GLib.idle_add(self._on_session_exit, session)
+
+    def _release_fds(self, session):
+        # The child has its copies now; close ours exactly once
+        _close_fds(session.pass_fds)
+        session.pass_fds = ()
+
+    def _reap(self, session):
+        """Wait for the program with os.wait4 and return its returncode.
 
+        The resource usage (CPU time, peak RSS) is stored on the session.
+        """
+        process = session.process
+        try:
+            _, status, session.rusage = os.wait4(process.pid, 0)
+        except ChildProcessError:
+            return process.wait()
+        if os.WIFSIGNALED(status):
+            process.returncode = -os.WTERMSIG(status)
+        else:
+            process.returncode = os.WEXITSTATUS(status)
+        return process.returncode
+
+    def _write_exit_status(self, session):
+        record = session.record()
+        usage = record.summary() if record else f"{session.elapsed:.2f}s"
+        if session.returncode < 0:
+            session.write(f"\n--- Process killed by {session.signal_name} "
+                          f"({usage}) ---\n", "error")
+        elif session.returncode != 0:
+            session.write(f"\n--- Process exited with code {session.returncode} "
+                          f"({usage}) ---\n", "error")
+        else:
+            session.write(f"\n--- Process finished ({usage}) ---\n", "info")
+
+    # --- Pseudo-terminal runs (main thread, driven by GLib IO watches) ---
+
+    def _start_pty(self, session):
+        master, slave = pty.openpty()
+        fcntl.ioctl(slave, termios.TIOCSWINSZ, struct.pack("HHHH", *PTY_SIZE, 0, 0))
+        env = self._session_env(session)
+        env["TERM"] = "vt100"
+
+        def make_controlling_tty():
+            os.setsid()
+            fcntl.ioctl(0, termios.TIOCSCTTY, 0)
+
+        try:
+            session.process = subprocess.Popen(
+                session.argv,
+                stdin=slave, stdout=slave, stderr=slave,
+                cwd=str(session.filepath.parent),
+                env=env,
+                preexec_fn=make_controlling_tty,
+                close_fds=True,
+                pass_fds=session.pass_fds
+            )
         except OSError as e:
-            self._write_output(f"Failed to run: {e}\n", "error")
+            os.close(master)
+            os.close(slave)
+            self._release_fds(session)
+            session.end_time = time.monotonic()
+            session.write(f"Failed to run: {e}\n", "error")
+            GLib.idle_add(self._on_session_exit, session)
+            return
+        os.close(slave)
+        self._release_fds(session)
+        os.set_blocking(master, False)
+        session.pty_fd = master
+        session._pty_decoders = (OutputDecoder(), Vt100Decoder())
+        session._pty_watch = GLib.io_add_watch(
+            master, GLib.PRIORITY_DEFAULT, GLib.IO_IN | GLib.IO_HUP | GLib.IO_ERR,
+            self._on_pty_output, session)
+        # Reap the child off the main thread; output keeps flowing meanwhile
+        threading.Thread(target=self._wait_pty, args=(session,), daemon=True).start()
+
+    def _on_pty_output(self, fd, condition, session):
+        decoder, vt100 = session._pty_decoders
+        while True:
+            try:
+                chunk = os.read(fd, READ_SIZE)
+            except BlockingIOError:
+                if session.returncode is None:
+                    return True
+                chunk = b""  # child gone and output drained
+            except OSError:
+                chunk = b""  # EIO: the last slave descriptor was closed
+            if chunk and session.log:
+                session.log.write(chunk)
+            if not chunk:
+                self._write_pty_text(session, vt100, decoder.decode(b"", final=True))
+                os.close(fd)
+                session.pty_fd = None
+                session._pty_watch = None
+                session._pty_eof = True
+                self._finish_pty(session)
+                return False
+            self._write_pty_text(session, vt100, decoder.decode(chunk))
+
+    def _write_pty_text(self, session, vt100, text):
+        for op in vt100.feed(text):
+            if op[0] == "clear":
+                if session.panel:
+                    session.panel.clear()
+            else:
+                session.write(op[1], op[2])
+
+    def _wait_pty(self, session):
+        returncode = self._reap(session)
+        GLib.idle_add(self._on_pty_exited, session, returncode)
+
+    def _on_pty_exited(self, session, returncode):
+        session.returncode = returncode
+        if session._pty_watch is not None:
+            # A background grandchild may keep the terminal open: drain what
+            # the program wrote and stop watching
+            GLib.source_remove(session._pty_watch)
+            self._on_pty_output(session.pty_fd, GLib.IO_IN, session)
+        self._finish_pty(session)
+        return False
+
+    def _finish_pty(self, session):
+        # Done once the child has exited and its output is drained; both
+        # paths can get here, so finish only once
+        if session.returncode is None or not session._pty_eof or not session.running:
+            return
+        session.end_time = time.monotonic()
+        self._write_exit_status(session)
+        self._on_session_exit(session)
+
+    def _on_session_exit(self, session):
+        if session.log:
+            session.log.close()
+        record = session.record()
+        if record and not session._stop_requested and not session.persistent:
+            # Stopped runs would skew the history
+            self.history.add(session.filepath, record)
+            comparison = self.history.compare(session.filepath, record)
+            if comparison:
+                text, regressed = comparison
+                session.write(f"--- {text} ---\n", "error" if regressed else "info")
+        if session.panel:
+            session.panel.update_status()
+        for callback in session.on_exit:
+            callback(session)
+        return False
+
+    def _read_output(self, session, fd):
+        """Forward raw output as it arrives, in chunks of up to READ_SIZE bytes.
+
+        Partial lines are shown immediately instead of waiting for a newline.
+        """
+        decoder = OutputDecoder()
+        held = ""
+        while True:
+            try:
+                chunk = os.read(fd, READ_SIZE)
+            except InterruptedError:
+                continue
+            except OSError:
+                break
+            if not chunk:
+                break
+            if session.log:
+                session.log.write(chunk)
+            text = decoder.decode(chunk)
+            if session._line_filter:
+                text, held = session._filter_output(held + text)
+            session.write(text)
+        text = decoder.decode(b"", final=True)
+        if session._line_filter:
+            text, held = session._filter_output(held + text, final=True)
+        session.write(text)
 
     def _write_output(self, text, tag=None):
         if self.app.output_panel:
-            GLib.idle_add(self.app.output_panel.append, text, tag)
+            self.app.output_panel.append(text, tag)
@@ -0,0 +1,124 @@
+"""Sampling profiler bootstrap.
+
+Runs as a standalone script in the child interpreter (it must not import gi
+or anything from the pywriter package):
+
+    python sampler_bootstrap.py FD INTERVAL_MS script.py [args...]
+
+A background thread samples the stacks of all other threads every
+INTERVAL_MS milliseconds with sys._current_frames(). Stacks are aggregated
+in the child and streamed to file descriptor FD twice a second, one JSON
+object per line:
+
+    {"functions": {"<id>": [filename, firstlineno, name], ...},
+     "stacks": [[[id, ...], count], ...], "samples": n}
+
+Stacks list function ids outermost first. Each function is described once,
+the first time it appears. Counts are deltas since the previous line.
+"""
+
+import json
+import os
+import runpy
+import sys
+import threading
+import time
+
+FLUSH_INTERVAL = 0.5
+# Frames of the wrapper itself, left out of the stacks
+_HIDDEN_FILES = {__file__, runpy.__file__, "<frozen runpy>"}
+
+
+class Sampler(threading.Thread):
+    def __init__(self, fd, interval):
+        super().__init__(name="pywriter-sampler", daemon=True)
+        self._fd = fd
+        self._interval = interval
+        self._ids = {}  # code object -> function id
+        self._new_functions = {}
+        self._stacks = {}
+        self._samples = 0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def run(self):
+        me = threading.get_ident()
+        next_flush = time.monotonic() + FLUSH_INTERVAL
+        while not self._stopped.wait(self._interval):
+            self._sample(me)
+            if time.monotonic() >= next_flush:
+                next_flush += FLUSH_INTERVAL
+                if not self.flush():
+                    return
+
+    def _sample(self, me):
+        with self._lock:
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    if frame.f_code.co_filename not in _HIDDEN_FILES:
+                        stack.append(self._function_id(frame.f_code))
+                    frame = frame.f_back
+                if not stack:
+                    continue
+                stack.reverse()
+                stack = tuple(stack)
+                self._stacks[stack] = self._stacks.get(stack, 0) + 1
+            self._samples += 1
+
+    def _function_id(self, code):
+        fid = self._ids.get(code)
+        if fid is None:
+            fid = self._ids[code] = len(self._ids)
+            self._new_functions[fid] = [code.co_filename, code.co_firstlineno,
+                                        code.co_name]
+        return fid
+
+    def flush(self):
+        """Send the stacks sampled since the last flush; False once the IDE is gone."""
+        with self._lock:
+            if not self._samples:
+                return True
+            message = {"functions": self._new_functions,
+                       "stacks": [[list(s), n] for s, n in self._stacks.items()],
+                       "samples": self._samples}
+            self._new_functions = {}
+            self._stacks = {}
+            self._samples = 0
+        data = (json.dumps(message) + "\n").encode()
+        try:
+            while data:
+                data = data[os.write(self._fd, data):]
+        except OSError:
+            self._stopped.set()
+            return False
+        return True
+
+    def stop(self):
+        self._stopped.set()
+        self.flush()
+
+
+def main():
+    if len(sys.argv) < 4:
+        sys.stderr.write("usage: sampler_bootstrap.py FD INTERVAL_MS script.py [args...]\n")
+        return 2
+    fd = int(sys.argv[1])
+    interval = max(float(sys.argv[2]), 1.0) / 1000
+    script = sys.argv[3]
+    sys.argv = sys.argv[3:]
+    sys.path[0] = os.path.dirname(os.path.abspath(script))
+
+    sampler = Sampler(fd, interval)
+    sampler.start()
+    try:
+        runpy.run_path(script, run_name="__main__")
+    finally:
+        sampler.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+import re
+
+# Basic 16-colour palette for SGR foreground codes 30-37 / 90-97
+ANSI_COLORS = {
+    30: "#555555", 31: "#f44747", 32: "#6a9955", 33: "#d7ba7d",
+    34: "#569cd6", 35: "#c586c0", 36: "#4ec9b0", 37: "#cccccc",
+    90: "#808080", 91: "#f48771", 92: "#b5cea8", 93: "#dcdcaa",
+    94: "#9cdcfe", 95: "#d670d6", 96: "#29b8db", 97: "#ffffff",
+}
+
+_ESCAPE_RE = re.compile(
+    r"\x1b(?:\[([0-9;?]*)([@-~])"      # CSI: params, final byte
+    r"|\][^\x07\x1b]*(?:\x07|\x1b\\)"  # OSC ... BEL/ST (window titles)
+    r"|[()][0-9A-Za-z]"                # charset selection
+    r"|[@-Z\\-_])")                    # other two-byte escapes
+_CONTROL_RE = re.compile(r"[\x00-\x07\x0b\x0c\x0e-\x1a\x1c-\x1f]")
+
+
+class Vt100Decoder:
+    """Turns terminal output into text runs for the Output panel.
+
+    Handles SGR colours (as "ansi-<code>" tag names) and bold, erase-line
+    after a carriage return, and clear-screen. Cursor movement and other
+    sequences are dropped. feed() returns a list of ops:
+
+        ("text", text, tag_name or None)
+        ("clear",)
+    """
+
+    def __init__(self):
+        self._partial = ""
+        self._color = None
+        self._bold = False
+
+    @property
+    def tag(self):
+        if self._color:
+            return f"ansi-{self._color}"
+        return "bold" if self._bold else None
+
+    def feed(self, text):
+        text = self._partial + text
+        self._partial = ""
+        # Keep an unfinished escape sequence for the next chunk
+        esc = text.rfind("\x1b")
+        if esc != -1 and not _ESCAPE_RE.match(text, esc) and len(text) - esc < 64:
+            text, self._partial = text[:esc], text[esc:]
+
+        ops = []
+        pos = 0
+        for m in _ESCAPE_RE.finditer(text):
+            self._emit(ops, text[pos:m.start()])
+            pos = m.end()
+            final = m.group(2)
+            if final == "m":
+                self._apply_sgr(m.group(1))
+            elif final == "J" and m.group(1) in ("2", "3"):
+                ops.append(("clear",))
+            elif final == "K" and m.group(1) in ("", "0", "2"):
+                # Erase in line: our cursor is always at the end of the line,
+                # so this only matters after a \r, where it is implied already.
+                pass
+        self._emit(ops, text[pos:])
+        return ops
+
+    def _emit(self, ops, text):
+        text = _CONTROL_RE.sub("", text)
+        if not text:
+            return
+        tag = self.tag
+        if ops and ops[-1][0] == "text" and ops[-1][2] == tag:
+            ops[-1] = ("text", ops[-1][1] + text, tag)
+        else:
+            ops.append(("text", text, tag))
+
+    def _apply_sgr(self, params):
+        codes = [int(p) for p in params.split(";") if p.isdigit()] or [0]
+        i = 0
+        while i < len(codes):
+            code = codes[i]
+            if code == 0:
+                self._color = None
+                self._bold = False
+            elif code == 1:
+                self._bold = True
+            elif code == 22:
+                self._bold = False
+            elif code == 39:
+                self._color = None
+            elif code in ANSI_COLORS:
+                self._color = code
+            elif code in (38, 48):
+                # 256-colour / truecolour: skip the arguments
+                i += 2 if codes[i + 1:i + 2] == [5] else 4
+            i += 1
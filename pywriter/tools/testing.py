@@ -0,0 +1,305 @@
+import hashlib
+import json
+import os
+import signal
+import subprocess
+import threading
+from collections import deque
+from pathlib import Path
+
+import gi
+gi.require_version("Gtk", "3.0")
+from gi.repository import GLib
+
+from ..language.imports import ImportGraph, module_names
+
+PLUGIN_DIR = Path(__file__).with_name("plugins")
+COVERAGE_BOOTSTRAP = Path(__file__).with_name("coverage_bootstrap.py")
+GREEN_DIR = Path.home() / ".cache" / "pywriter" / "green"
+DEFAULT_DURATION = 0.1  # assumed for tests that have not run yet
+OUTPUT_TAIL = 40  # lines of worker output kept for error reports
+FAILED = ("failed", "error")
+
+
+def module_of(nodeid):
+    return nodeid.split("::", 1)[0]
+
+
+def shard(nodeids, workers, durations):
+    """Split nodeids into at most workers shards of similar total duration.
+
+    Tests of one module stay in the same shard so module and class fixtures
+    are only set up once. Modules are handed out longest first to the
+    shard with the least work so far.
+    """
+    modules = {}
+    for nodeid in nodeids:
+        modules.setdefault(module_of(nodeid), []).append(nodeid)
+    costs = {m: sum(durations.get(n, DEFAULT_DURATION) for n in ids)
+             for m, ids in modules.items()}
+    shards = [[] for _ in range(max(1, min(workers, len(modules))))]
+    loads = [0.0] * len(shards)
+    for module in sorted(modules, key=lambda m: -costs[m]):
+        i = loads.index(min(loads))
+        shards[i].extend(modules[module])
+        loads[i] += costs[module]
+    return [s for s in shards if s]
+
+
+class TestWorker:
+    """One pytest process running a shard, reporting over a pipe."""
+
+    def __init__(self, nodeids):
+        self.nodeids = nodeids
+        self.process = None
+        self.read_fd = None
+        self.watch_id = None
+        self.buffer = b""
+        self.output = deque(maxlen=OUTPUT_TAIL)
+        self.returncode = None
+        self.eof = False
+        self.reported = 0
+
+
+class TestRunner:
+    """Discovers pytest tests and runs them in parallel worker processes.
+
+    Results are streamed by the pywriter_pytest plugin and delivered to
+    on_result(result_dict) on the main thread as each test finishes;
+    on_done(error_text or None) runs once every worker has exited.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.durations = {}  # nodeid -> seconds, from the latest run
+        self.affected = AffectedTests()
+        self._workers = []
+        self._on_result = None
+        self._on_done = None
+        self._errors = []
+        self._root = None
+        self._green_digests = None
+        self._clean = True  # no failures, errors or stop in the current run
+
+    @property
+    def running(self):
+        return bool(self._workers)
+
+    @property
+    def workers(self):
+        return max(1, self.app.config.get("test_workers", 2))
+
+    def _python(self, root):
+        return self.app.interpreters.resolve(root).path
+
+    def discover(self, root, callback):
+        """Collect test ids under root; callback(nodeids, error) on the main thread."""
+        threading.Thread(target=self._discover, args=(Path(root), callback),
+                         daemon=True).start()
+
+    def _discover(self, root, callback):
+        try:
+            result = subprocess.run(
+                [self._python(root), "-m", "pytest", "--collect-only", "-q",
+                 f"--rootdir={root}"],
+                cwd=str(root), capture_output=True, text=True, timeout=120)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            GLib.idle_add(callback, [], f"Test discovery failed: {e}")
+            return
+        nodeids = []
+        for line in result.stdout.splitlines():
+            if not line.strip():
+                break  # the summary follows the first blank line
+            if "::" in line:
+                nodeids.append(line.strip())
+        error = None
+        # 0: collected, 5: no tests found; anything else is worth showing
+        if result.returncode not in (0, 5):
+            error = (result.stdout + result.stderr).strip() or \
+                f"pytest exited with code {result.returncode}"
+        GLib.idle_add(callback, nodeids, error)
+
+    def select_affected(self, root, callback):
+        """callback(tests, digests) on the main thread; see AffectedTests.select()."""
+        def work():
+            tests, digests = self.affected.select(root)
+            GLib.idle_add(callback, tests, digests)
+        threading.Thread(target=work, daemon=True).start()
+
+    def run(self, root, nodeids, on_result, on_done, coverage_dir=None, green_digests=None):
+        """Run nodeids (all tests when empty) under root in sharded workers.
+
+        With coverage_dir, each worker runs under coverage_bootstrap.py and
+        writes its executed lines to a worker-N.json file there.
+
+        green_digests is the workspace snapshot from select_affected(), taken
+        before the run; it is recorded with mark_green() if every test passes.
+        """
+        if self.running:
+            return False
+        root = Path(root)
+        self._root = root
+        self._on_result = on_result
+        self._on_done = on_done
+        self._errors = []
+        self._green_digests = green_digests
+        self._clean = True
+        shards = shard(nodeids, self.workers, self.durations) if nodeids else [[]]
+        env = dict(os.environ, PYTHONUNBUFFERED="1")
+        env["PYTHONPATH"] = os.pathsep.join(
+            p for p in (str(PLUGIN_DIR), env.get("PYTHONPATH")) if p)
+        for i, ids in enumerate(shards):
+            coverage_file = Path(coverage_dir) / f"worker-{i}.json" if coverage_dir else None
+            self._start_worker(root, ids, env, coverage_file)
+        if not self._workers:
+            GLib.idle_add(self._finish)
+        return True
+
+    def stop(self):
+        self._clean = False  # a partial run proves nothing
+        for worker in self._workers:
+            if worker.process and worker.process.poll() is None:
+                try:
+                    os.killpg(worker.process.pid, signal.SIGTERM)
+                except OSError:
+                    pass
+
+    def _start_worker(self, root, nodeids, env, coverage_file=None):
+        worker = TestWorker(nodeids)
+        read_fd, write_fd = os.pipe()
+        env = dict(env, PYWRITER_REPORT_FD=str(write_fd))
+        wrapper = [str(COVERAGE_BOOTSTRAP), str(coverage_file)] if coverage_file else []
+        try:
+            worker.process = subprocess.Popen(
+                [self._python(root), *wrapper, "-m", "pytest", "-p", "pywriter_pytest", "-q",
+                 f"--rootdir={root}", *nodeids],
+                cwd=str(root), env=env, pass_fds=(write_fd,),
+                stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT, preexec_fn=os.setsid)
+        except OSError as e:
+            os.close(read_fd)
+            self._errors.append(f"Could not start pytest: {e}")
+            return
+        finally:
+            os.close(write_fd)
+        worker.read_fd = read_fd
+        os.set_blocking(read_fd, False)
+        worker.watch_id = GLib.io_add_watch(
+            read_fd, GLib.PRIORITY_DEFAULT, GLib.IO_IN | GLib.IO_HUP | GLib.IO_ERR,
+            self._on_report, worker)
+        self._workers.append(worker)
+        threading.Thread(target=self._wait_worker, args=(worker,), daemon=True).start()
+
+    def _on_report(self, fd, condition, worker):
+        while True:
+            try:
+                chunk = os.read(fd, 65536)
+            except BlockingIOError:
+                return True
+            except OSError:
+                chunk = b""
+            if not chunk:
+                os.close(fd)
+                worker.watch_id = None
+                worker.eof = True
+                self._check_done(worker)
+                return False
+            lines = (worker.buffer + chunk).split(b"\n")
+            worker.buffer = lines.pop()
+            for line in lines:
+                try:
+                    result = json.loads(line)
+                except ValueError:
+                    continue
+                if result.get("event") == "result":
+                    self.durations[result["nodeid"]] = result["duration"]
+                if result.get("event") == "collect_error" or \
+                        result.get("outcome") in FAILED:
+                    self._clean = False
+                worker.reported += 1
+                self._on_result(result)
+
+    def _wait_worker(self, worker):
+        # Keep the tail of pytest's own output for crashes and usage errors
+        for line in iter(worker.process.stdout.readline, b""):
+            worker.output.append(line.decode("utf-8", "replace"))
+        worker.process.stdout.close()
+        worker.process.wait()
+        GLib.idle_add(self._on_worker_exited, worker)
+
+    def _on_worker_exited(self, worker):
+        worker.returncode = worker.process.returncode
+        self._check_done(worker)
+        return False
+
+    def _check_done(self, worker):
+        # Done once pytest has exited and its reports are drained
+        if worker.returncode is None or not worker.eof or worker not in self._workers:
+            return
+        self._workers.remove(worker)
+        # 0: all passed, 1: some failed, 5: nothing collected. A 1 without any
+        # report means pytest itself failed (e.g. it is not installed).
+        failed = worker.returncode not in (0, 1, 5) or \
+            (worker.returncode == 1 and not worker.reported)
+        if failed and worker.returncode != -signal.SIGTERM:
+            self._errors.append(f"pytest exited with code {worker.returncode}:\n"
+                                + "".join(worker.output))
+        if not self._workers:
+            self._finish()
+
+    def _finish(self):
+        if self._clean and not self._errors and self._green_digests is not None:
+            self.affected.mark_green(self._root, self._green_digests)
+        self._green_digests = None
+        if self._on_done:
+            self._on_done("\n".join(self._errors) or None)
+        return False
+
+
+class AffectedTests:
+    """Selects the test modules affected by changes since the last green run.
+
+    The file hashes of the workspace at the start of the last run that
+    passed completely are kept in GREEN_DIR, one file per workspace.
+    """
+
+    def __init__(self):
+        self.graph = ImportGraph()
+        self._lock = threading.Lock()
+
+    def _green_file(self, root):
+        key = hashlib.sha1(str(root).encode()).hexdigest()[:16]
+        return GREEN_DIR / f"{key}.json"
+
+    def select(self, root):
+        """Return (tests, digests) for root.
+
+        tests maps each affected test file to its reason chain, or is None
+        when there is no green run to compare with. digests is the snapshot
+        to pass to mark_green() if the run passes. Slow; call off the main
+        thread.
+        """
+        root = Path(root).resolve()
+        with self._lock:
+            self.graph.build(root)
+            digests = {str(p.relative_to(root)): d for p, d in self.graph.digests.items()}
+            try:
+                with open(self._green_file(root)) as f:
+                    green = json.load(f)["digests"]
+            except (OSError, ValueError, KeyError):
+                return None, digests
+
+            changed = [root / rel for rel, digest in digests.items()
+                       if green.get(rel) != digest]
+            deleted = [name for rel in green if rel not in digests
+                       for name in module_names(root, root / rel)]
+            return self.graph.affected_tests(changed, deleted), digests
+
+    def mark_green(self, root, digests):
+        root = Path(root).resolve()
+        try:
+            GREEN_DIR.mkdir(parents=True, exist_ok=True)
+            with open(self._green_file(root), "w") as f:
+                json.dump({"root": str(root), "digests": digests}, f)
+        except OSError:
+            pass
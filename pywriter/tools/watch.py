@@ -0,0 +1,103 @@
+import threading
+from pathlib import Path
+
+import gi
+gi.require_version("Gtk", "3.0")
+from gi.repository import GLib
+
+from ..language.imports import ImportGraph
+from .runner import KILL_TIMEOUT_MS
+
+
+class RunWatcher:
+    """Re-runs a script when it, or a workspace file it imports, is saved.
+
+    Saves are debounced (watch_debounce_ms) so a burst of them causes a
+    single restart. The previous run is stopped and must have exited before
+    the new one starts, so restarts never pile up processes.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.target = None
+        self._timer_id = None
+        self._restart_pending = False
+        self._graph = ImportGraph()
+        self._lock = threading.Lock()
+
+    @property
+    def active(self):
+        return self.target is not None
+
+    def start(self, filepath):
+        self.target = Path(filepath)
+        self._restart_pending = False
+        self._run()
+
+    def stop(self):
+        self.target = None
+        if self._timer_id:
+            GLib.source_remove(self._timer_id)
+            self._timer_id = None
+
+    def on_saved(self, filepath):
+        """Called on the main thread after a document is saved."""
+        if not self.active or filepath.suffix != ".py":
+            return
+        filepath = filepath.resolve()
+        if filepath == self.target.resolve():
+            self._schedule()
+            return
+        root = self.app.workspace.root if self.app.workspace else None
+        if root and root.resolve() in filepath.parents:
+            threading.Thread(target=self._check_import, args=(root, filepath, self.target),
+                             daemon=True).start()
+
+    def _check_import(self, root, filepath, target):
+        with self._lock:
+            self._graph.build(root)
+            imported = filepath in self._graph.dependencies(target.resolve())
+        if imported:
+            GLib.idle_add(self._schedule_for, target)
+
+    def _schedule_for(self, target):
+        if target == self.target:
+            self._schedule()
+        return False
+
+    def _schedule(self):
+        if self._timer_id:
+            GLib.source_remove(self._timer_id)
+        self._timer_id = GLib.timeout_add(
+            self.app.config.get("watch_debounce_ms", 300), self._on_timeout)
+
+    def _on_timeout(self):
+        self._timer_id = None
+        if not self.active or self._restart_pending:
+            return False  # a restart is already waiting for the old run to exit
+        session = self.app.runner.find_session(self.target, self.target.name)
+        if session and session.running:
+            self._restart_pending = True
+            session.on_exit.append(self._on_previous_exit)
+            self.app.runner.stop(session)
+            GLib.timeout_add(KILL_TIMEOUT_MS, self._kill_if_running, session)
+        else:
+            self._run()
+        return False
+
+    def _kill_if_running(self, session):
+        if session.running:
+            session.kill()
+        return False
+
+    def _on_previous_exit(self, session):
+        self._restart_pending = False
+        GLib.idle_add(self._run_idle)
+
+    def _run_idle(self):
+        self._run()
+        return False
+
+    def _run(self):
+        if self.active and self.app.runner:
+            self.app.runner.run(self.target)
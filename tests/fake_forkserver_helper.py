@@ -0,0 +1,40 @@
+"""Stand-in for pywriter/tools/forkserver_helper.py that forks nothing.
+
+Speaks the same SOCK_SEQPACKET protocol. FAKE_HELPER_MODE selects a
+behaviour:
+
+    ok       answers each request with "spawned" and "exited" (code 7)
+    garbage  like ok, but sends an unparsable packet before each reply
+    die      exits when the first request arrives
+"""
+
+import json
+import os
+import socket
+import sys
+
+MODE = os.environ.get("FAKE_HELPER_MODE", "ok")
+
+
+def main():
+    sock = socket.socket(fileno=int(sys.argv[1]))
+    sock.send(json.dumps({"event": "ready", "preloaded": sys.argv[2:],
+                          "failed": {}}).encode())
+    while True:
+        data, ancdata, _, _ = sock.recvmsg(1 << 20, socket.CMSG_SPACE(4))
+        for _, _, payload in ancdata:
+            os.close(int.from_bytes(payload[:4], sys.byteorder))
+        if not data or MODE == "die":
+            return 0
+        request = json.loads(data.decode())
+        if MODE == "garbage":
+            sock.send(b"\xff{not json")
+        # The helper's own pid: nothing real is forked
+        sock.send(json.dumps({"event": "spawned", "id": request["id"],
+                              "pid": os.getpid()}).encode())
+        sock.send(json.dumps({"event": "exited", "pid": os.getpid(), "returncode": 7,
+                              "rusage": [0.1, 0.0, 1024]}).encode())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,41 @@
+"""Stand-in for pywriter/language/format_worker.py that needs no black.
+
+Speaks the same JSON-lines protocol. FAKE_WORKER_MODE selects a behaviour:
+
+    ok       format() upper-cases the source
+    missing  reports black as not installed and exits
+    hang     answers the hello, then never replies
+"""
+
+import json
+import os
+import sys
+
+MODE = os.environ.get("FAKE_WORKER_MODE", "ok")
+
+
+def send(message):
+    sys.stdout.write(json.dumps(message) + "\n")
+    sys.stdout.flush()
+
+
+def main():
+    if MODE == "missing":
+        send({"ok": False, "error": "black not installed"})
+        return 3
+    send({"ok": True, "version": "fake"})
+    for line in sys.stdin:
+        if MODE == "hang":
+            continue
+        request = json.loads(line)
+        if request["op"] == "ping":
+            send({"ok": True, "version": "fake"})
+        else:
+            source = request["source"]
+            send({"ok": True, "changed": source != source.upper(),
+                  "source": source.upper()})
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+import pytest
+
+pytest.importorskip("gi")
+
+from pywriter.language.imports import ImportGraph, module_names
+from pywriter.tools import testing
+from pywriter.tools.testing import AffectedTests
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    files = {
+        "pkg/__init__.py": "",
+        "pkg/core.py": "def f():\n    return 1\n",
+        "pkg/api.py": "from .core import f\n",
+        "pkg/old.py": "X = 1\n",
+        "tests/test_api.py": "from pkg import api\n",
+        "tests/test_old.py": "import pkg.old\n",
+        "tests/test_plain.py": "import os\n",
+    }
+    for name, text in files.items():
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+    return tmp_path.resolve()
+
+
+@pytest.fixture
+def affected(tmp_path_factory, monkeypatch):
+    monkeypatch.setattr(testing, "GREEN_DIR", tmp_path_factory.mktemp("green"))
+    return AffectedTests()
+
+
+def test_module_names(tmp_path):
+    assert module_names(tmp_path, tmp_path / "pkg" / "core.py") == ["pkg.core"]
+    assert module_names(tmp_path, tmp_path / "pkg" / "__init__.py") == ["pkg"]
+    assert module_names(tmp_path, tmp_path / "src" / "lib" / "mod.py") == \
+        ["src.lib.mod", "lib.mod"]
+    assert module_names(tmp_path, tmp_path.parent / "elsewhere.py") == []
+
+
+def test_changed_module_reaches_transitive_importer(workspace):
+    graph = ImportGraph().build(workspace)
+    core = workspace / "pkg" / "core.py"
+    tests = graph.affected_tests([core])
+    test_api = workspace / "tests" / "test_api.py"
+    assert tests == {test_api: [test_api, workspace / "pkg" / "api.py", core]}
+
+
+def test_deleted_module_selects_its_importers(workspace):
+    graph = ImportGraph().build(workspace)
+    tests = graph.affected_tests([], ["pkg.old"])
+    test_old = workspace / "tests" / "test_old.py"
+    assert tests == {test_old: [test_old, "pkg.old"]}
+
+
+def test_select_without_green_run(workspace, affected):
+    tests, digests = affected.select(workspace)
+    assert tests is None
+    assert set(digests) == {"pkg/__init__.py", "pkg/core.py", "pkg/api.py", "pkg/old.py",
+                            "tests/test_api.py", "tests/test_old.py", "tests/test_plain.py"}
+
+
+def test_select_after_green_run(workspace, affected):
+    _, digests = affected.select(workspace)
+    affected.mark_green(workspace, digests)
+    assert affected.select(workspace)[0] == {}
+
+    # A new size, since the mtime may not tick between writes
+    (workspace / "pkg" / "core.py").write_text("def f():\n    return 20\n")
+    (workspace / "pkg" / "old.py").unlink()
+    tests, _ = affected.select(workspace)
+    assert {path.name: [getattr(step, "name", step) for step in chain]
+            for path, chain in tests.items()} == {
+        "test_api.py": ["test_api.py", "api.py", "core.py"],
+        "test_old.py": ["test_old.py", "pkg.old"],
+    }
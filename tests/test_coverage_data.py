@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+pytest.importorskip("gi")
+
+from pywriter.panels.coverage import CoverageData, executable_lines
+
+SOURCE = '''\
+"""Module docstring."""
+import os
+def f(a,
+      b):
+    """Function docstring
+    on two lines."""
+    total = (a +
+             b)
+    if total:
+        return total
+    else:
+        return 0
+'''
+
+
+def test_executable_lines_skip_docstrings_and_continuations():
+    lines = executable_lines(SOURCE)
+    assert {2, 3, 7, 9, 10, 12} <= lines
+    assert not lines & {4, 5, 6, 8, 11}  # continuations, function docstring, else:
+
+
+def test_executable_lines_of_broken_source():
+    assert executable_lines("def broken(:\n") == set()
+
+
+def write_data(path, collector, files):
+    path.write_text(json.dumps({"collector": collector, "files": files}))
+    return path
+
+
+def test_load_merges_workers_and_analyses_per_file(tmp_path):
+    module = tmp_path / "mod.py"
+    module.write_text(SOURCE)
+    data = CoverageData.load([
+        write_data(tmp_path / "worker-0.json", "sys.monitoring", {str(module): [2, 3]}),
+        write_data(tmp_path / "worker-1.json", "settrace", {str(module): [7, 9, 10]}),
+        tmp_path / "missing.json",
+    ])
+    assert data.collector == "settrace, sys.monitoring"
+    hits, missed = data.analysis(module)
+    assert hits == {2, 3, 7, 9, 10}
+    assert missed == executable_lines(SOURCE) - hits
+    assert 12 in missed
+    assert data.analysis(tmp_path / "unmeasured.py") is None
+
+
+def test_load_without_readable_data(tmp_path):
+    (tmp_path / "bad.json").write_text("{truncated")
+    assert CoverageData.load([tmp_path / "bad.json", tmp_path / "missing.json"]) is None
@@ -0,0 +1,70 @@
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from pywriter.tools import forkserver
+from pywriter.tools.forkserver import _Helper
+
+FAKE_HELPER = Path(__file__).with_name("fake_forkserver_helper.py")
+
+
+@pytest.fixture
+def start_helper(monkeypatch):
+    monkeypatch.setattr(forkserver, "HELPER_SCRIPT", FAKE_HELPER)
+    helpers = []
+
+    def start(mode="ok"):
+        monkeypatch.setenv("FAKE_HELPER_MODE", mode)
+        helper = _Helper("key", sys.executable, ["numpy"])
+        helpers.append(helper)
+        assert helper.wait_ready(5.0)
+        return helper
+
+    yield start
+    for helper in helpers:
+        helper.kill()
+
+
+def spawn(helper, timeout=5.0):
+    read_fd, write_fd = os.pipe()
+    try:
+        return helper.spawn(["script.py"], "/", {}, write_fd, timeout)
+    finally:
+        os.close(read_fd)
+        os.close(write_fd)
+
+
+def test_spawn_reports_exit_status(start_helper):
+    helper = start_helper()
+    assert helper.preloaded == ["numpy"]
+    process = spawn(helper)
+    assert process is not None
+    assert process._exited.wait(5.0)
+    assert process.returncode == 7
+    assert process.rusage.ru_maxrss == 1024
+
+
+def test_bad_packet_does_not_stop_the_reader(start_helper):
+    helper = start_helper("garbage")
+    for _ in range(2):
+        started = time.monotonic()
+        process = spawn(helper)
+        assert process is not None
+        assert time.monotonic() - started < 4.0  # answered, not timed out
+        assert process._exited.wait(5.0)
+        assert process.returncode == 7
+    assert helper.alive
+
+
+def test_dead_helper_wakes_waiting_spawn(start_helper):
+    helper = start_helper("die")
+    started = time.monotonic()
+    assert spawn(helper) is None
+    assert time.monotonic() - started < 4.0
+    deadline = time.monotonic() + 5.0
+    while helper.alive and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not helper.alive
@@ -0,0 +1,62 @@
+import os
+import signal
+from pathlib import Path
+
+import pytest
+
+from pywriter.language import format_daemon
+from pywriter.language.format_daemon import FormatDaemon
+
+FAKE_WORKER = Path(__file__).with_name("fake_format_worker.py")
+
+
+@pytest.fixture
+def daemon(monkeypatch):
+    monkeypatch.setattr(format_daemon, "WORKER_SCRIPT", FAKE_WORKER)
+    daemon = FormatDaemon()
+    daemon.START_TIMEOUT = daemon.REQUEST_TIMEOUT = 5.0
+    daemon.PING_TIMEOUT = 0.5
+    yield daemon
+    daemon.stop()
+
+
+def test_format_through_worker(daemon):
+    assert daemon.format("x = 1\n") == (True, "X = 1\n")
+    assert daemon.version == "fake"
+    assert daemon.format("Y\n") == (False, "Y\n")
+
+
+def test_restarts_after_worker_died(daemon):
+    daemon.format("a\n")
+    first = daemon._process
+    first.kill()
+    first.wait()
+    assert daemon.format("b\n") == (True, "B\n")
+    assert daemon._process is not first
+
+
+def test_failed_health_check_restarts_worker(daemon):
+    daemon.HEALTH_INTERVAL = 0.0  # ping before every request
+    daemon.format("a\n")
+    stuck = daemon._process
+    os.kill(stuck.pid, signal.SIGSTOP)  # alive but no longer answering
+    assert daemon.format("b\n") == (True, "B\n")
+    assert daemon._process is not stuck
+    assert stuck.poll() is not None
+
+
+def test_request_timeout_kills_worker(daemon, monkeypatch):
+    monkeypatch.setenv("FAKE_WORKER_MODE", "hang")
+    daemon.REQUEST_TIMEOUT = 0.5
+    assert daemon.format("a\n") is None
+    assert not daemon.running
+    monkeypatch.setenv("FAKE_WORKER_MODE", "ok")
+    assert daemon.format("a\n") == (True, "A\n")
+
+
+def test_missing_black_disables_for_good(daemon, monkeypatch):
+    monkeypatch.setenv("FAKE_WORKER_MODE", "missing")
+    for _ in range(FormatDaemon.MAX_FAILURES + 1):
+        assert daemon.format("a\n") is None
+    assert daemon._disabled_until == float("inf")
+    assert daemon.last_error == "black not installed"
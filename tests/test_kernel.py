@@ -0,0 +1,38 @@
+import pytest
+
+pytest.importorskip("gi")
+
+from pywriter.tools.kernel import find_cell
+
+CELLS = """\
+import os
+# %% first
+a = 1
+b = 2
+#%%
+c = 3
+    # %%   indented marker
+d = 4
+""".splitlines()
+
+
+def test_cell_around_a_line():
+    assert find_cell(CELLS, 2) == (1, 4)
+    assert find_cell(CELLS, 5) == (4, 6)
+    assert find_cell(CELLS, 7) == (6, 8)
+
+
+def test_lines_before_the_first_marker():
+    assert find_cell(CELLS, 0) == (0, 1)
+
+
+def test_cursor_on_a_marker_line_runs_the_cell_it_starts():
+    assert find_cell(CELLS, 1) == (1, 4)
+    assert find_cell(CELLS, 4) == (4, 6)
+    assert find_cell(CELLS, 6) == (6, 8)
+
+
+def test_no_markers_is_the_whole_buffer():
+    lines = ["x = 1", "", "print(x)"]
+    for line in range(len(lines)):
+        assert find_cell(lines, line) == (0, 3)
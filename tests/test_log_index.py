@@ -0,0 +1,70 @@
+import pytest
+
+pytest.importorskip("gi")
+
+from pywriter.panels.log_viewer import LineIndex
+
+LINES = [b"first", b"", b"a much longer third line", b"x", b"crlf\r", b"last, no newline"]
+DATA = b"\n".join(LINES)
+
+
+def expected_offsets(data):
+    return [0] + [i + 1 for i, byte in enumerate(data) if byte == ord("\n")]
+
+
+@pytest.fixture
+def log_file(tmp_path):
+    path = tmp_path / "run.log"
+    path.write_bytes(DATA)
+    return path
+
+
+@pytest.mark.parametrize("step", [1, 2, 3, 5, 7, 64])
+def test_index_in_chunks_matches_newlines(log_file, step):
+    index = LineIndex(log_file)
+    assert index.refresh()
+    while index.index(step):
+        pass
+    assert index.complete
+    assert list(index.offsets) == expected_offsets(DATA)
+    assert index.line_count == len(LINES)
+    assert [index.line(i) for i in range(index.line_count)] == \
+        [line.decode().rstrip("\r") for line in LINES]
+    index.close()
+
+
+def test_line_of_every_offset(log_file):
+    index = LineIndex(log_file)
+    index.refresh()
+    index.index(3)
+    index.index_to(len(DATA) - 1)
+    for offset in range(len(DATA)):
+        assert index.line_of(offset) == DATA.count(b"\n", 0, offset)
+    index.close()
+
+
+def test_growing_file_continues_the_last_line(log_file):
+    index = LineIndex(log_file)
+    index.refresh()
+    while index.index(4):
+        pass
+    assert not index.refresh()  # unchanged
+    with open(log_file, "ab") as f:
+        f.write(b" continued\nnew line\n")
+    assert index.refresh()
+    while index.index(4):
+        pass
+    assert index.line(len(LINES) - 1) == "last, no newline continued"
+    assert index.line(len(LINES)) == "new line"
+    assert index.line_count == len(LINES) + 1  # nothing after the final newline
+    index.close()
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "empty.log"
+    path.write_bytes(b"")
+    index = LineIndex(path)
+    assert not index.refresh()
+    assert index.complete and not index.index()
+    assert index.line_count == 0
+    index.close()
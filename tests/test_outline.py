@@ -0,0 +1,209 @@
+import queue
+import types
+
+import pytest
+
+pytest.importorskip("gi")
+
+from pywriter.language import outline
+from pywriter.language.outline import OutlineParser
+
+SOURCE = "class A:\n    def f(self):\n        pass\n\n\ndef g():\n    pass\n"
+
+
+@pytest.fixture
+def results(monkeypatch):
+    """Parser callbacks, delivered straight from the worker thread."""
+    monkeypatch.setattr(outline, "GLib", types.SimpleNamespace(
+        idle_add=lambda callback, *args: callback(*args)))
+    return queue.Queue()
+
+
+@pytest.fixture
+def parsed(monkeypatch):
+    """Texts handed to the full parse."""
+    texts = []
+    parse_symbols = outline.parse_symbols
+
+    def counting(text):
+        texts.append(text)
+        return parse_symbols(text)
+
+    monkeypatch.setattr(outline, "parse_symbols", counting)
+    return texts
+
+
+def test_unchanged_snapshot_is_answered_from_cache(results, parsed):
+    parser = OutlineParser(lambda *args: results.put(args))
+    parser.submit("doc", 1, SOURCE)
+    _, version, symbols, index = results.get(timeout=5)
+    assert version == 1
+    assert [s[1] for s in symbols] == ["A", "g"]
+    assert len(parsed) == 1
+
+    parser.submit("doc", 2, SOURCE)
+    _, version, cached_symbols, cached_index = results.get(timeout=5)
+    assert version == 2
+    assert cached_symbols is symbols and cached_index is index
+    assert len(parsed) == 1  # no second parse
+
+    parser.submit("doc", 3, SOURCE + "x = 1\n")
+    assert results.get(timeout=5)[1] == 3
+    assert len(parsed) == 2
+
+
+def test_superseded_snapshot_skips_full_parse(results, parsed):
+    newer = SOURCE + "def h():\n    pass\n"
+
+    def callback(doc_key, version, symbols, index):
+        results.put((version, [s[1] for s in symbols]))
+        if version == 1:
+            parser.submit(doc_key, 2, newer)  # arrives while 1 is being parsed
+
+    parser = OutlineParser(callback, quick_lines=1)
+    parser.submit("doc", 1, SOURCE)
+    assert results.get(timeout=5) == (1, ["A", "g"])  # quick pass
+    assert results.get(timeout=5) == (2, ["A", "g", "h"])  # quick pass
+    assert results.get(timeout=5) == (2, ["A", "g", "h"])  # full parse
+    assert parsed == [newer]
+    assert results.empty()
+
+
+def test_forget_drops_cached_parse(results, parsed):
+    parser = OutlineParser(lambda *args: results.put(args))
+    parser.submit("doc", 1, SOURCE)
+    results.get(timeout=5)
+    parser.forget("doc")
+    parser.submit("doc", 2, SOURCE)
+    results.get(timeout=5)
+    assert len(parsed) == 2
+
+
+def names(symbols):
+    """(name, line, child names and lines) of a symbol tree."""
+    return [(name, line, names(children)) for _, name, line, _, children in symbols]
+
+
+UNCLOSED_BRACKET = """\
+class A:
+    def f(self):
+        x = (1,
+
+    def g(self):
+        pass
+
+def h():
+    pass
+"""
+
+STRAY_DEF = """\
+def
+
+class B:
+    def m(self):
+        pass
+
+def k():
+    return 1
+"""
+
+
+@pytest.mark.parametrize("extract", [outline.scan_symbols, outline.quick_symbols])
+def test_unclosed_bracket_keeps_later_symbols(extract):
+    assert names(extract(UNCLOSED_BRACKET)) == [
+        ("A", 1, [("f", 2, []), ("g", 5, [])]),
+        ("h", 8, []),
+    ]
+
+
+@pytest.mark.parametrize("extract", [outline.scan_symbols, outline.quick_symbols])
+def test_stray_def_is_skipped(extract):
+    assert names(extract(STRAY_DEF)) == [("B", 3, [("m", 4, [])]), ("k", 7, [])]
+
+
+def test_broken_buffer_falls_back_to_scan():
+    symbols = outline.parse_symbols(UNCLOSED_BRACKET)
+    assert symbols == outline.scan_symbols(UNCLOSED_BRACKET)
+    assert all(end is None for _, _, _, end, _ in symbols)
+
+
+def test_scan_hides_defs_nested_in_blocks():
+    text = ("if True:\n    def hidden():\n        pass\n"
+            "class C:\n    async def a(self):\n        pass\n    x = [\n")
+    assert names(outline.scan_symbols(text)) == [("C", 4, [("a", 5, [])])]
+
+
+def test_scan_ignores_defs_in_strings_unlike_quick():
+    text = 's = """\ndef fake():\n"""\ndef real(:\n    pass\n'
+    assert names(outline.scan_symbols(text)) == [("real", 4, [])]
+    assert names(outline.quick_symbols(text)) == [("fake", 2, []), ("real", 4, [])]
+
+
+NESTED = """\
+import os
+# header
+
+class Outer:
+    x = 1
+
+    class Inner:
+        def method(self):
+            return 1
+
+        # comment inside Inner
+
+    def after(self):
+        pass
+    # trailing comment
+
+
+def top():
+    def local():
+        pass
+    return local
+
+
+
+y = 2
+"""
+
+
+def scope_names(index, line):
+    return [key[-1][1] for key in index.scope_at(line)]
+
+
+# The AST gives end lines; the scan leaves them to be inferred from indentation
+@pytest.mark.parametrize("extract", [outline.parse_symbols, outline.scan_symbols])
+def test_scope_at_nested_classes_and_functions(extract):
+    index = outline.SymbolIndex(extract(NESTED), NESTED)
+    assert index.starts == [4, 7, 8, 13, 18]
+    assert index.ends == [14, 9, 9, 14, 21]
+    assert index.parents == [-1, 0, 1, 0, -1]
+    assert scope_names(index, 4) == ["Outer"]
+    assert scope_names(index, 7) == ["Outer", "Inner"]
+    assert scope_names(index, 9) == ["Outer", "Inner", "method"]
+    assert scope_names(index, 13) == ["Outer", "after"]
+    assert scope_names(index, 20) == ["top"]  # nested functions are not listed
+
+
+@pytest.mark.parametrize("extract", [outline.parse_symbols, outline.scan_symbols])
+def test_scope_at_blank_lines_and_comments_after_a_body(extract):
+    index = outline.SymbolIndex(extract(NESTED), NESTED)
+    for line in (10, 11, 12):  # after Inner's body, still inside Outer
+        assert scope_names(index, line) == ["Outer"]
+    for line in (15, 16, 17, 22, 25, 26):  # after a top-level body
+        assert scope_names(index, line) == []
+
+
+@pytest.mark.parametrize("extract", [outline.parse_symbols, outline.scan_symbols])
+def test_scope_at_before_first_symbol(extract):
+    index = outline.SymbolIndex(extract(NESTED), NESTED)
+    for line in (0, 1, 2, 3):
+        assert index.scope_at(line) == []
+
+
+def test_scope_keys_count_repeated_names():
+    text = "def f():\n    pass\n\ndef f():\n    pass\n"
+    index = outline.SymbolIndex(outline.parse_symbols(text), text)
+    assert index.scope_at(2) == [(("function", "f", 0),)]
+    assert index.scope_at(5) == [(("function", "f", 1),)]
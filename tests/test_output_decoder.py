@@ -0,0 +1,59 @@
+import pytest
+
+pytest.importorskip("gi")
+
+from pywriter.tools.runner import OutputDecoder
+
+# Multi-byte characters, \r\n, a lone \r (progress overwrite) and a trailing \r
+RAW = "héllo → wörld\r\n10%\r50%\r100%\r\ndone ✓\r".encode("utf-8")
+TEXT = "héllo → wörld\n10%\r50%\r100%\ndone ✓\r"
+
+
+def decode_chunks(chunks):
+    decoder = OutputDecoder()
+    parts = [decoder.decode(chunk) for chunk in chunks]
+    parts.append(decoder.decode(b"", final=True))
+    return parts
+
+
+def test_whole_input():
+    assert "".join(decode_chunks([RAW])) == TEXT
+
+
+@pytest.mark.parametrize("split", range(1, len(RAW)))
+def test_split_at_every_byte_boundary(split):
+    parts = decode_chunks([RAW[:split], RAW[split:]])
+    assert "".join(parts) == TEXT
+    assert "�" not in "".join(parts)  # no character torn in half
+
+
+def test_one_byte_at_a_time():
+    parts = decode_chunks([RAW[i:i + 1] for i in range(len(RAW))])
+    assert "".join(parts) == TEXT
+
+
+def test_cr_before_chunk_boundary_is_held_for_lf():
+    decoder = OutputDecoder()
+    assert decoder.decode(b"line\r") == "line"
+    assert decoder.decode(b"\nnext") == "\nnext"
+
+
+def test_lone_cr_is_kept_for_overwriting():
+    decoder = OutputDecoder()
+    assert decoder.decode(b"10%\r") == "10%"
+    assert decoder.decode(b"20%") == "\r20%"
+    assert decoder.decode(b"\r", final=True) == "\r"
+
+
+def test_split_multibyte_character():
+    arrow = "→".encode("utf-8")
+    decoder = OutputDecoder()
+    assert decoder.decode(arrow[:1]) == ""
+    assert decoder.decode(arrow[1:2]) == ""
+    assert decoder.decode(arrow[2:] + b"!") == "→!"
+
+
+def test_invalid_bytes_are_replaced():
+    decoder = OutputDecoder()
+    assert decoder.decode(b"a\xffb") == "a�b"
+    assert decoder.decode(b"\xe2\x86", final=True) == "�"
@@ -0,0 +1,53 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import pywriter.tools
+
+KERNEL = Path(pywriter.tools.__file__).with_name("repl_kernel.py")
+
+
+@pytest.fixture
+def kernel(tmp_path):
+    """Send raw request lines to a kernel; return its replies and output."""
+    def run(*lines):
+        request_r, request_w = os.pipe()
+        reply_r, reply_w = os.pipe()
+        env = dict(os.environ, PYWRITER_KERNEL_FDS=f"{request_r},{reply_w}",
+                   PYWRITER_KERNEL_CWD=str(tmp_path))
+        process = subprocess.Popen([sys.executable, str(KERNEL)], env=env,
+                                   pass_fds=(request_r, reply_w),
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        os.close(request_r)
+        os.close(reply_w)
+        with os.fdopen(request_w, "wb") as requests:
+            requests.write(b"".join(line + b"\n" for line in lines))
+        with os.fdopen(reply_r) as replies:
+            answers = [json.loads(line) for line in replies]
+        out, err = process.communicate(timeout=30)
+        assert process.returncode == 0
+        return answers, out.decode(), err.decode()
+    return run
+
+
+def request(id, code):
+    return json.dumps({"id": id, "code": code, "filename": "cell.py", "line": 1}).encode()
+
+
+def test_namespace_survives_between_requests(kernel):
+    replies, out, _ = kernel(request(1, "x = 20"), request(2, "x + 1"))
+    assert [(r["id"], r["status"]) for r in replies] == [(1, "ok"), (2, "ok")]
+    assert out == "21\n"
+
+
+def test_malformed_requests_do_not_kill_the_kernel(kernel):
+    replies, out, err = kernel(b"{not json", b"[1, 2]", json.dumps({"id": 2}).encode(),
+                               b"\xff\xfe", request(3, "1 / 0"), request(4, "print('alive')"))
+    assert [(r["id"], r["status"]) for r in replies] == [(2, "error"), (3, "error"), (4, "ok")]
+    assert "request without code" in err
+    assert "ZeroDivisionError" in err
+    assert out == "alive\n"
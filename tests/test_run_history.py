@@ -0,0 +1,60 @@
+import pytest
+
+from pywriter.tools.run_history import RunHistory, RunRecord
+
+SCRIPT = "/work/script.py"
+
+
+def record(wall=1.0, cpu=1.0, rss=10240, returncode=0, title="script.py"):
+    return RunRecord(0.0, title, returncode, wall, cpu, 0.0, rss)
+
+
+@pytest.fixture
+def history(tmp_path):
+    history = RunHistory(tmp_path / "history.json")
+    for wall in (0.9, 1.0, 1.1):  # median 1.0
+        history.add(SCRIPT, record(wall=wall))
+    return history
+
+
+def test_within_threshold_is_no_regression(history):
+    text, regressed = history.compare(SCRIPT, record(wall=1.2))
+    assert text.startswith("vs. 3 earlier runs: wall +20% (median 1.00s)")
+    assert not regressed
+
+
+def test_above_threshold_is_a_regression(history):
+    text, regressed = history.compare(SCRIPT, record(wall=1.3, rss=20480))
+    assert regressed
+    assert text.endswith("regression in wall, peak RSS")
+
+
+def test_faster_run_is_no_regression(history):
+    assert not history.compare(SCRIPT, record(wall=0.2, cpu=0.2))[1]
+
+
+def test_short_runs_are_too_noisy_to_flag(tmp_path):
+    history = RunHistory(tmp_path / "history.json")
+    history.add(SCRIPT, record(wall=0.02, cpu=0.02))
+    text, regressed = history.compare(SCRIPT, record(wall=0.05, cpu=0.05))
+    assert "wall +150%" in text
+    assert not regressed
+
+
+def test_failed_runs_are_not_compared(history):
+    assert history.compare(SCRIPT, record(returncode=1)) is None
+    history.add(SCRIPT, record(wall=50.0, returncode=1))  # not part of the median
+    assert "median 1.00s" in history.compare(SCRIPT, record())[0]
+
+
+def test_no_earlier_runs(tmp_path):
+    history = RunHistory(tmp_path / "history.json")
+    first = record()
+    history.add(SCRIPT, first)
+    assert history.compare(SCRIPT, first) is None
+    assert history.compare(SCRIPT, record(title="other")) is None
+
+
+def test_history_is_persisted(history, tmp_path):
+    reloaded = RunHistory(tmp_path / "history.json")
+    assert [r.wall for r in reloaded.records(SCRIPT)] == [0.9, 1.0, 1.1]